@@ -0,0 +1,45 @@
+'''
+Benchmark del scanner
+=====================
+
+Repite un programa de `samples/` hasta obtener entradas de distinto
+número de líneas y mide el tiempo de `Scanner.scan_tokens`. Con un
+scanner lineal el tiempo por línea se mantiene constante.
+
+    python bench/bench_lexer.py
+    python bench/bench_lexer.py --lines 10000 100000 --sample samples/criba.gox
+'''
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from lexer.scanner import Scanner
+
+def error_handler(line, message):
+    raise SyntaxError(f"[line {line}] Error: {message}")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--lines', type=int, nargs='+', default=[1000, 10000, 100000])
+    ap.add_argument('--sample', default='samples/shor.gox')
+    args = ap.parse_args(argv)
+
+    with open(os.path.join(ROOT, args.sample), encoding='utf-8') as f:
+        unit = f.read()
+    unit_lines = unit.count('\n') or 1
+
+    print(f"{'líneas':>10}{'tokens':>12}{'segundos':>12}{'µs/línea':>12}")
+    for lines in args.lines:
+        source = unit * max(1, lines // unit_lines)
+        start = time.perf_counter()
+        tokens = Scanner(source, error_handler).scan_tokens()
+        seconds = time.perf_counter() - start
+        nlines = source.count('\n')
+        print(f"{nlines:>10}{len(tokens):>12}{seconds:>12.4f}{seconds / nlines * 1e6:>12.2f}")
+
+if __name__ == '__main__':
+    main()
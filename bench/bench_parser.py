@@ -0,0 +1,76 @@
+'''
+Benchmark del parser de expresiones
+===================================
+
+Genera programas sintéticos con muchas expresiones (operadores de todas
+las precedencias, unarios, paréntesis y llamadas) y mide el tiempo de
+`Parser.parse` sobre tokens ya escaneados, para no mezclarlo con el
+scanner.
+
+    python bench/bench_parser.py
+    python bench/bench_parser.py --statements 20000 --terms 4 16 64
+'''
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from lexer.scanner import Scanner
+from parse.parse import Parser
+
+OPERATORS = ['+', '-', '*', '/', '<', '==', '&&', '||']
+
+def error_handler(line, message):
+    raise SyntaxError(f"[line {line}] Error: {message}")
+
+def operand(rng, depth):
+    choice = rng.random()
+    if choice < 0.4:
+        return rng.choice(['a', 'b', 'c', 'x1', 'total'])
+    elif choice < 0.7:
+        return str(rng.randint(0, 999))
+    elif choice < 0.8:
+        return '-' + operand(rng, depth)
+    elif choice < 0.9 and depth < 3:
+        return f"({expression(rng, 3, depth + 1)})"
+    return f"f({operand(rng, depth)}, {operand(rng, depth)})"
+
+def expression(rng, terms, depth=0):
+    parts = [operand(rng, depth)]
+    for _ in range(terms - 1):
+        parts.append(rng.choice(OPERATORS))
+        parts.append(operand(rng, depth))
+    return ' '.join(parts)
+
+def generate(statements, terms, seed=1):
+    rng = random.Random(seed)
+    return '\n'.join(f"x = {expression(rng, terms)};" for _ in range(statements)) + '\n'
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--statements', type=int, default=5000)
+    ap.add_argument('--terms', type=int, nargs='+', default=[1, 4, 16, 64],
+                    help="operandos por expresión")
+    ap.add_argument('--repeat', type=int, default=3)
+    args = ap.parse_args(argv)
+
+    print(f"{'términos':>10}{'tokens':>12}{'segundos':>12}{'µs/token':>12}")
+    for terms in args.terms:
+        tokens = Scanner(generate(args.statements, terms), error_handler).scan_tokens()
+        best = None
+        for _ in range(args.repeat):
+            gc.disable()        # Como timeit: el recolector solo agrega ruido
+            start = time.perf_counter()
+            Parser(tokens).parse()
+            seconds = time.perf_counter() - start
+            gc.enable()
+            best = seconds if best is None else min(best, seconds)
+        print(f"{terms:>10}{len(tokens):>12}{best:>12.4f}{best / len(tokens) * 1e6:>12.2f}")
+
+if __name__ == '__main__':
+    main()
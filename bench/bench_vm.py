@@ -0,0 +1,150 @@
+'''
+Benchmark de la máquina de pila
+===============================
+
+Compila programas GoxLang de `samples/` y mide cuántas instrucciones IR
+por segundo ejecuta `StackMachine`.
+
+    python bench/bench_vm.py                      # criba y factorize
+    python bench/bench_vm.py samples/shor.gox -n 20
+    python bench/bench_vm.py --fusion             # con y sin superinstrucciones
+    python bench/bench_vm.py --compiled           # intérprete contra CompiledMachine
+    python bench/bench_vm.py --trace bench/hotloops.gox   # interpretación fría contra trazas
+
+El número de despachos se obtiene con una corrida aparte que cuenta cada
+llamada a un manejador; la corrida cronometrada usa la máquina sin
+instrumentar.
+'''
+import argparse
+import io
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from lexer.scanner import Scanner
+from parse.parse import Parser
+from semantic.check import Checker
+from ircode import IRCode
+from stack_machine import StackMachine
+from compiled_machine import CompiledMachine
+from tracing_machine import TracingMachine
+
+DEFAULT_SAMPLES = ['samples/criba.gox', 'samples/factorize.gox']
+
+class CountingMachine(StackMachine):
+    '''
+    Variante que cuenta los despachos (una superinstrucción cuenta uno).
+    '''
+    def __init__(self, module, **kwargs):
+        super().__init__(module, **kwargs)
+        self.steps = 0
+
+    def load(self, func):
+        if func.name not in self.loaded:
+            code = super().load(func)
+            self.loaded[func.name] = [(self.counted(handler), arg) for handler, arg in code]
+        return self.loaded[func.name]
+
+    @staticmethod
+    def counted(handler):
+        def counted(machine, arg, pc):
+            machine.steps += 1
+            return handler(machine, arg, pc)
+        return counted
+
+def error_handler(line, message):
+    raise SyntaxError(f"[line {line}] Error: {message}")
+
+def compile_file(filename):
+    with open(filename, encoding='utf-8') as f:
+        source = f.read()
+    scanner = Scanner(source, error_handler)
+    ast = Parser(scanner.scan_tokens()).parse()
+    with redirect_stdout(io.StringIO()):
+        checker = Checker.check(ast)
+    if checker.errors:
+        raise SystemExit(f"{filename}: errores semánticos {checker.errors}")
+    return IRCode.gencode(ast)
+
+def count_steps(module, **kwargs):
+    machine = CountingMachine(module, **kwargs)
+    with redirect_stdout(io.StringIO()):
+        machine.run_function('main')
+    return machine.steps, machine.fused
+
+def time_run(module, repeat, machine_class=StackMachine, **kwargs):
+    best = float('inf')
+    for _ in range(repeat):
+        machine = machine_class(module, **kwargs)
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            machine.run_function('main')
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('samples', nargs='*', default=DEFAULT_SAMPLES)
+    ap.add_argument('-n', '--repeat', type=int, default=50, help='corridas por programa (se reporta la mejor)')
+    ap.add_argument('--fusion', action='store_true', help='comparar con y sin superinstrucciones')
+    ap.add_argument('--compiled', action='store_true', help='comparar el intérprete con el motor compilado')
+    ap.add_argument('--trace', action='store_true', help='comparar el intérprete con la compilación de ciclos calientes')
+    args = ap.parse_args(argv)
+
+    modules = [(os.path.basename(filename), compile_file(os.path.join(ROOT, filename)))
+               for filename in args.samples]
+    if args.fusion:
+        bench_fusion(modules, args.repeat)
+        return
+    if args.compiled:
+        bench_compiled(modules, args.repeat)
+        return
+    if args.trace:
+        bench_trace(modules, args.repeat)
+        return
+
+    print(f"{'programa':<24}{'instrucciones':>14}{'segundos':>12}{'instr/s':>14}")
+    for name, module in modules:
+        steps, _ = count_steps(module, fuse=False)
+        seconds = time_run(module, args.repeat, fuse=False)
+        print(f"{name:<24}{steps:>14}{seconds:>12.5f}{steps / seconds:>14,.0f}")
+
+def bench_fusion(modules, repeat):
+    print(f"{'programa':<24}{'despachos':>12}{'fusionado':>12}{'seg. base':>12}{'seg. fus.':>12}{'speedup':>9}  fusiones")
+    for name, module in modules:
+        plain, _ = count_steps(module, fuse=False)
+        fused, counts = count_steps(module, fuse=True)
+        base = time_run(module, repeat, fuse=False)
+        fast = time_run(module, repeat, fuse=True)
+        detail = ', '.join(f"{k}={v}" for k, v in sorted(counts.items()))
+        print(f"{name:<24}{plain:>12}{fused:>12}{base:>12.5f}{fast:>12.5f}{base / fast:>8.2f}x  {detail}")
+
+def bench_compiled(modules, repeat):
+    # La primera corrida compila y guarda el código en cada IRFunction;
+    # las cronometradas miden sólo la ejecución.
+    print(f"{'programa':<24}{'seg. pila':>12}{'seg. comp.':>12}{'speedup':>9}")
+    for name, module in modules:
+        base = time_run(module, repeat)
+        time_run(module, 1, CompiledMachine)
+        fast = time_run(module, repeat, CompiledMachine)
+        print(f"{name:<24}{base:>12.5f}{fast:>12.5f}{base / fast:>8.2f}x")
+
+def bench_trace(modules, repeat):
+    # Cada corrida cronometrada parte en frío: graba y compila sus trazas
+    print(f"{'programa':<24}{'seg. pila':>12}{'seg. traza':>12}{'speedup':>9}  trazas")
+    for name, module in modules:
+        base = time_run(module, repeat)
+        fast = time_run(module, repeat, TracingMachine)
+        machine = TracingMachine(module)
+        with redirect_stdout(io.StringIO()):
+            machine.run_function('main')
+        print(f"{name:<24}{base:>12.5f}{fast:>12.5f}{base / fast:>8.2f}x  {len(machine.traces)}")
+        for line in machine.report().splitlines():
+            print(f"    {line}")
+
+if __name__ == '__main__':
+    main()
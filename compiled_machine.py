@@ -0,0 +1,409 @@
+'''
+Motor de ejecución por compilación
+==================================
+
+Alternativa a la interpretación instrucción por instrucción de
+`StackMachine`: cada IRFunction se traduce una sola vez a una función
+Python generada, que luego se ejecuta directamente.
+
+La traducción aprovecha que el IR es estructurado y que la profundidad
+de la pila se conoce en cada instrucción:
+
+  - Cada posición de la pila se vuelve una variable Python (s0, s1, ...)
+    y cada slot local una variable (l0, l1, ...). Las globales se leen
+    de la lista G (la misma `globals` de la máquina).
+  - Las operaciones puras (constantes, lecturas de variables, aritmética
+    y comparaciones) no generan código: se acumulan como una expresión.
+    Antes de cualquier efecto (asignaciones, llamadas, memoria) las
+    expresiones pendientes se guardan en su variable de pila, de modo
+    que se respeta el orden de evaluación del IR.
+  - IF/ELSE/ENDIF se vuelven `if/else`, y LOOP/CBREAK/ENDLOOP un
+    `while` de Python (`while cond:` cuando la prueba no tiene efectos).
+
+El código objeto generado se guarda en `IRFunction.compiled`, así que
+varias máquinas sobre el mismo módulo lo comparten. Las llamadas entre
+funciones GoxLang son llamadas Python, por lo que `run_function` eleva
+temporalmente el límite de recursión.
+'''
+import math
+import sys
+
+from stack_machine import StackMachine
+
+class FunctionCompiler:
+    '''
+    Traduce el código IR de una IRFunction a código fuente Python.
+    '''
+    def __init__(self, func):
+        self.func = func
+        self.lines = []
+        self.indent = 1
+        self.stack = []       # (expresión, es_booleano) por posición de la pila
+        self.blocks = []      # Bloques if/while abiertos
+
+    @classmethod
+    def compile(cls, func):
+        if func.compiled is None:
+            source = cls(func).source()
+            func.compiled = compile(source, f'<gox {func.name}>', 'exec')
+        return func.compiled
+
+    def source(self):
+        for instr in self.func.code:
+            op = instr[0]
+            method = getattr(self, 'op_' + op, None)
+            if method is None:
+                raise Exception(f"Instrucción no soportada: {op}")
+            method(*instr[1:])
+        if self.blocks:
+            raise Exception(f"Bloque de control sin cerrar en {self.func.name}")
+
+        nparams = len(self.func.parmnames)
+        params = ', '.join(f'l{i}' for i in range(nparams))
+        header = [f'def f_{self.func.name}({params}):']
+        others = [f'l{i}' for i in range(nparams, self.func.frame_size)]
+        if others:
+            header.append(f"    {' = '.join(others)} = 0")
+        return '\n'.join(header + self.lines) + '\n'
+
+    # Utilidades de emisión
+
+    def emit(self, line):
+        self.lines.append('    ' * self.indent + line)
+
+    def push(self, expr, boolean=False):
+        self.stack.append((expr, boolean))
+
+    def pop(self):
+        if not self.stack:
+            raise Exception(f"Pila vacía en {self.func.name}")
+        return self.stack.pop()
+
+    def value(self, entry):
+        # Materializa una comparación como entero 0/1
+        expr, boolean = entry
+        return f'(1 if {expr} else 0)' if boolean else expr
+
+    def settle(self):
+        # Guarda las expresiones pendientes en su variable de pila. Se
+        # recorre de abajo hacia arriba: una expresión sólo puede leer
+        # variables de pila de su posición o superiores.
+        for i, (expr, boolean) in enumerate(self.stack):
+            name = f's{i}'
+            if expr != name:
+                self.emit(f'{name} = {self.value((expr, boolean))}')
+                self.stack[i] = (name, False)
+
+    def result(self, expr):
+        # Asigna una expresión con efectos a la próxima posición de la pila
+        name = f's{len(self.stack)}'
+        self.emit(f'{name} = {expr}')
+        self.push(name)
+        return name
+
+    def open_block(self, kind, label=None):
+        self.blocks.append((kind, label, list(self.stack), len(self.lines)))
+        self.indent += 1
+
+    def close_block(self, kind):
+        if not self.blocks or self.blocks[-1][0] != kind:
+            raise Exception(f"Bloque {kind} mal anidado en {self.func.name}")
+        _, label, saved, start = self.blocks.pop()
+        if len(self.lines) == start:
+            self.emit('pass')
+        self.indent -= 1
+        if len(self.stack) != len(saved):
+            raise Exception(f"Profundidad de pila inconsistente en {self.func.name}")
+        self.stack = saved
+        return label
+
+    # Constantes y variables
+
+    def op_CONSTI(self, value):
+        self.push(repr(value))
+
+    def op_CONSTF(self, value):
+        value = float(value)
+        # repr de un infinito o NaN ('inf', 'nan') no es un literal de Python
+        self.push(repr(value) if math.isfinite(value) else f'float("{value!r}")')
+
+    def op_LOCAL_GET(self, name):
+        self.push(f'l{self.func.slot(name)}')
+
+    def op_LOCAL_SET(self, name):
+        entry = self.pop()
+        self.settle()
+        self.emit(f'l{self.func.slot(name)} = {self.value(entry)}')
+
+    def op_GLOBAL_GET(self, name):
+        self.push(f'G[{self.func.module.globals[name].slot}]')
+
+    def op_GLOBAL_SET(self, name):
+        entry = self.pop()
+        self.settle()
+        self.emit(f'G[{self.func.module.globals[name].slot}] = {self.value(entry)}')
+
+    def op_POP(self):
+        self.pop()
+
+    # Aritmética y comparaciones
+
+    def binop(self, fmt, boolean=False):
+        b = self.value(self.pop())
+        a = self.value(self.pop())
+        self.push(fmt.format(a=a, b=b), boolean)
+
+    def op_ADDI(self):
+        self.binop('({a} + {b})')
+
+    def op_SUBI(self):
+        self.binop('({a} - {b})')
+
+    def op_MULI(self):
+        self.binop('({a} * {b})')
+
+    def op_DIVI(self):
+        # El divisor se evalúa dos veces; se guarda antes si no es simple
+        b = self.value(self.pop())
+        if not b.isidentifier() and not b.lstrip('-').isdigit():
+            self.settle()
+            b = self.result(b)
+            self.pop()
+        a = self.value(self.pop())
+        self.push(f'({a} // {b} if {b} else 0)')
+
+    def op_NEGI(self):
+        self.push(f'(-{self.value(self.pop())})')
+
+    def op_MODI(self):
+        # Como en DIVI el divisor se evalúa dos veces; el dividendo, una
+        b = self.value(self.pop())
+        if not b.isidentifier() and not b.lstrip('-').isdigit():
+            self.settle()
+            b = self.result(b)
+            self.pop()
+        a = self.value(self.pop())
+        self.push(f'({a} % {b} if {b} else {a})')
+
+    def op_SHLI(self):
+        self.binop('({a} << {b})')
+
+    def op_SHRI(self):
+        self.binop('({a} >> {b})')
+
+    def compare(self, op):
+        self.binop('({a} %s {b})' % op, boolean=True)
+
+    def op_LTI(self):
+        self.compare('<')
+
+    def op_LEI(self):
+        self.compare('<=')
+
+    def op_GTI(self):
+        self.compare('>')
+
+    def op_GEI(self):
+        self.compare('>=')
+
+    def op_EQI(self):
+        self.compare('==')
+
+    def op_NEI(self):
+        self.compare('!=')
+
+    def op_ANDI(self):
+        self.binop('({a} & {b})')
+
+    def op_ORI(self):
+        self.binop('({a} | {b})')
+
+    # Las variantes flotantes generan el mismo código Python, salvo la división
+
+    op_ADDF = op_ADDI
+    op_SUBF = op_SUBI
+    op_MULF = op_MULI
+    op_NEGF = op_NEGI
+
+    def op_DIVF(self):
+        b = self.value(self.pop())
+        if not b.isidentifier() and not b.lstrip('-').replace('.', '', 1).isdigit():
+            self.settle()
+            b = self.result(b)
+            self.pop()
+        a = self.value(self.pop())
+        self.push(f'({a} / {b} if {b} else 0.0)')
+
+    op_LTF = op_LTI
+    op_LEF = op_LEI
+    op_GTF = op_GTI
+    op_GEF = op_GEI
+    op_EQF = op_EQI
+    op_NEF = op_NEI
+
+    def op_ITOF(self):
+        self.push(f'float({self.value(self.pop())})')
+
+    def op_FTOI(self):
+        self.push(f'int({self.value(self.pop())})')
+
+    # Funciones
+
+    def op_CALL(self, name):
+        callee = self.func.module.functions[name]
+        nargs = len(callee.parmnames)
+        args = [self.value(self.pop()) for _ in range(nargs)][::-1]
+        self.settle()
+        self.result(f"f_{name}({', '.join(args)})")
+
+    def op_RET(self):
+        entry = self.pop()
+        self.emit(f'return {self.value(entry)}')
+
+    # Entrada/salida
+
+    def op_PRINTI(self):
+        self.emit(f"WRITE(f'{{{self.value(self.pop())}}}\\n')")
+
+    op_PRINTF = op_PRINTI
+
+    def op_PRINTB(self):
+        self.emit(f'WRITE(chr({self.value(self.pop())}))')
+
+    # Memoria
+
+    def address(self, addr):
+        # Deja la dirección en una variable y verifica que no sea negativa
+        if not addr.isidentifier():
+            name = f's{len(self.stack)}'
+            self.emit(f'{name} = {addr}')
+            addr = name
+        self.emit(f'if {addr} < 0: CHECK({addr})')
+        return addr
+
+    def poke(self, fmt):
+        val = self.value(self.pop())
+        addr = self.value(self.pop())
+        self.settle()
+        addr = self.address(addr)
+        for line in fmt.format(addr=addr, val=val).split('\n'):
+            self.emit(line)
+
+    def peek(self, fmt):
+        addr = self.value(self.pop())
+        self.settle()
+        addr = self.address(addr)
+        self.result(fmt.format(addr=addr))
+
+    def op_POKEI(self):
+        self.poke('try: MEM[{addr}] = {val}\n'
+                  'except (OverflowError, TypeError): M.check_value({val})')
+
+    def op_POKEB(self):
+        self.poke('MEM[{addr}] = {val} & 255')
+
+    def op_POKEF(self):
+        self.poke('M.fmemory[{addr}] = {val}')
+
+    def op_PEEKI(self):
+        self.peek('MEM[{addr}]')
+
+    def op_PEEKB(self):
+        self.peek('MEM[{addr}] & 255')
+
+    def op_PEEKF(self):
+        self.peek('M.fmemory[{addr}]')
+
+    def op_GROW(self):
+        size = self.value(self.pop())
+        self.settle()
+        self.result(f'M.grow({size})')
+
+    # Control estructurado
+
+    def op_IF(self):
+        cond, _ = self.pop()
+        self.settle()
+        self.emit(f'if {cond}:')
+        self.open_block('if')
+
+    def op_ELSE(self):
+        self.settle()
+        self.close_block('if')
+        self.emit('else:')
+        self.open_block('if')
+
+    def op_ENDIF(self):
+        self.settle()
+        self.close_block('if')
+
+    def op_LOOP(self, label):
+        self.settle()
+        self.emit('while True:')
+        self.open_block('loop', label)
+
+    def op_CBREAK(self, label):
+        cond, _ = self.pop()
+        self.settle()
+        kind, loop_label, saved, start = self.blocks[-1]
+        if kind == 'loop' and loop_label == label and len(self.lines) == start:
+            # La prueba no emitió código: se vuelve la condición del while
+            self.lines[start - 1] = self.lines[start - 1].replace('while True:', f'while {cond}:')
+        else:
+            self.check_loop(label)
+            self.emit(f'if not {cond}: break')
+
+    def op_BREAK(self, label):
+        self.check_loop(label)
+        self.settle()
+        self.emit('break')
+
+    def op_CONTINUE(self, label):
+        self.check_loop(label)
+        self.settle()
+        self.emit('continue')
+
+    def op_ENDLOOP(self, label):
+        self.settle()
+        self.check_loop(label)
+        self.close_block('loop')
+
+    def check_loop(self, label):
+        # Un break/continue de Python sólo alcanza al ciclo más interno
+        loops = [b for b in self.blocks if b[0] == 'loop']
+        if not loops or loops[-1][1] != label:
+            raise Exception(f"Salto al ciclo {label} no soportado en {self.func.name}")
+
+class CompiledMachine(StackMachine):
+    '''
+    Ejecuta un IRModule compilando cada función a Python. Comparte con
+    StackMachine la memoria, las globales y la interfaz `run_function`.
+    '''
+    recursion_limit = 100000
+
+    def __init__(self, module, out=None, buffer_size=8192):
+        super().__init__(module, fuse=False, out=out, buffer_size=buffer_size)
+        self.namespace = {
+            'G': self.globals,
+            'MEM': self.memory,
+            'M': self,
+            'CHECK': self.check_address,
+            'WRITE': self.output.write,
+        }
+        for func in module.functions.values():
+            exec(FunctionCompiler.compile(func), self.namespace)
+
+    def function(self, func_name):
+        return self.namespace[f'f_{func_name}']
+
+    def run_function(self, func_name, args=None):
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(limit, self.recursion_limit))
+        try:
+            result = self.function(func_name)(*(args or []))
+        except IndexError:
+            raise Exception(f"Acceso a memoria fuera de rango (tamaño {len(self.memory)})")
+        finally:
+            sys.setrecursionlimit(limit)
+            self.output.flush()
+        self.stack.append(result)
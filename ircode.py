@@ -56,6 +56,10 @@ nuestro Código IR:
     DIVI                     ; Dividir los dos elementos superiores de la pila
     ANDI                     ; AND bit a bit
     ORI                      ; OR bit a bit
+    NEGI                     ; Cambiar el signo del elemento superior de la pila
+    MODI                     ; Resto (a - b * (a / b); con b == 0 da a)
+    SHLI                     ; Desplazamiento a la izquierda
+    SHRI                     ; Desplazamiento a la derecha (redondea hacia abajo, como DIVI)
     LTI                      : <
     LEI                      : <=
     GTI                      : >
@@ -73,6 +77,7 @@ nuestro Código IR:
     SUBF                     ; Restar los dos elementos superiores de la pila
     MULF                     ; Multiplicar los dos elementos superiores de la pila
     DIVF                     ; Dividir los dos elementos superiores de la pila
+    NEGF                     ; Cambiar el signo del elemento superior de la pila
     LTF                      : <
     LEF                      : <=
     GTF                      : >
@@ -100,6 +105,11 @@ nuestro Código IR:
     GLOBAL_GET name          ; Leer una variable global a la pila
     GLOBAL_SET name          ; Guardar una variable global desde la pila
 
+    ; Cada parámetro y local de una función, y cada global del módulo,
+    ; tiene además un slot numérico (ver `resolve_slots`). El código IR
+    ; conserva los nombres para que sea legible; la máquina los traduce
+    ; a slots una sola vez al cargar la función.
+
     ; Llamadas y retorno de funciones.
     ; Las funciones se referencian por nombre. Tu generador de código deberá
     ; encontrar alguna manera de gestionar esos nombres.
@@ -111,13 +121,19 @@ nuestro Código IR:
     ELSE                     ; Comienza la parte "alternativa" de un "if"
     ENDIF                    ; Fin de una instrucción "if"
 
-    LOOP                     ; Inicio de un ciclo
-    CBREAK                   ; Ruptura condicional. Prueba en la pila
-    CONTINUE                 ; Regresa al inicio del ciclo
-    ENDLOOP                  ; Fin del ciclo
+    LOOP label               ; Inicio de un ciclo
+    CBREAK label             ; Ruptura condicional. Prueba en la pila
+    BREAK label              ; Ruptura incondicional
+    CONTINUE label           ; Regresa al inicio del ciclo
+    ENDLOOP label            ; Fin del ciclo
+
+    Las instrucciones de ciclo llevan la etiqueta del ciclo al que
+    pertenecen (un entero único dentro de la función). Así un `break`
+    o `continue` dentro de ciclos anidados queda ligado a su ciclo en
+    tiempo de compilación.
 
     ; Memoria
-    GROW                     ; Incrementar memoria (tamaño en la pila) (retorna nuevo tamaño)
+    GROW                     ; Incrementar memoria (tamaño en la pila) (retorna la dirección base del bloque nuevo)
 
 Una palabra sobre el acceso a memoria... las instrucciones PEEK y POKE
 se usan para acceder a direcciones de memoria cruda. Ambas instrucciones
@@ -126,6 +142,10 @@ la instrucción POKE, el valor a almacenar se apila después de la dirección
 El orden es importante y es fácil equivocarse. Así que presta mucha
 atención a eso.
 
+La escritura usa POKEI, POKEF o POKEB según el tipo del valor. Una
+lectura `addr es PEEKI; para leer la celda como flotante o como byte se
+escribe float(`addr) o char(`addr), que generan PEEKF y PEEKB.
+
 Su tarea
 =========
 Su tarea es la siguiente: Escribe código que recorra la estructura del
@@ -197,25 +217,25 @@ from rich   import print
 from typing import List
 
 from parse.model  import Assignment, Print, If, While, Break, Continue, Return, Visitor , Variable, Function, Integer, Float, Char, Bool, BinOp, UnaryOp, TypeCast, FunctionCall, NamedLocation, MemoryLocation
-from parse.parse import generate_ast_json
+from parse.parse import parse_source
 from semantic.check import Checker
-
-class Visitor:
-    def visit(self, node, env):
-        method_name = 'visit_' + node.__class__.__name__
-        visitor = getattr(self, method_name, self.generic_visit)
-        return visitor(node, env)
-
-    def generic_visit(self, node, env):
-        raise Exception(f'No visit method defined for {node.__class__.__name__}')
+from semantic.symtab import Binding
+from semantic.typesys import OP_MAP, typename
 
 class IRModule:
     def __init__(self):
         self.functions = {}
         self.globals = {}
-
-    def add_global(self, name, type_):
-        self.globals[name] = IRGlobal(name, type_)
+        self.global_slots = 0   # Tamaño de la lista de globales (los slots pueden no ser contiguos)
+
+    def add_global(self, name, type_, slot=None):
+        # `slot` viene del Binding del Checker; sin él se numera en orden
+        glob = self.globals.get(name)
+        if glob is None:
+            glob = self.globals[name] = IRGlobal(name, type_, self.global_slots if slot is None else slot)
+            self.global_slots = max(self.global_slots, glob.slot + 1)
+        else:
+            glob.type = type_
 
     def dump(self):
         print("MODULE:::")
@@ -225,12 +245,13 @@ class IRModule:
             func.dump()
 
 class IRGlobal:
-    def __init__(self, name, type):
+    def __init__(self, name, type, slot=0):
         self.name = name
         self.type = type
+        self.slot = slot
 
     def dump(self):
-        print(f"GLOBAL::: {self.name}: {self.type}")
+        print(f"GLOBAL::: {self.name}: {self.type} (slot {self.slot})")
 
 class IRFunction:
     def __init__(self, module, name, parmnames, parmtypes, return_type, imported=False):
@@ -243,10 +264,33 @@ class IRFunction:
         self.return_type = return_type
         self.imported = imported
         self.locals = {}
+        self.slots = {}         # nombre -> slot en el frame (parámetros primero)
+        self.frame_size = 0     # Tamaño del frame (los slots pueden no ser contiguos)
         self.code = []
-
-    def new_local(self, name, type):
+        self.targets = None     # Tabla de saltos (la resuelve la máquina al cargar)
+        self.compiled = None    # Código Python generado (ver compiled_machine.py)
+        self.labels = 0
+        for pname, ptype in zip(parmnames, parmtypes):
+            self.new_local(pname, ptype)
+
+    def new_local(self, name, type, slot=None):
+        # `slot` viene del Binding del Checker; sin él se numera en orden
         self.locals[name] = type
+        slot = self.slots.setdefault(name, self.frame_size if slot is None else slot)
+        self.frame_size = max(self.frame_size, slot + 1)
+
+    def slot(self, name):
+        '''
+        Slot de una variable local. Si el nombre no fue declarado (el
+        generador emite LOCAL_* como último recurso) se le asigna uno.
+        '''
+        if name not in self.slots:
+            self.new_local(name, 'I')
+        return self.slots[name]
+
+    def new_label(self):
+        self.labels += 1
+        return self.labels
 
     def append(self, instr):
         self.code.append(instr)
@@ -260,6 +304,20 @@ class IRFunction:
         for instr in self.code:
             print(instr)
 
+def resolve_slots(module: IRModule):
+    '''
+    Pasada de resolución de variables. Los parámetros, locales declaradas
+    y globales ya reciben un slot al registrarse; aquí se recorre el
+    código para dar slot también a las locales usadas sin declaración,
+    de modo que la máquina pueda usar frames de tamaño fijo.
+    '''
+    for func in module.functions.values():
+        for instr in func.code:
+            if instr[0] in ('LOCAL_GET', 'LOCAL_SET'):
+                func.slot(instr[1])
+            elif instr[0] in ('GLOBAL_GET', 'GLOBAL_SET') and instr[1] not in module.globals:
+                module.add_global(instr[1], 'I')
+
 _typemap = {
     'int': 'I',
     'float': 'F',
@@ -267,6 +325,24 @@ _typemap = {
     'char': 'I',
 }
 
+def irtype(name):
+    # Tipo IR ('I' o 'F') para un tipo de GoxLang tal como aparece en el AST
+    return _typemap.get(typename(name), 'I')
+
+def type_of(n):
+    # Tipo inferido por el Checker; sin chequeo previo se asume entero
+    return n.expr_type or 'int'
+
+def slot_of(n):
+    # Slot asignado por el Checker, o None si el AST no fue chequeado
+    return n.binding.slot if n.binding is not None else None
+
+_LOCAL_ACCESS = ('LOCAL_GET', 'LOCAL_SET')
+_GLOBAL_ACCESS = ('GLOBAL_GET', 'GLOBAL_SET')
+
+# Nodos que producen un valor en la pila
+_expressions = (Integer, Float, Char, Bool, BinOp, UnaryOp, TypeCast, FunctionCall, NamedLocation, MemoryLocation)
+
 class IRCode(Visitor):
     _binop_code = {
         ('int', '+', 'int'): 'ADDI',
@@ -297,20 +373,36 @@ class IRCode(Visitor):
         ('char', '>=', 'char'): 'GEI',
         ('char', '==', 'char'): 'EQI',
         ('char', '!=', 'char'): 'NEI',
+
+        ('bool', '&&', 'bool'): 'ANDI',
+        ('bool', '||', 'bool'): 'ORI',
+        ('bool', '==', 'bool'): 'EQI',
+        ('bool', '!=', 'bool'): 'NEI',
     }
 
     _unaryop_code = {
         ('+', 'int'): [],
         ('-', 'int'): [('CONSTI', -1), ('MULI',)],
+        ('+', 'float'): [],
+        ('-', 'float'): [('CONSTF', -1.0), ('MULF',)],
         ('!', 'bool'): [('CONSTI', -1), ('MULI',)],
         ('^', 'int'): [('GROW',)],
     }
 
+    # Lectura de memoria según el tipo de la celda (ver Checker.visit_TypeCast)
+    _peek_code = {
+        'char': ('PEEKB',),
+        'float': ('PEEKF',),
+    }
+
     _typecast_code = {
         ('int', 'float'): [('ITOF',)],
         ('float', 'int'): [('FTOI',)],
     }
 
+    def __init__(self):
+        self.loops = []        # Etiquetas de los ciclos abiertos (el último es el más interno)
+
     @classmethod
     def gencode(cls, node: List):
         ircode = cls()
@@ -319,7 +411,7 @@ class IRCode(Visitor):
         # Registrar variables globales
         for item in node:
             if isinstance(item, Variable):
-                module.add_global(item.name, _typemap.get(item.type, 'I'))
+                module.add_global(item.name, irtype(item.type), slot_of(item))
 
         # Función main que contiene todo el código
         func_main = IRFunction(module, 'main', [], [], 'I')
@@ -332,28 +424,49 @@ class IRCode(Visitor):
         # Código para funciones y demás sentencias globales
         for item in node:
             if not isinstance(item, Variable):
-                item.accept(ircode, func_main)
+                ircode.statement(item, func_main)
 
+        func_main.append(('CONSTI', 0))
         func_main.append(('RET',))
 
+        resolve_slots(module)
         return module
 
 
+    @staticmethod
+    def access(name, binding, func: IRFunction):
+        '''
+        Instrucciones (lectura, escritura) para un nombre. Con el Binding
+        del Checker no hace falta buscar; sin chequeo previo se resuelve
+        por nombre.
+        '''
+        if binding is not None:
+            return _GLOBAL_ACCESS if binding.scope == Binding.GLOBAL else _LOCAL_ACCESS
+        if name not in func.locals and name in func.module.globals:
+            return _GLOBAL_ACCESS
+        return _LOCAL_ACCESS
+
+    def statement(self, stmt, func: IRFunction):
+        stmt.accept(self, func)
+        if isinstance(stmt, _expressions):
+            func.append(('POP',))     # El valor de una expresión-sentencia se descarta
+
     def visit_Assignment(self, n: Assignment, func: IRFunction):
         if isinstance(n.location, MemoryLocation):
             n.location.address.accept(self, func)   # Apila la dirección primero
             n.expression.accept(self, func)         # Apila el valor después
-            func.append(('POKEI',))
+            expr_type = type_of(n.expression)
+            if expr_type == 'char':
+                func.append(('POKEB',))
+            elif expr_type == 'float':
+                func.append(('POKEF',))
+            else:
+                func.append(('POKEI',))
         else:
             n.expression.accept(self, func)
             if isinstance(n.location, NamedLocation):
                 name = n.location.name_or_expr
-                if name in func.locals:
-                    func.append(('LOCAL_SET', name))
-                elif name in func.module.globals:
-                    func.append(('GLOBAL_SET', name))
-                else:
-                    func.append(('LOCAL_SET', name))
+                func.append((self.access(name, n.location.binding, func)[1], name))
             else:
                 raise Exception(f"Ubicación de asignación no soportada: {type(n.location)}")
 
@@ -367,8 +480,11 @@ class IRCode(Visitor):
             func.append(('PRINTI',))
         else:
             n.expression.accept(self, func)
-            if isinstance(n.expression, Char):
+            expr_type = type_of(n.expression)
+            if expr_type == 'char':
                 func.append(('PRINTB',))
+            elif expr_type == 'float':
+                func.append(('PRINTF',))
             else:
                 func.append(('PRINTI',))
 
@@ -380,39 +496,48 @@ class IRCode(Visitor):
         n.condition.accept(self, func)
         func.append(('IF',))
         for stmt in n.then_branch:
-            stmt.accept(self, func)
+            self.statement(stmt, func)
         func.append(('ELSE',))
         for stmt in n.else_branch:
-            stmt.accept(self, func)
+            self.statement(stmt, func)
         func.append(('ENDIF',))
 
     def visit_While(self, n: While, func: IRFunction):
-        func.append(('LOOP',))
+        label = func.new_label()
+        self.loops.append(label)
+        func.append(('LOOP', label))
         n.condition.accept(self, func)
-        func.append(('CBREAK',))
+        func.append(('CBREAK', label))
         for stmt in n.body:
-            stmt.accept(self, func)
-        func.append(('ENDLOOP',))
+            self.statement(stmt, func)
+        func.append(('ENDLOOP', label))
+        self.loops.pop()
 
     def visit_Break(self, n: Break, func: IRFunction):
-        func.append(('CBREAK',))
+        func.append(('BREAK', self.loops[-1]))
 
     def visit_Continue(self, n: Continue, func: IRFunction):
-        func.append(('CONTINUE',))
+        func.append(('CONTINUE', self.loops[-1]))
 
     def visit_Return(self, n: Return, func: IRFunction):
         n.expression.accept(self, func)
         func.append(('RET',))
 
     def visit_Variable(self, n: Variable, func: IRFunction):
-    # Si es global (está en módulo), usar GLOBAL_SET
-        if n.name in func.module.globals:
+        if n.binding is not None:
+            is_global = n.binding.scope == Binding.GLOBAL
+            if is_global:
+                # También las declaradas dentro de bloques del nivel superior
+                func.module.add_global(n.name, irtype(n.type), n.binding.slot)
+        else:
+            is_global = n.name in func.module.globals
+        if is_global:
             if n.expression:
                 n.expression.accept(self, func)
                 func.append(('GLOBAL_SET', n.name))
         else:
             # Local
-            func.new_local(n.name, _typemap.get(n.type, 'I'))
+            func.new_local(n.name, irtype(n.type), slot_of(n))
             if n.expression:
                 n.expression.accept(self, func)
                 func.append(('LOCAL_SET', n.name))
@@ -422,19 +547,20 @@ class IRCode(Visitor):
     def visit_Function(self, n: Function, func: IRFunction):
         module = func.module
         parmnames = [p.name for p in n.params]
-        parmtypes = [_typemap.get(p.type, 'I') for p in n.params]
-        irfunc = IRFunction(module, n.name, parmnames, parmtypes, _typemap.get(n.return_type, 'I'))
+        parmtypes = [irtype(p.type) for p in n.params]
+        irfunc = IRFunction(module, n.name, parmnames, parmtypes, irtype(n.return_type))
 
         # Registrar variables locales explícitas
         for stmt in n.body:
             if isinstance(stmt, Variable):
-                irfunc.new_local(stmt.name, _typemap.get(stmt.type, 'I'))
+                irfunc.new_local(stmt.name, irtype(stmt.type), slot_of(stmt))
 
         for stmt in n.body:
-            stmt.accept(self, irfunc)
+            self.statement(stmt, irfunc)
 
-        # Asegurar que sólo un RET final
+        # Asegurar un RET final (con valor por omisión)
         if not irfunc.code or irfunc.code[-1][0] != 'RET':
+            irfunc.append(('CONSTF', 0.0) if irfunc.return_type == 'F' else ('CONSTI', 0))
             irfunc.append(('RET',))
 
     def visit_Integer(self, n: Integer, func: IRFunction):
@@ -450,24 +576,10 @@ class IRCode(Visitor):
         func.append(('CONSTI', 1 if n.value else 0))
 
     def visit_BinOp(self, n: BinOp, func: IRFunction):
-        OP_MAP = {
-            'PLUS': '+',
-            'MINUS': '-',
-            'TIMES': '*',
-            'DIVIDE': '/',
-            'LT': '<',
-            'LE': '<=',
-            'GT': '>',
-            'GE': '>=',
-            'EQ': '==',
-            'NE': '!=',
-            'LAND': '&&',
-            'LOR': '||',
-        }
         n.left.accept(self, func)
         n.right.accept(self, func)
-        left_type = 'int'  # simplificado
-        right_type = 'int'
+        left_type = type_of(n.left)
+        right_type = type_of(n.right)
         op = OP_MAP.get(n.op, n.op)
         ir_instr = self._binop_code.get((left_type, op, right_type))
         if ir_instr is None:
@@ -476,10 +588,7 @@ class IRCode(Visitor):
 
     def visit_UnaryOp(self, n: UnaryOp, func: IRFunction):
         n.expr.accept(self, func)
-        if n.op == 'GROW' or n.op == '^':
-            func.append(('GROW',))
-            return
-        ops = self._unaryop_code.get((n.op, 'int'))  # simplificado
+        ops = self._unaryop_code.get((OP_MAP.get(n.op, n.op), type_of(n.expr)))
         if ops is None:
             raise Exception(f"Operador unario no soportado: {n.op}")
         for op in ops:
@@ -487,7 +596,7 @@ class IRCode(Visitor):
 
     def visit_TypeCast(self, n: TypeCast, func: IRFunction):
         n.expr.accept(self, func)
-        ops = self._typecast_code.get(('int', 'float'))  # simplificado
+        ops = self._typecast_code.get((type_of(n.expr), typename(n.type)))
         if ops:
             for op in ops:
                 func.append(op)
@@ -500,19 +609,14 @@ class IRCode(Visitor):
     def visit_NamedLocation(self, n: NamedLocation, func: IRFunction):
         
         if isinstance(n.name_or_expr, str):
-            if n.name_or_expr in func.locals:
-                func.append(('LOCAL_GET', n.name_or_expr))
-            elif n.name_or_expr in func.module.globals:
-                func.append(('GLOBAL_GET', n.name_or_expr))
-            else:
-                func.append(('LOCAL_GET', n.name_or_expr))
+            func.append((self.access(n.name_or_expr, n.binding, func)[0], n.name_or_expr))
         else:
             n.name_or_expr.accept(self, func)
 
 
     def visit_MemoryLocation(self, n: MemoryLocation, func: IRFunction):
         n.address.accept(self, func)
-        func.append(('PEEKI',))
+        func.append(self._peek_code.get(type_of(n), ('PEEKI',)))
 
 import sys
 
@@ -520,12 +624,8 @@ def main(filename):
     with open(filename, encoding='utf-8') as f:
         source_code = f.read()
 
-    # Generar AST (y opcionalmente guardar JSON)
-    ast = generate_ast_json(source_code)
-    
     try:
-        generate_ast_json(source_code)
-        print("[bold green]AST generado en 'ast_output.json'")
+        ast = parse_source(source_code)
         # Analizar semánticamente
         checker = Checker.check(ast)
         if checker.errors:
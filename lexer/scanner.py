@@ -1,177 +1,222 @@
 from lexer.tokenLexer import Token
-from lexer.tokenType import TokenType, SINGLE_CHAR_TOKENS, KEYWORDS, TOKEN_LITERALS
+from lexer.tokenType import TokenType, TokenCode, SINGLE_CHAR_TOKENS, TWO_CHAR_TOKENS, KEYWORDS, TOKEN_LITERALS
+from bisect import bisect_left
+from sys import intern
+import codecs
+import mmap
 import re
 
-class Scanner:
-    def __init__(self, source: str, error_callback):
+CHUNK_SIZE = 1 << 16
+
+# Characters that must follow a match before it is trusted in the middle
+# of chunked input: a number followed by '.' is only an INTEGER once we
+# know no digit comes after the dot.
+LOOKAHEAD = 2
+
+def _alternation(lexemes) -> str:
+    # Longest lexemes first so that '==' wins over '='
+    return '|'.join(re.escape(lexeme) for lexeme in sorted(lexemes, key=len, reverse=True))
+
+# Lexeme -> int code. The keys double as the interned lexeme of each token.
+_OPERATOR_CODES = {lexeme: token_type.value for lexeme, token_type in {**SINGLE_CHAR_TOKENS, **TWO_CHAR_TOKENS}.items()}
+_OPERATOR_LEXEMES = {lexeme: lexeme for lexeme in _OPERATOR_CODES}
+_KEYWORD_CODES = {lexeme: token_type.value for lexeme, token_type in KEYWORDS.items()}
+
+# One precompiled alternation for every token class. The order of the
+# branches is the order in which the old scanner tried its rules.
+MASTER_PATTERN = re.compile('|'.join([
+    r'(?P<SPACE>[ \t\r\n]+)',
+    r'(?P<COMMENT>//[^\n]*)',
+    r'(?P<BLOCK>/\*)',
+    f'(?P<OP2>{_alternation(TWO_CHAR_TOKENS)})',
+    f'(?P<OP1>{_alternation(SINGLE_CHAR_TOKENS)})',
+    r'(?P<STRING>")',
+    f'(?P<NAME>{TOKEN_LITERALS[TokenType.IDENTIFIER]})',
+    f'(?P<FLOAT>{TOKEN_LITERALS[TokenType.FLOAT]})',
+    f'(?P<INTEGER>{TOKEN_LITERALS[TokenType.INTEGER]})',
+    f'(?P<CHAR>{TOKEN_LITERALS[TokenType.CHAR]})',
+]))
+
+def read_chunks(file, size: int = CHUNK_SIZE):
+    '''
+    Yields the contents of a text file in chunks of `size` characters.
+    '''
+    while True:
+        chunk = file.read(size)
+        if not chunk:
+            return
+        yield chunk
+
+def mmap_chunks(path: str, size: int = CHUNK_SIZE):
+    '''
+    Maps a UTF-8 file into memory and yields it decoded in chunks.
+    '''
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    with open(path, 'rb') as file:
+        if not file.seek(0, 2):
+            return          # Empty files can't be mapped
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for start in range(0, len(data), size):
+                yield decoder.decode(data[start:start + size])
+    yield decoder.decode(b'', final=True)
+
+class LineIndex:
+    '''
+    Maps source offsets to line numbers for one window of the source
+    (the whole source when it is given as a string). The newline offsets
+    are only collected the first time a line number is requested.
+    '''
+    def __init__(self, source: str, first_line: int = 1, base: int = 0, first_column: int = 1):
         self.source = source
+        self.first_line = first_line
+        self.first_column = first_column    # Column of source[0]
+        self.base = base            # Offset of source[0] in the whole input
+        self.offsets = None
+        self.numbers = None
+
+    def line(self, pos: int) -> int:
+        if self.offsets is None:
+            self.offsets = [m.start() for m in re.finditer('\n', self.source)]
+        return bisect_left(self.offsets, pos - self.base) + self.first_line
+
+    def position(self, pos: int) -> tuple[int, int]:
+        # (line, column), both starting at 1. The line numbers come from one
+        # shared list, so the AST nodes of a line don't each hold a new int.
+        if self.numbers is None:
+            if self.offsets is None:
+                self.offsets = [m.start() for m in re.finditer('\n', self.source)]
+            self.numbers = list(range(self.first_line, self.first_line + len(self.offsets) + 1))
+        pos -= self.base
+        index = bisect_left(self.offsets, pos)
+        if index:
+            return self.numbers[index], pos - self.offsets[index - 1]
+        return self.first_line, pos + self.first_column
+
+class Scanner:
+    '''
+    `source` is either the whole program as a string or an iterable of
+    string chunks (see `read_chunks`, `mmap_chunks` and `from_file`).
+    Chunked input is scanned through a sliding window, so only the text
+    of the tokens not yet consumed is kept in memory.
+    '''
+    def __init__(self, source, error_callback):
+        if isinstance(source, str):
+            self.chunks = iter(())
+            self.window = source
+            self.eof = True
+        else:
+            self.chunks = iter(source)
+            self.window = ''
+            self.eof = False
+        self.lines = LineIndex(self.window)
         self.tokens = []
-        self.start = 0
-        self.current = 0
-        self.line = 1
         self.error_callback = error_callback
         self.had_error = False
 
+    @classmethod
+    def from_file(cls, path: str, error_callback, chunk_size: int = CHUNK_SIZE, use_mmap: bool = False):
+        if use_mmap:
+            return cls(mmap_chunks(path, chunk_size), error_callback)
+        file = open(path, encoding='utf-8')
+        def chunks():
+            with file:
+                yield from read_chunks(file, chunk_size)
+        return cls(chunks(), error_callback)
+
     def scan_tokens(self) -> list[Token]:
-        while not self.is_at_end():
-            self.start = self.current
-            self.scan_token()
+        self.tokens = list(self.iter_tokens())
         return self.tokens
 
-    def is_at_end(self) -> bool:
-        return self.current >= len(self.source)
-
-    def scan_token(self):
-        c: str = self.peek()
-
-        # Handle comments
-        if c == '/':
-            self.advance()
-            if self.match('/'):
-                self.ignore_single_line_comment()
-                return
-            elif self.match('*'):
-                self.ignore_multi_line_comment()
-                return
+    def refill(self, pos: int):
+        # Drops the consumed text before `pos` and appends the next chunk
+        window = self.window
+        first_line = self.lines.first_line + window.count('\n', 0, pos)
+        newline = window.rfind('\n', 0, pos)
+        first_column = pos - newline if newline >= 0 else self.lines.first_column + pos
+        base = self.lines.base + pos
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.eof = True
+            chunk = ''
+        self.window = window[pos:] + chunk
+        self.lines = LineIndex(self.window, first_line, base, first_column)
+
+    def iter_tokens(self):
+        match = MASTER_PATTERN.match
+        keyword_codes, operator_codes, operator_lexemes = _KEYWORD_CODES, _OPERATOR_CODES, _OPERATOR_LEXEMES
+        IDENTIFIER, INTEGER, FLOAT = TokenCode.IDENTIFIER, TokenCode.INTEGER, TokenCode.FLOAT
+        window, lines, eof = self.window, self.lines, self.eof
+        base = lines.base
+        end = len(window)
+        pos = 0
+        while True:
+            if pos >= end:
+                if eof:
+                    return
+                self.refill(pos)
+                window, lines, eof = self.window, self.lines, self.eof
+                base, end, pos = lines.base, len(window), 0
+                continue
+            m = match(window, pos)
+            if not eof and (m is None or end - m.end() < LOOKAHEAD):
+                # The token may continue in the next chunk
+                self.refill(pos)
+                window, lines, eof = self.window, self.lines, self.eof
+                base, end, pos = lines.base, len(window), 0
+                continue
+            if m is None:
+                self.error(lines.line(base + pos), f"Unexpected character '{window[pos]}'")
+                pos += 1
+                continue
+            kind = m.lastgroup
+            start, pos = pos, m.end()
+
+            if kind == 'SPACE' or kind == 'COMMENT':
+                continue
+            text = m.group()
+            if kind == 'NAME':
+                text = intern(text)
+                yield Token(keyword_codes.get(text, IDENTIFIER), text, text, base + start, lines)
+            elif kind == 'OP1' or kind == 'OP2':
+                text = operator_lexemes[text]
+                yield Token(operator_codes[text], text, text, base + start, lines)
+            elif kind == 'INTEGER':
+                yield Token(INTEGER, text, int(text), base + start, lines)
+            elif kind == 'FLOAT':
+                yield Token(FLOAT, text, float(text), base + start, lines)
+            elif kind == 'CHAR':
+                token = self.char(text, base + start)
+                if token:
+                    yield token
             else:
-                self.add_token(TokenType.DIVIDE)
-                return
-
-        # Two-character tokens
-        if c == '!' and self.peek_next() == '=':
-            self.advance(); self.advance()
-            self.add_token(TokenType.NE)
-            return
-        elif c == '=' and self.peek_next() == '=':
-            self.advance(); self.advance()
-            self.add_token(TokenType.EQ)
-            return
-        elif c == '<' and self.peek_next() == '=':
-            self.advance(); self.advance()
-            self.add_token(TokenType.LE)
-            return
-        elif c == '>' and self.peek_next() == '=':
-            self.advance(); self.advance()
-            self.add_token(TokenType.GE)
-            return
-        elif c == '&' and self.peek_next() == '&':
-            self.advance(); self.advance()
-            self.add_token(TokenType.LAND)
-            return
-        elif c == '|' and self.peek_next() == '|':
-            self.advance(); self.advance()
-            self.add_token(TokenType.LOR)
-            return
-
-        # One-character tokens
-        if c in SINGLE_CHAR_TOKENS:
-            self.advance()
-            self.add_token(SINGLE_CHAR_TOKENS[c])
-            return
-        elif c == '\n':
-            self.advance()
-            self.line += 1
-            return
-        elif c in (' ', '\r', '\t'):
-            self.advance()
-            return
-        elif c == '"':
-            self.advance()
-            self.string()
-            return
-
-        # Identifiers and keywords
-        identifier = self.match_regex(TOKEN_LITERALS[TokenType.IDENTIFIER])
-        if identifier:
-            token_type = KEYWORDS.get(identifier, TokenType.IDENTIFIER)
-            self.add_token(token_type)
-            return
-
-        # Numbers
-        number = self.match_regex(TOKEN_LITERALS[TokenType.FLOAT]) or self.match_regex(TOKEN_LITERALS[TokenType.INTEGER])
-        if number:
-            token_type = TokenType.FLOAT if '.' in number else TokenType.INTEGER
-            try:
-                value = float(number) if '.' in number else int(number)
-            except ValueError:
-                self.error(self.line, f"Malformed number '{number}'")
-                value = None
-            self.add_token(token_type, value)
-            return
-
-        # Characters
-        char = self.match_regex(TOKEN_LITERALS[TokenType.CHAR])
-        if char:
-            try:
-                value = eval(char)
-                self.add_token(TokenType.CHAR, value)
-            except Exception:
-                self.error(self.line, f"Invalid character literal: {char}")
-            return
-
-        # If no rule matched, report unexpected character
-        self.advance()
-        self.error(self.line, f"Unexpected character '{c}'")
-
-    def advance(self) -> str:
-        self.current += 1
-        return self.source[self.current - 1]
-
-    def add_token(self, type: TokenType, literal=None):
-        text = self.source[self.start:self.current]
-        self.tokens.append(Token(type, text, literal, self.line))
-
-    def match(self, expected: str) -> bool:
-        if self.is_at_end():
-            return False
-        if self.source[self.current] != expected:
-            return False
-        self.current += 1
-        return True
-
-    def peek(self) -> str:
-        if self.is_at_end():
-            return '\0'
-        return self.source[self.current]
-
-    def peek_next(self) -> str:
-        if self.current + 1 >= len(self.source):
-            return '\0'
-        return self.source[self.current + 1]
-
-    def string(self):
-        while self.peek() != '"' and not self.is_at_end():
-            if self.peek() == '\n':
-                self.line += 1
-            self.advance()
-        if self.is_at_end():
-            self.error(self.line, "Unterminated string")
-            return
-        self.advance()  # Consume closing quotation marks
-        value = self.source[self.start + 1:self.current - 1]
-        self.add_token(TokenType.CHAR, value)
-
-    def match_regex(self, regex: str) -> str:
-        match = re.match(regex, self.source[self.start:])
-        if match:
-            self.current = self.start + len(match.group(0))
-            return match.group(0)
-        return ''
-
-    def ignore_single_line_comment(self):
-        while self.peek() != '\n' and not self.is_at_end():
-            self.advance()
-
-    def ignore_multi_line_comment(self):
-        while not (self.peek() == '*' and self.peek_next() == '/') and not self.is_at_end():
-            if self.peek() == '\n':
-                self.line += 1
-            self.advance()
-        if self.is_at_end():
-            self.error(self.line, "Unterminated multiline comment")
-            return
-        self.advance()  # Consume '*'
-        self.advance()  # Consume '/'
+                # Strings and block comments: look for the closing delimiter
+                delimiter = '"' if kind == 'STRING' else '*/'
+                close = window.find(delimiter, pos)
+                if close < 0 and not eof:
+                    self.refill(start)
+                    window, lines, eof = self.window, self.lines, self.eof
+                    base, end, pos = lines.base, len(window), 0
+                    continue
+                if close < 0:
+                    message = "Unterminated string" if kind == 'STRING' else "Unterminated multiline comment"
+                    self.error(lines.line(base + end), message)
+                    pos = end
+                    continue
+                pos = close + len(delimiter)
+                if kind == 'STRING':
+                    text = window[start:pos]
+                    yield Token(TokenCode.CHAR, text, text[1:-1], base + start, lines)
+
+    def char(self, text: str, pos: int):
+        # Either 'c' or '\xHH'
+        if len(text) == 3 and text[1] not in "\\'":
+            value = text[1]
+        elif len(text) == 6:
+            value = chr(int(text[3:5], 16))
+        else:
+            self.error(self.lines.line(pos), f"Invalid character literal: {text}")
+            return None
+        return Token(TokenCode.CHAR, text, value, pos, self.lines)
 
     def error(self, line, message):
         self.error_callback(line, message)
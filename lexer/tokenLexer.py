@@ -1,11 +1,36 @@
-from lexer.tokenType import TokenType
+from lexer.tokenType import TokenType, LITERAL_CODES
 
 class Token:
-    def __init__(self, token_type: TokenType, lexeme: str, literal, line: int):
-        self.token_type = token_type
+    '''
+    Compact token: `type` is the int code of its TokenType (see TokenCode),
+    `value` is the literal for numbers and chars and the interned lexeme
+    otherwise. The line is computed on demand from `pos` and `lines`.
+    '''
+    __slots__ = ('type', 'value', 'lexeme', 'pos', 'lines')
+
+    def __init__(self, type: int, lexeme: str, value, pos: int = None, lines=None):
+        self.type = type
         self.lexeme = lexeme
-        self.literal = literal
-        self.line = line
+        self.value = value
+        self.pos = pos          # Offset of the token in the source
+        self.lines = lines      # LineIndex of the window the token came from
+
+    @property
+    def line(self) -> int:
+        return self.lines.line(self.pos) if self.lines is not None else None
+
+    @property
+    def position(self) -> tuple:
+        # (line, column) of the first character
+        return self.lines.position(self.pos) if self.lines is not None else (None, None)
+
+    @property
+    def token_type(self) -> TokenType:
+        return TokenType(self.type)
+
+    @property
+    def literal(self):
+        return self.value if self.type in LITERAL_CODES else None
 
     def to_string(self):
         return f"{self.token_type.name} {self.lexeme} {self.literal}"
@@ -59,6 +59,11 @@ SINGLE_CHAR_TOKENS = {
     '`': TokenType.DEREF, '>': TokenType.GT, '^': TokenType.GROW
 }
 
+TWO_CHAR_TOKENS = {
+    '!=': TokenType.NE, '==': TokenType.EQ, '<=': TokenType.LE,
+    '>=': TokenType.GE, '&&': TokenType.LAND, '||': TokenType.LOR
+}
+
 TOKEN_LITERALS = {
     TokenType.IDENTIFIER: r'[a-zA-Z_][a-zA-Z0-9_]*',
     TokenType.INTEGER: r'-?\d+',
@@ -86,3 +91,17 @@ KEYWORDS = {
     'true': TokenType.TRUE,
     'false': TokenType.FALSE
 }
+
+class TokenCode:
+    '''
+    The TokenType values as plain ints (TokenCode.PLUS == TokenType.PLUS.value).
+    Tokens store these codes so the parser compares ints, not Enum members.
+    '''
+
+for _token_type in TokenType:
+    setattr(TokenCode, _token_type.name, _token_type.value)
+
+# Code -> name, used where the AST keeps the type name ("INT", "PLUS", ...)
+TOKEN_NAMES = {token_type.value: token_type.name for token_type in TokenType}
+
+LITERAL_CODES = frozenset({TokenCode.INTEGER, TokenCode.FLOAT, TokenCode.CHAR})
@@ -1,35 +1,82 @@
 import sys
-from parse.parse import generate_ast_json  # tu función para parsear
+import argparse
+from parse.parse import parse_file, write_ast_json
+from parse.astbin import write_ast_binary
 from semantic.check import Checker
 from ircode import IRCode
+from optimize.constfold import ConstantFolder
+from optimize.deadcode import DeadCode
+from optimize.inline import Inliner
+from optimize.licm import LoopInvariants
+from optimize.strength import StrengthReduction
+from optimize.cse import CommonSubexpressions
+from optimize.report import instruction_counts, print_report, print_inlined, print_cse
 from stack_machine import StackMachine
+from compiled_machine import CompiledMachine
+from tracing_machine import TracingMachine
 from rich import print
 
+ENGINES = {
+    'stack': StackMachine,
+    'compiled': CompiledMachine,
+    'trace': TracingMachine,
+}
+
 def main():
     try:
-        if len(sys.argv) != 2:
-            print("Uso: python main.py archivo.gox")
-            sys.exit(1)
-
-        filename = sys.argv[1]
-
-        with open(filename, encoding='utf-8') as f:
-            source_code = f.read()
+        ap = argparse.ArgumentParser(description="Compilador de GoxLang")
+        ap.add_argument('filename', help="archivo .gox a compilar")
+        ap.add_argument('--engine', choices=ENGINES, default='stack',
+                        help="motor de ejecución (stack: intérprete, compiled: traducción a Python, "
+                             "trace: intérprete que compila los ciclos calientes)")
+        ap.add_argument('--buffer-size', type=int, default=8192,
+                        help="caracteres de salida acumulados antes de escribir (0: sin búfer)")
+        ap.add_argument('--mmap', action='store_true', help="leer el fuente con mmap")
+        ap.add_argument('--ast-json', nargs='?', const='ast_output.json', metavar='RUTA',
+                        help="guardar el AST como JSON (por defecto en ast_output.json)")
+        ap.add_argument('--ast-bin', metavar='RUTA', help="guardar el AST en formato binario compacto")
+        ap.add_argument('--no-opt', action='store_true', help="generar el IR sin optimizar")
+        ap.add_argument('--opt-report', action='store_true',
+                        help="mostrar cuántas instrucciones IR elimina la optimización en cada función")
+        ap.add_argument('--inline-budget', type=int, default=12, metavar='N',
+                        help="expandir en línea las funciones hoja de hasta N instrucciones "
+                             "(2N dentro de un ciclo; 0: no expandir)")
+        args = ap.parse_args()
 
-        # Parse y análisis semántico
-        ast = generate_ast_json(source_code)
+        # Parse (leyendo el archivo por trozos) y análisis semántico
+        ast = parse_file(args.filename, use_mmap=args.mmap)
+        if args.ast_json:
+            write_ast_json(ast, args.ast_json)
+        if args.ast_bin:
+            write_ast_binary(ast, args.ast_bin)
         checker = Checker.check(ast)
         if checker.errors:
             print("Errores semánticos detectados, no se genera código intermedio.")
             sys.exit(1)
 
-        # Generar IR
+        # Optimizar el AST, generar IR y optimizar el IR. IRCode no modifica
+        # el AST, así que el IR sin optimizar para el reporte sale del mismo árbol.
+        if args.opt_report:
+            before = instruction_counts(IRCode.gencode(ast))
+        if not args.no_opt:
+            ConstantFolder.fold(ast)
         module = IRCode.gencode(ast)
+        if not args.no_opt:
+            inliner = Inliner.inline(module, budget=args.inline_budget)
+            StrengthReduction.reduce(module)
+            LoopInvariants.hoist(module)
+            cse = CommonSubexpressions.eliminate(module)
+            DeadCode.eliminate(module)
         module.dump()
+        if args.opt_report:
+            print_report(before, instruction_counts(module))
+            if not args.no_opt:
+                print_inlined(inliner.sites)
+                print_cse(cse.eliminated)
 
         # Ejecutar máquina de pila
         print("[green]========================================")
-        machine = StackMachine(module)
+        machine = ENGINES[args.engine](module, buffer_size=args.buffer_size)
         machine.run_function('main')
     except SyntaxError as e:
         print(f"[red]Error de sintaxis: {e}")
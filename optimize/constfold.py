@@ -0,0 +1,290 @@
+# constfold.py
+'''
+Plegado y propagación de constantes
+===================================
+
+Pasada sobre el AST ya chequeado, entre `Checker.check` e
+`IRCode.gencode`. Usa las anotaciones que deja el Checker (`binding` y
+`expr_type`) y reescribe el árbol en el lugar:
+
+  - Pliega las subexpresiones cuyos operandos son literales:
+    `2 * 3` -> `6`, `float(4)` -> `4.0`, `1 < 2` -> `true`.
+  - Propaga las `const` cuyo inicializador queda como literal: cada uso
+    pasa a ser una copia del literal y la declaración desaparece (ya
+    nadie lee la variable).
+  - Simplifica identidades algebraicas: `x + 0`, `x - 0`, `x * 1`,
+    `x / 1`, `-(-x)`, `x && true`, `x || false`... Las que descartan un
+    operando (`x * 0`, `false && x`) sólo se aplican si ese operando no
+    tiene efectos (llamadas, `^`, lecturas de memoria): en el IR `&&` y
+    `||` evalúan los dos lados.
+
+La aritmética reproduce la de la máquina (ver stack_machine.py): la
+división entera es `//` y dividir por cero da 0.
+
+    ConstantFolder.fold(ast)      # Reescribe `ast`; retorna el plegador
+
+`folder.stats` cuenta las expresiones plegadas, los usos de constantes
+propagados y las identidades simplificadas.
+'''
+import operator
+from collections import Counter
+from typing import List
+
+from parse.model import *
+from semantic.typesys import OP_MAP, typename
+
+LITERALS = (Integer, Float, Char, Bool)
+
+def _divide(a, b):
+    if isinstance(a, float) or isinstance(b, float):
+        return a / b if b != 0 else 0.0
+    return a // b if b != 0 else 0
+
+# Operador binario (símbolo) -> operación sobre los valores de los literales.
+# Los chars se comparan por su código, igual que como str de un carácter.
+_binops = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': _divide,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '==': operator.eq,
+    '!=': operator.ne,
+    '&&': lambda a, b: a and b,
+    '||': lambda a, b: a or b,
+}
+
+def literal(value, like: Node) -> Node:
+    '''
+    Literal con el valor `value` que reemplaza al nodo `like`: conserva
+    su posición en el fuente y lleva el tipo que usa IRCode.
+    '''
+    if isinstance(value, bool):
+        node, type_ = Bool(value), 'bool'
+    elif isinstance(value, int):
+        node, type_ = Integer(value), 'int'
+    elif isinstance(value, float):
+        node, type_ = Float(value), 'float'
+    else:
+        node, type_ = Char(value), 'char'
+    for name in SPAN_FIELDS:
+        setattr(node, name, getattr(like, name))
+    node.expr_type = type_
+    return node
+
+def is_value(node: Node, value) -> bool:
+    # Literal numérico o booleano con exactamente ese valor (0 == 0.0, no False)
+    return isinstance(node, LITERALS) and type(node.value) is type(value) and node.value == value
+
+def pure(node: Node) -> bool:
+    '''
+    True si evaluar la expresión no tiene efectos: se puede descartar
+    sin cambiar el programa.
+    '''
+    if isinstance(node, LITERALS):
+        return True
+    if isinstance(node, NamedLocation):
+        return isinstance(node.name_or_expr, str) or pure(node.name_or_expr)
+    if isinstance(node, BinOp):
+        return pure(node.left) and pure(node.right)
+    if isinstance(node, UnaryOp):
+        return OP_MAP.get(node.op, node.op) != '^' and pure(node.expr)
+    if isinstance(node, TypeCast):
+        return pure(node.expr)
+    return False        # FunctionCall, MemoryLocation
+
+class ConstantFolder(Visitor):
+    '''
+    Cada visit_* retorna el nodo que reemplaza al visitado: el mismo nodo
+    (con sus hijos ya plegados), uno nuevo, o None si la sentencia se
+    elimina.
+    '''
+    def __init__(self):
+        self.constants = {}     # Binding de una const -> literal de su valor
+        self.stats = Counter()
+
+    @classmethod
+    def fold(cls, program: List):
+        folder = cls()
+        # Mismo orden que gencode: primero las variables globales
+        result = [None] * len(program)
+        for i, stmt in enumerate(program):
+            if isinstance(stmt, Variable):
+                result[i] = stmt.accept(folder, None)
+        for i, stmt in enumerate(program):
+            if not isinstance(stmt, Variable):
+                result[i] = stmt.accept(folder, None)
+        program[:] = [stmt for stmt in result if stmt is not None]
+        return folder
+
+    def block(self, stmts: List) -> List:
+        result = []
+        for stmt in stmts:
+            stmt = stmt.accept(self, None)
+            if stmt is not None:
+                result.append(stmt)
+        return result
+
+    # Statements
+
+    def visit_Assignment(self, n: Assignment, env):
+        if isinstance(n.location, MemoryLocation):
+            n.location.address = n.location.address.accept(self, env)
+        n.expression = n.expression.accept(self, env)
+        return n
+
+    def visit_Print(self, n: Print, env):
+        n.expression = n.expression.accept(self, env)
+        return n
+
+    def visit_If(self, n: If, env):
+        n.condition = n.condition.accept(self, env)
+        n.then_branch = self.block(n.then_branch)
+        n.else_branch = self.block(n.else_branch)
+        return n
+
+    def visit_While(self, n: While, env):
+        n.condition = n.condition.accept(self, env)
+        n.body = self.block(n.body)
+        return n
+
+    def visit_Break(self, n: Break, env):
+        return n
+
+    def visit_Continue(self, n: Continue, env):
+        return n
+
+    def visit_Return(self, n: Return, env):
+        n.expression = n.expression.accept(self, env)
+        return n
+
+    # Declarations
+
+    def visit_Variable(self, n: Variable, env):
+        if n.expression is not None:
+            n.expression = n.expression.accept(self, env)
+            if n.is_const and n.binding is not None and isinstance(n.expression, LITERALS):
+                self.constants[n.binding] = n.expression
+                return None
+        return n
+
+    def visit_Function(self, n: Function, env):
+        n.body = self.block(n.body)
+        return n
+
+    def visit_Parameter(self, n: Parameter, env):
+        return n
+
+    # Expressions
+
+    def visit_Integer(self, n: Integer, env):
+        return n
+
+    def visit_Float(self, n: Float, env):
+        return n
+
+    def visit_Char(self, n: Char, env):
+        return n
+
+    def visit_Bool(self, n: Bool, env):
+        return n
+
+    def visit_BinOp(self, n: BinOp, env):
+        n.left = left = n.left.accept(self, env)
+        n.right = right = n.right.accept(self, env)
+        op = OP_MAP.get(n.op, n.op)
+        if isinstance(left, LITERALS) and isinstance(right, LITERALS) and op in _binops:
+            self.stats['folded'] += 1
+            return literal(_binops[op](left.value, right.value), n)
+        result = self.simplify(n, op, left, right)
+        if result is not n:
+            self.stats['simplified'] += 1
+        return result
+
+    def simplify(self, n: BinOp, op: str, left: Node, right: Node) -> Node:
+        # Identidades algebraicas; retorna `n` si ninguna aplica. El cero
+        # de `+` y `*` es sólo el entero: 0.0 no es neutro para -0.0 ni
+        # absorbente para NaN.
+        if op == '+':
+            if is_value(right, 0):
+                return left
+            if is_value(left, 0):
+                return right
+        elif op == '-':
+            if is_value(right, 0) or is_value(right, 0.0):
+                return left
+        elif op == '*':
+            if is_value(right, 1) or is_value(right, 1.0):
+                return left
+            if is_value(left, 1) or is_value(left, 1.0):
+                return right
+            if is_value(right, 0) and pure(left):
+                return right
+            if is_value(left, 0) and pure(right):
+                return left
+        elif op == '/':
+            if is_value(right, 1) or is_value(right, 1.0):
+                return left
+        elif op in ('&&', '||'):
+            # neutral: el valor que deja pasar al otro operando; el otro absorbe
+            neutral = op == '&&'
+            if is_value(right, neutral):
+                return left
+            if is_value(left, neutral):
+                return right
+            if is_value(right, not neutral) and pure(left):
+                return right
+            if is_value(left, not neutral) and pure(right):
+                return left
+        return n
+
+    def visit_UnaryOp(self, n: UnaryOp, env):
+        n.expr = expr = n.expr.accept(self, env)
+        op = OP_MAP.get(n.op, n.op)
+        if op == '+':
+            self.stats['simplified'] += 1
+            return expr
+        if op == '-':
+            if isinstance(expr, (Integer, Float)):
+                self.stats['folded'] += 1
+                return literal(-expr.value, n)
+            if isinstance(expr, UnaryOp) and OP_MAP.get(expr.op, expr.op) == '-':
+                self.stats['simplified'] += 1
+                return expr.expr
+        return n
+
+    def visit_TypeCast(self, n: TypeCast, env):
+        n.expr = expr = n.expr.accept(self, env)
+        source, target = expr.expr_type, typename(n.type)
+        if source == target:
+            self.stats['simplified'] += 1
+            return expr
+        if isinstance(expr, (Integer, Float)) and target in ('int', 'float'):
+            try:
+                value = float(expr.value) if target == 'float' else int(expr.value)
+            except (OverflowError, ValueError):
+                return n        # Un entero enorme o un infinito: el cast falla al ejecutarse
+            self.stats['folded'] += 1
+            return literal(value, n)
+        return n
+
+    def visit_FunctionCall(self, n: FunctionCall, env):
+        n.args = [arg.accept(self, env) for arg in n.args]
+        return n
+
+    def visit_NamedLocation(self, n: NamedLocation, env):
+        if not isinstance(n.name_or_expr, str):
+            n.name_or_expr = n.name_or_expr.accept(self, env)
+            return n
+        value = self.constants.get(n.binding) if n.binding is not None else None
+        if value is None:
+            return n
+        self.stats['propagated'] += 1
+        return literal(value.value, n)
+
+    def visit_MemoryLocation(self, n: MemoryLocation, env):
+        n.address = n.address.accept(self, env)
+        return n
@@ -0,0 +1,189 @@
+# cse.py
+'''
+Eliminación de subexpresiones comunes
+=====================================
+
+Pasada sobre el IR ya generado. Dentro de cada bloque de código recto
+se numeran los valores (value numbering): dos expresiones sin efectos
+(ver flow.PURE) reciben el mismo número si aplican la misma operación a
+los mismos números, y una lectura de variable recibe el mismo número
+mientras la variable no se escriba. Cuando una expresión ya se calculó,
+la primera aparición guarda su valor en una temporal (`cse.<n>`) y las
+siguientes la leen:
+
+    LOCAL_GET x                   LOCAL_GET x
+    LOCAL_GET x                   LOCAL_GET x
+    MULF                          MULF
+    ...                  =>       LOCAL_SET cse.1
+    LOCAL_GET x                   LOCAL_GET cse.1
+    LOCAL_GET x                   ...
+    MULF                          LOCAL_GET cse.1
+
+Los bloques son los del flujo estructurado: lo calculado antes de un IF
+sigue disponible en sus dos ramas y después del ENDIF, y lo calculado
+antes de un CBREAK sigue disponible en el resto de la vuelta; lo de una
+rama no sale de ella. Un LOOP o ENDLOOP empieza de cero: al principio
+del ciclo también se llega desde la vuelta anterior.
+
+Invalidan valores: LOCAL_SET y GLOBAL_SET de la variable y CALL de
+funciones que pueden escribir globales (flow.global_writes). La memoria
+no se toca (PEEK* no es puro).
+
+Guardar y volver a leer cuesta dos instrucciones, así que una expresión
+sólo se reemplaza si el código no crece: `x * x` repetida dos veces
+queda del mismo tamaño con una multiplicación menos.
+
+    pass_ = CommonSubexpressions.eliminate(module)
+    pass_.eliminated      # función -> operaciones eliminadas
+
+`pass_.stats` cuenta las expresiones (`expressions`) y operaciones
+(`operations`) eliminadas en total.
+'''
+from collections import Counter
+
+from optimize.flow import PURE, global_writes, stack_effect, temporary, invalidate
+
+LOADS = ('CONSTI', 'CONSTF', 'LOCAL_GET', 'GLOBAL_GET')
+
+class CommonSubexpressions:
+    def __init__(self, module):
+        self.module = module
+        self.stats = Counter()
+        self.eliminated = Counter()
+        self.writes = global_writes(module)
+
+    @classmethod
+    def eliminate(cls, module):
+        pass_ = cls(module)
+        for func in module.functions.values():
+            if not func.imported:
+                pass_.function(func)
+        return pass_
+
+    def function(self, func):
+        code = func.code
+        spans = self.number(code)
+        replace = self.select(spans)
+        if not replace:
+            return
+        leaders = {}            # fin de la primera aparición -> temporal
+        followers = {}          # inicio de una repetición -> (fin, temporal)
+        for first, rest in replace:
+            temp = temporary(func, 'cse', code[first[1]])
+            leaders[first[1]] = temp
+            for start, end in rest:
+                followers[start] = (end, temp)
+                ops = sum(1 for instr in code[start:end + 1] if instr[0] not in LOADS)
+                self.eliminated[func.name] += ops
+                self.stats['operations'] += ops
+            self.stats['expressions'] += len(rest)
+        result = []
+        i = 0
+        while i < len(code):
+            if i in followers:
+                end, temp = followers[i]
+                result.append(('LOCAL_GET', temp))
+                i = end + 1
+                continue
+            result.append(code[i])
+            if i in leaders:
+                result += [('LOCAL_SET', leaders[i]), ('LOCAL_GET', leaders[i])]
+            i += 1
+        func.code = result
+        invalidate(func)
+
+    def number(self, code):
+        '''
+        Numera los valores de `code`. Retorna {número: [(inicio, fin), ...]}
+        con las apariciones, en orden, de cada expresión sin efectos de
+        más de una instrucción.
+        '''
+        table = {}          # (op, arg, operandos) -> número
+        versions = Counter()  # Escrituras de cada variable hasta ahora
+        stack = []          # (número, inicio, fin) por valor en la pila; inicio None si tiene efectos
+        saved = []          # (tabla, pila) al entrar a cada IF
+        spans = {}
+        fresh = 0
+        for i, instr in enumerate(code):
+            op = instr[0]
+            pops, pushes = stack_effect(self.module, instr)
+            operands = stack[len(stack) - pops:] if pops else []
+            del stack[len(stack) - pops:]
+            if op in PURE:
+                if op == 'LOCAL_GET':
+                    key = (op, instr[1], versions['local', instr[1]])
+                elif op == 'GLOBAL_GET':
+                    key = (op, instr[1], versions['global', instr[1]])
+                elif op == 'CONSTF':
+                    key = (op, repr(instr[1]))      # 0.0 == -0.0, pero no son el mismo valor
+                else:
+                    key = (op, instr[1:], tuple(number for number, _, _ in operands))
+                start = self.span_start(operands, i)
+                if key not in table:
+                    fresh += 1
+                    table[key] = fresh
+                number = table[key]
+                if start is not None and start < i:
+                    spans.setdefault(number, []).append((start, i))
+                stack.append((number, start, i))
+                continue
+
+            if op == 'LOCAL_SET':
+                versions['local', instr[1]] += 1
+            elif op == 'GLOBAL_SET':
+                versions['global', instr[1]] += 1
+            elif op == 'CALL':
+                for name in self.writes.get(instr[1], self.module.globals):
+                    versions['global', name] += 1
+            elif op == 'IF':
+                saved.append((dict(table), list(stack)))
+            elif op == 'ELSE':
+                table, stack = dict(saved[-1][0]), list(saved[-1][1])
+            elif op == 'ENDIF':
+                table, stack = saved.pop()
+            elif op in ('LOOP', 'ENDLOOP'):
+                table = {}
+            for _ in range(pushes):
+                fresh += 1
+                stack.append((fresh, None, i))
+        return spans
+
+    @staticmethod
+    def span_start(operands, end):
+        '''
+        Inicio de la expresión que termina en `end`, o None si no es un
+        tramo continuo sin efectos: cada operando tiene que empezar justo
+        después del anterior y el último terminar en end - 1. Entre dos
+        operandos puede haber código con efectos (el cuerpo de una llamada
+        expandida en línea, por ejemplo) que no es parte de la expresión.
+        '''
+        if not operands:
+            return end
+        position = operands[0][1]
+        for _, start, last in operands:
+            if start is None or start != position:
+                return None
+            position = last + 1
+        return operands[0][1] if position == end else None
+
+    def select(self, spans):
+        '''
+        Elige qué expresiones repetidas reemplazar, las más grandes
+        primero: sus repeticiones cubren a las subexpresiones. Retorna
+        [((inicio, fin) de la primera, [(inicio, fin) de cada repetición]), ...].
+        '''
+        chosen = []
+        covered = set()
+        candidates = sorted((s for s in spans.values() if len(s) > 1),
+                            key=lambda s: s[0][0] - s[0][1])
+        for first, *rest in candidates:
+            if first[0] in covered:
+                continue
+            rest = [(start, end) for start, end in rest if start not in covered]
+            size = first[1] - first[0] + 1
+            if not rest or len(rest) * (size - 1) < 2:
+                continue
+            chosen.append((first, rest))
+            for start, end in rest:
+                covered.update(range(start, end + 1))
+        return chosen
@@ -0,0 +1,161 @@
+# deadcode.py
+'''
+Eliminación de código muerto
+============================
+
+Pasada sobre el IR ya generado (después de `IRCode.gencode`). En cada
+función, y hasta que no cambie nada:
+
+  - Ramas constantes: `CONSTI k; IF` conserva sólo la rama que se toma y
+    `CONSTI k; CBREAK` se vuelve nada (k != 0) o un BREAK (k == 0). El
+    plegado de constantes (constfold.py) deja estas condiciones.
+  - Código inalcanzable: lo que sigue a RET, BREAK o CONTINUE hasta el
+    fin del bloque, y lo que sigue a un IF/ELSE cuyas dos ramas terminan
+    así (también el `CONSTI 0; RET` que gencode agrega al final).
+  - Brazos vacíos: `ELSE; ENDIF` pierde el ELSE, un `IF; ENDIF` vacío
+    sólo descarta su condición y `LOOP; BREAK; ENDLOOP` desaparece.
+  - Asignaciones muertas: un LOCAL_SET cuyo valor ningún camino lee
+    (ver flow.live_locals) se vuelve POP, y una expresión sin efectos
+    seguida de POP se borra completa.
+  - Locales sin uso: las que ya no aparecen en el código salen de la
+    función (los parámetros se conservan).
+
+Las globales no se tocan: cualquier función puede leerlas.
+
+    DeadCode.eliminate(module)    # Modifica `module`; retorna la pasada
+
+`pass_.stats` cuenta cada tipo de eliminación.
+'''
+from collections import Counter
+
+from optimize.flow import pure_start, live_locals, invalidate
+from stack_machine import link
+
+class DeadCode:
+    def __init__(self):
+        self.stats = Counter()
+
+    @classmethod
+    def eliminate(cls, module):
+        pass_ = cls()
+        for func in module.functions.values():
+            pass_.function(func)
+        return pass_
+
+    def function(self, func):
+        code = func.code
+        while True:
+            size = len(code)
+            code = self.constant_branches(code)
+            code = self.unreachable(code)
+            code = self.empty_blocks(code)
+            code = self.dead_stores(code)
+            if len(code) == size:
+                break
+        func.code = code
+        self.unused_locals(func)
+        invalidate(func)
+
+    def constant_branches(self, code):
+        targets = link(code)
+        removed = [False] * len(code)
+        replaced = {}
+        for i in range(len(code) - 1):
+            if removed[i] or code[i][0] != 'CONSTI':
+                continue
+            op, taken = code[i + 1][0], code[i][1] != 0
+            if op == 'IF':
+                middle = targets[i + 1]             # ELSE, o ENDIF si no hay ELSE
+                end = targets[middle] if code[middle][0] == 'ELSE' else middle
+                if taken:
+                    dead = [i, i + 1, *range(middle, end + 1)]
+                else:
+                    dead = [*range(i, middle + 1), end]
+            elif op == 'CBREAK':
+                dead = [i, i + 1]
+                if not taken:
+                    replaced[i + 1] = ('BREAK', code[i + 1][1])
+                    dead = [i]
+            else:
+                continue
+            for k in dead:
+                removed[k] = True
+            self.stats['constant_branches'] += 1
+        return [replaced.get(i, instr) for i, instr in enumerate(code) if not removed[i]]
+
+    def unreachable(self, code):
+        result = []
+        ifs = []            # Por cada bloque abierto: None (ciclo o IF sin ELSE aún), o si su rama IF terminó
+        dead = False        # El control no llega a la posición actual
+        skipped = 0         # Profundidad de bloques anidados dentro de la zona muerta
+        for instr in code:
+            op = instr[0]
+            if dead:
+                if skipped or op not in ('ELSE', 'ENDIF', 'ENDLOOP'):
+                    if op in ('IF', 'LOOP'):
+                        skipped += 1
+                    elif op in ('ENDIF', 'ENDLOOP'):
+                        skipped -= 1
+                    self.stats['unreachable'] += 1
+                    continue
+            if op in ('IF', 'LOOP'):
+                ifs.append(None)
+            elif op == 'ELSE':
+                ifs[-1] = dead
+                dead = False
+            elif op == 'ENDIF':
+                # Inalcanzable si terminan las dos ramas (sin ELSE, el IF falso llega aquí)
+                dead = ifs.pop() is True and dead
+            elif op == 'ENDLOOP':
+                ifs.pop()
+                dead = False
+            elif op in ('RET', 'BREAK', 'CONTINUE'):
+                dead = True
+            result.append(instr)
+        return result
+
+    def empty_blocks(self, code):
+        result = []
+        for instr in code:
+            op = instr[0]
+            last = result[-1][0] if result else None
+            if op == 'ENDIF' and last == 'ELSE':
+                result[-1] = instr                   # ELSE; ENDIF -> ENDIF
+                self.stats['empty_arms'] += 1
+            elif op == 'ENDIF' and last == 'IF':
+                result[-1] = ('POP',)                # IF; ENDIF -> se descarta la condición
+                self.stats['empty_arms'] += 1
+            elif (op == 'ENDLOOP' and last == 'BREAK' and len(result) > 1
+                    and result[-2] == ('LOOP', instr[1]) and result[-1][1] == instr[1]):
+                del result[-2:]                      # Ciclo que sale en la primera vuelta
+                self.stats['empty_arms'] += 1
+            else:
+                result.append(instr)
+        return result
+
+    def dead_stores(self, code):
+        live = live_locals(code)
+        code = list(code)
+        for i, instr in enumerate(code):
+            if instr[0] == 'LOCAL_SET' and instr[1] not in live[i]:
+                code[i] = ('POP',)
+                self.stats['dead_stores'] += 1
+        # Una expresión sin efectos cuyo valor se descarta no hace falta
+        result = []
+        for instr in code:
+            if instr == ('POP',):
+                start = pure_start(result, len(result))
+                if start is not None:
+                    del result[start:]
+                    continue
+            result.append(instr)
+        return result
+
+    def unused_locals(self, func):
+        used = {instr[1] for instr in func.code if instr[0] in ('LOCAL_GET', 'LOCAL_SET')}
+        used.update(func.parmnames)
+        for name in [name for name in func.locals if name not in used]:
+            del func.locals[name]
+            del func.slots[name]
+            self.stats['unused_locals'] += 1
+        func.frame_size = max(func.slots.values(), default=-1) + 1
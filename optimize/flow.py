@@ -0,0 +1,202 @@
+# flow.py
+'''
+Análisis de flujo sobre el código IR de una función, para las pasadas
+que optimizan el IR (ver deadcode.py).
+
+El IR es estructurado: los saltos salen de `stack_machine.link`, que da
+para cada IF, ELSE, CBREAK, BREAK, CONTINUE y ENDLOOP el índice de la
+instrucción de destino. Igual que en la máquina, el control sigue en la
+instrucción posterior a ese destino.
+'''
+from stack_machine import link
+
+# Instrucciones sin efectos (no escriben variables ni memoria, no llaman
+# y no pueden fallar): opcode -> cuántos valores desapilan. Todas apilan
+# un valor. FTOI no está: int() de un infinito es un error en la máquina.
+# Los desplazamientos sólo aparecen con una cuenta constante no negativa
+# (ver strength.py).
+PURE = {
+    'CONSTI': 0, 'CONSTF': 0, 'LOCAL_GET': 0, 'GLOBAL_GET': 0,
+    'ADDI': 2, 'SUBI': 2, 'MULI': 2, 'DIVI': 2,
+    'ADDF': 2, 'SUBF': 2, 'MULF': 2, 'DIVF': 2,
+    'NEGI': 1, 'NEGF': 1, 'MODI': 2, 'SHLI': 2, 'SHRI': 2,
+    'LTI': 2, 'LEI': 2, 'GTI': 2, 'GEI': 2, 'EQI': 2, 'NEI': 2,
+    'LTF': 2, 'LEF': 2, 'GTF': 2, 'GEF': 2, 'EQF': 2, 'NEF': 2,
+    'ANDI': 2, 'ORI': 2, 'ITOF': 1,
+}
+
+def pure_start(code, end):
+    '''
+    Índice donde empieza la expresión sin efectos que deja el valor
+    consumido por code[end], o None si ese valor viene de una
+    instrucción con efectos (o de antes de una marca de control).
+    '''
+    needed = 1
+    i = end
+    while i > 0:
+        i -= 1
+        pops = PURE.get(code[i][0])
+        if pops is None:
+            return None
+        needed += pops - 1
+        if needed == 0:
+            return i
+    return None
+
+def successors(code, targets=None):
+    '''
+    Lista paralela a `code` con los índices a los que puede pasar el
+    control después de cada instrucción.
+    '''
+    if targets is None:
+        targets = link(code)
+    n = len(code)
+    result = []
+    for i, instr in enumerate(code):
+        op = instr[0]
+        follow = (i + 1,) if i + 1 < n else ()
+        if op in ('IF', 'CBREAK'):
+            result.append(follow + (targets[i] + 1,))
+        elif op in ('ELSE', 'BREAK', 'CONTINUE', 'ENDLOOP'):
+            result.append((targets[i] + 1,))
+        elif op == 'RET':
+            result.append(())
+        else:
+            result.append(follow)
+    return [tuple(s for s in succ if s < n) for succ in result]
+
+def live_locals(code, targets=None):
+    '''
+    Variables locales vivas a la salida de cada instrucción: las que
+    algún camino vuelve a leer (LOCAL_GET) antes de reescribirlas
+    (LOCAL_SET). Retorna una lista de frozensets paralela a `code`.
+    '''
+    succ = successors(code, targets)
+    bits = {}
+    for instr in code:
+        if instr[0] in ('LOCAL_GET', 'LOCAL_SET'):
+            bits.setdefault(instr[1], 1 << len(bits))
+    live_in = [0] * len(code)
+    live_out = [0] * len(code)
+    changed = True
+    while changed:
+        changed = False
+        for i in range(len(code) - 1, -1, -1):
+            out = 0
+            for s in succ[i]:
+                out |= live_in[s]
+            op = code[i][0]
+            if op == 'LOCAL_GET':
+                inn = out | bits[code[i][1]]
+            elif op == 'LOCAL_SET':
+                inn = out & ~bits[code[i][1]]
+            else:
+                inn = out
+            if inn != live_in[i] or out != live_out[i]:
+                live_in[i], live_out[i] = inn, out
+                changed = True
+    names = list(bits)
+    return [frozenset(names[k] for k in range(len(names)) if mask >> k & 1) for mask in live_out]
+
+def live_on_entry(code, targets=None):
+    '''Variables locales que `code` puede leer antes de escribirlas.'''
+    if not code:
+        return frozenset()
+    live = live_locals(code, targets)[0]
+    op = code[0][0]
+    if op == 'LOCAL_SET':
+        live = live - {code[0][1]}
+    elif op == 'LOCAL_GET':
+        live = live | {code[0][1]}
+    return live
+
+def global_writes(module):
+    '''
+    Globales que puede escribir cada función, directamente o a través
+    de las funciones que llama. Las importadas no tienen código visible:
+    se supone que escriben todas. Retorna {nombre: frozenset}.
+    '''
+    everything = frozenset(module.globals)
+    direct = {}
+    calls = {}
+    for name, func in module.functions.items():
+        direct[name] = everything if func.imported else {i[1] for i in func.code if i[0] == 'GLOBAL_SET'}
+        calls[name] = {i[1] for i in func.code if i[0] == 'CALL'}
+    writes = {name: set(names) for name, names in direct.items()}
+    changed = True
+    while changed:
+        changed = False
+        for name, callees in calls.items():
+            for callee in callees:
+                extra = writes.get(callee, everything) - writes[name]
+                if extra:
+                    writes[name] |= extra
+                    changed = True
+    return {name: frozenset(names) for name, names in writes.items()}
+
+# Instrucciones con efectos: opcode -> (valores que desapilan, valores que
+# apilan). CALL depende de la función (ver stack_effect).
+EFFECTS = {
+    'LOCAL_SET': (1, 0), 'GLOBAL_SET': (1, 0), 'POP': (1, 0), 'RET': (1, 0),
+    'PRINTI': (1, 0), 'PRINTF': (1, 0), 'PRINTB': (1, 0),
+    'POKEI': (2, 0), 'POKEF': (2, 0), 'POKEB': (2, 0),
+    'PEEKI': (1, 1), 'PEEKF': (1, 1), 'PEEKB': (1, 1),
+    'GROW': (1, 1), 'FTOI': (1, 1), 'IF': (1, 0), 'CBREAK': (1, 0),
+}
+
+def stack_effect(module, instr):
+    '''(valores que desapila, valores que apila) de una instrucción'''
+    op = instr[0]
+    if op in PURE:
+        return PURE[op], 1
+    if op == 'CALL':
+        return len(module.functions[instr[1]].parmnames), 1
+    return EFFECTS.get(op, (0, 0))
+
+CONTROL = {'IF', 'ELSE', 'ENDIF', 'LOOP', 'CBREAK', 'BREAK', 'CONTINUE', 'ENDLOOP', 'RET'}
+
+FLOAT_RESULTS = {'CONSTF', 'ADDF', 'SUBF', 'MULF', 'DIVF', 'NEGF', 'ITOF'}
+
+def operand_start(module, code, end):
+    '''
+    Como pure_start, pero la expresión puede tener efectos (llamadas,
+    asignaciones de un cuerpo expandido en línea...). Retorna None si
+    cruza una instrucción de control.
+    '''
+    needed = 1
+    i = end
+    while i > 0:
+        i -= 1
+        op = code[i][0]
+        if op in CONTROL:
+            return None
+        pops, pushes = stack_effect(module, code[i])
+        needed += pops - pushes
+        if needed == 0:
+            return i
+    return None
+
+def value_type(func, instr):
+    '''Tipo IR ('I' o 'F') del valor que apila una instrucción pura'''
+    op = instr[0]
+    if op == 'LOCAL_GET':
+        return func.locals.get(instr[1], 'I')
+    if op == 'GLOBAL_GET':
+        return func.module.globals[instr[1]].type
+    return 'F' if op in FLOAT_RESULTS else 'I'
+
+def temporary(func, prefix, last):
+    '''
+    Crea en `func` una local nueva `<prefix>.<n>` para guardar el valor
+    que deja la instrucción `last`. Retorna su nombre.
+    '''
+    n = 1
+    while f'{prefix}.{n}' in func.locals:
+        n += 1
+    func.new_local(f'{prefix}.{n}', value_type(func, last))
+    return f'{prefix}.{n}'
+
+def invalidate(func):
+    '''Llamar después de cambiar func.code: la máquina vuelve a enlazar y compilar'''
+    func.targets = None
+    func.compiled = None
@@ -0,0 +1,112 @@
+# inline.py
+'''
+Expansión en línea de funciones pequeñas
+========================================
+
+Pasada sobre el IR ya generado. Cada `CALL f` cuyo destino es barato se
+reemplaza por el cuerpo de `f`:
+
+    LOCAL_SET f.b.1        # Los argumentos ya están en la pila:
+    LOCAL_SET f.a.1        # se guardan en orden inverso
+    ... cuerpo de f con sus locales renombradas ...
+                           # El valor del RET final queda en la pila
+
+Las locales de la función llamada se vuelven locales nuevas de quien
+llama (`<función>.<nombre>.<sitio>`, que no puede chocar con un nombre
+de GoxLang) y las etiquetas de sus ciclos se renumeran. Las locales que
+el cuerpo lee antes de escribir se ponen en cero, como en un frame nuevo.
+
+Heurística de tamaño/costo: se expande una llamada si la función
+
+  - es una hoja (no llama a nadie, así que tampoco es recursiva),
+  - tiene un único RET y es su última instrucción, y
+  - su cuerpo no pasa de `budget` instrucciones; dentro de un ciclo, donde
+    la llamada se paga en cada iteración, el límite es `2 * budget`.
+
+Se repite hasta que no cambia nada: una función que sólo llamaba a hojas
+expandidas se vuelve hoja a su vez.
+
+    inliner = Inliner.inline(module, budget=12)
+    inliner.sites      # [(función, llamada), ...] en el orden en que se expandieron
+
+Conviene correr DeadCode después: limpia las asignaciones de argumentos
+que no se usan.
+'''
+from collections import Counter
+
+from optimize.flow import live_on_entry, invalidate
+
+class Inliner:
+    def __init__(self, module, budget):
+        self.module = module
+        self.budget = budget
+        self.stats = Counter()
+        self.sites = []
+
+    @classmethod
+    def inline(cls, module, budget=12):
+        inliner = cls(module, budget)
+        changed = budget > 0
+        while changed:
+            changed = False
+            for func in module.functions.values():
+                if not func.imported and inliner.function(func):
+                    changed = True
+        return inliner
+
+    def candidate(self, callee):
+        code = callee.code
+        if callee.imported or not code or code[-1] != ('RET',):
+            return False
+        ops = [instr[0] for instr in code]
+        return 'CALL' not in ops and ops.count('RET') == 1
+
+    def function(self, func):
+        functions = self.module.functions
+        result = []
+        depth = 0           # Ciclos abiertos en la posición actual
+        count = 0
+        for instr in func.code:
+            op = instr[0]
+            if op == 'LOOP':
+                depth += 1
+            elif op == 'ENDLOOP':
+                depth -= 1
+            elif op == 'CALL' and instr[1] != func.name:
+                callee = functions[instr[1]]
+                limit = self.budget * 2 if depth else self.budget
+                if self.candidate(callee) and len(callee.code) - 1 <= limit:
+                    count += 1
+                    result.extend(self.expand(func, callee))
+                    continue
+            result.append(instr)
+        if count:
+            func.code = result
+            invalidate(func)
+        return count
+
+    def expand(self, func, callee):
+        self.stats['inlined'] += 1
+        self.stats['instructions'] += len(callee.code) - 1
+        self.sites.append((func.name, callee.name))
+        site = self.stats['inlined']
+        names = {}
+        used = [instr[1] for instr in callee.code if instr[0] in ('LOCAL_GET', 'LOCAL_SET')]
+        for name in [*callee.locals, *used]:
+            if name not in names:
+                names[name] = f'{callee.name}.{name}.{site}'
+                func.new_local(names[name], callee.locals.get(name, 'I'))
+        labels = {instr[1]: func.new_label() for instr in callee.code if instr[0] == 'LOOP'}
+
+        code = [('LOCAL_SET', names[name]) for name in reversed(callee.parmnames)]
+        for name in live_on_entry(callee.code) - set(callee.parmnames):
+            zero = ('CONSTF', 0.0) if callee.locals.get(name) == 'F' else ('CONSTI', 0)
+            code += [zero, ('LOCAL_SET', names[name])]
+        for instr in callee.code[:-1]:
+            op = instr[0]
+            if op in ('LOCAL_GET', 'LOCAL_SET'):
+                instr = (op, names[instr[1]])
+            elif op in ('LOOP', 'ENDLOOP', 'CBREAK', 'BREAK', 'CONTINUE'):
+                instr = (op, labels[instr[1]])
+            code.append(instr)
+        return code
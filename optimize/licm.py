@@ -0,0 +1,126 @@
+# licm.py
+'''
+Movimiento de código invariante de los ciclos
+=============================================
+
+Pasada sobre el IR ya generado. En cada ciclo (LOOP ... ENDLOOP, es
+decir, cada `while`), las expresiones sin efectos (ver flow.PURE) cuyo
+valor no cambia entre iteraciones se calculan una sola vez antes del
+LOOP y se guardan en una local temporal (`inv.<n>`):
+
+    LOOP 2                        LOCAL_GET iy
+    ...                           ITOF
+    LOCAL_GET iy                  LOCAL_GET dy
+    ITOF                          MULF
+    LOCAL_GET dy         =>       LOCAL_SET inv.1
+    MULF                          LOOP 2
+    ...                           ...
+                                  LOCAL_GET inv.1
+
+Una expresión es invariante si sólo lee constantes, locales que el
+ciclo no asigna y globales que ni el ciclo ni las funciones que llama
+pueden escribir (flow.global_writes). Se mueve la expresión más grande
+posible; una constante o una local sola no ganan nada y se quedan, pero
+una global sola sí se copia a una local. Si la misma expresión aparece
+varias veces en el ciclo se usa una sola temporal.
+
+Calcularla antes del ciclo es seguro aunque el ciclo no dé ninguna
+vuelta o la expresión esté bajo un IF: las instrucciones puras no fallan
+(la división por cero da 0). Los ciclos internos se procesan primero,
+así que lo que sacan puede salir también del ciclo externo.
+
+    LoopInvariants.hoist(module)    # Modifica `module`; retorna la pasada
+
+`pass_.stats` cuenta las expresiones movidas (`hoisted`) y sus
+instrucciones (`instructions`).
+'''
+from collections import Counter
+
+from optimize.flow import PURE, pure_start, global_writes, temporary, invalidate
+
+class LoopInvariants:
+    def __init__(self, module):
+        self.module = module
+        self.stats = Counter()
+        self.writes = global_writes(module)
+
+    @classmethod
+    def hoist(cls, module):
+        pass_ = cls(module)
+        for func in module.functions.values():
+            if not func.imported:
+                pass_.function(func)
+        return pass_
+
+    def function(self, func):
+        # Etiquetas de los ciclos, los más anidados primero
+        depth = 0
+        loops = []
+        for instr in func.code:
+            if instr[0] == 'LOOP':
+                depth += 1
+                loops.append((depth, instr[1]))
+            elif instr[0] == 'ENDLOOP':
+                depth -= 1
+        if not loops:
+            return
+        for _, label in sorted(loops, key=lambda loop: -loop[0]):
+            func.code = self.loop(func, func.code, label)
+        invalidate(func)
+
+    def loop(self, func, code, label):
+        start = code.index(('LOOP', label))
+        end = code.index(('ENDLOOP', label), start)
+        body = code[start + 1:end]
+        local_sets = {instr[1] for instr in body if instr[0] == 'LOCAL_SET'}
+        global_sets = {instr[1] for instr in body if instr[0] == 'GLOBAL_SET'}
+        for instr in body:
+            if instr[0] == 'CALL':
+                global_sets |= self.writes.get(instr[1], frozenset(self.module.globals))
+
+        def invariant(instr):
+            op = instr[0]
+            if op == 'LOCAL_GET':
+                return instr[1] not in local_sets
+            if op == 'GLOBAL_GET':
+                return instr[1] not in global_sets
+            return op in PURE
+
+        # De atrás hacia adelante: la expresión que contiene a otra termina después
+        temps = {}          # expresión -> temporal
+        replaced = {}       # inicio -> (fin, temporal)
+        i = len(body)
+        while i > 0:
+            i -= 1
+            first = pure_start(body, i + 1)
+            if first is None:
+                continue
+            expr = tuple(body[first:i + 1])
+            if len(expr) == 1 and expr[0][0] != 'GLOBAL_GET':
+                continue
+            if not all(invariant(instr) for instr in expr):
+                continue
+            if expr not in temps:
+                temps[expr] = temporary(func, 'inv', expr[-1])
+                self.stats['hoisted'] += 1
+                self.stats['instructions'] += len(expr)
+            replaced[first] = (i, temps[expr])
+            i = first
+
+        if not replaced:
+            return code
+        header = []
+        for expr, temp in reversed(temps.items()):
+            header.extend(expr)
+            header.append(('LOCAL_SET', temp))
+        new_body = []
+        i = 0
+        while i < len(body):
+            if i in replaced:
+                last, temp = replaced[i]
+                new_body.append(('LOCAL_GET', temp))
+                i = last + 1
+            else:
+                new_body.append(body[i])
+                i += 1
+        return code[:start] + header + [code[start]] + new_body + code[end:]
@@ -0,0 +1,44 @@
+# report.py
+'''
+Resumen de las optimizaciones: cuántas instrucciones IR tiene cada
+función antes y después de optimizar, qué llamadas se expandieron en
+línea y cuántas operaciones repetidas se eliminaron.
+'''
+from collections import Counter
+
+from rich.table import Table
+from rich import print
+
+def instruction_counts(module) -> dict:
+    return {name: len(func.code) for name, func in module.functions.items()}
+
+def print_report(before: dict, after: dict, title: str = "Instrucciones IR"):
+    table = Table(title=title)
+    table.add_column('función', style='cyan')
+    table.add_column('antes', justify='right')
+    table.add_column('después', justify='right')
+    table.add_column('eliminadas', justify='right', style='bright_green')
+    for name in [*before, *(name for name in after if name not in before)]:
+        old, new = before.get(name, 0), after.get(name, 0)
+        table.add_row(name, str(old), str(new), str(old - new))
+    total_before, total_after = sum(before.values()), sum(after.values())
+    table.add_row('total', str(total_before), str(total_after), str(total_before - total_after), style='bold')
+    print(table)
+
+def print_inlined(sites: list, title: str = "Llamadas expandidas en línea"):
+    table = Table(title=title)
+    table.add_column('función', style='cyan')
+    table.add_column('llamada')
+    table.add_column('sitios', justify='right', style='bright_green')
+    for (caller, callee), count in Counter(sites).items():
+        table.add_row(caller, callee, str(count))
+    print(table)
+
+def print_cse(eliminated: dict, title: str = "Subexpresiones comunes"):
+    table = Table(title=title)
+    table.add_column('función', style='cyan')
+    table.add_column('operaciones eliminadas', justify='right', style='bright_green')
+    for name, count in eliminated.items():
+        table.add_row(name, str(count))
+    table.add_row('total', str(sum(eliminated.values())), style='bold')
+    print(table)
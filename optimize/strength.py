@@ -0,0 +1,159 @@
+# strength.py
+'''
+Reducción de fuerza
+===================
+
+Pasada sobre el IR ya generado que cambia operaciones generales por
+otras más baratas con el mismo resultado:
+
+    x * -1, x / -1, 0 - x      ->  NEGI      (NEGF para x * -1.0)
+    x * 2^k, 2^k * x           ->  x << k    (SHLI)
+    x / 2^k                    ->  x >> k    (SHRI)
+    a - b * (a / b)            ->  MODI      (también a - (a / b) * b)
+    x - (x >> k << k)          ->  x & (2^k - 1)   (ANDI; el resto por 2^k)
+    x / 2.0^k                  ->  x * 2.0^-k      (MULF)
+
+Son equivalencias exactas en la máquina: DIVI redondea hacia abajo
+(`//` de Python), igual que `>>` y que el `%` de MODI, y dividir por
+cero da 0, así que `a - b * (a / b)` con b == 0 da a, como MODI. El
+recíproco de una potencia de dos es exacto, así que multiplicar da el
+mismo flotante que dividir. En `a - b * (a / b)` los operandos repetidos
+tienen que ser iguales y sin efectos: MODI los evalúa una vez.
+
+Cada instrucción se revisa al agregarla, cuando sus operandos ya se
+redujeron: en `x - 8 * (x / 8)` la división y el producto ya son
+desplazamientos cuando llega la resta.
+
+    StrengthReduction.reduce(module)    # Modifica `module`; retorna la pasada
+
+`pass_.stats` cuenta cada tipo de reemplazo.
+'''
+import math
+from collections import Counter
+
+from optimize.flow import PURE, operand_start, invalidate
+
+BINARY = {'MULI', 'MULF', 'DIVI', 'DIVF', 'SUBI'}
+
+def constant(expr):
+    if len(expr) == 1 and expr[0][0] in ('CONSTI', 'CONSTF'):
+        return expr[0][1]
+    return None
+
+def log2(k):
+    # Exponente de k si es una potencia de dos entera mayor que 1
+    if type(k) is int and k > 1 and k & (k - 1) == 0:
+        return k.bit_length() - 1
+    return None
+
+def pure(expr):
+    return all(instr[0] in PURE for instr in expr)
+
+class StrengthReduction:
+    def __init__(self, module):
+        self.module = module
+        self.stats = Counter()
+
+    @classmethod
+    def reduce(cls, module):
+        pass_ = cls(module)
+        for func in module.functions.values():
+            if not func.imported:
+                pass_.function(func)
+        return pass_
+
+    def function(self, func):
+        code = []
+        changed = False
+        for instr in func.code:
+            code.append(instr)
+            while self.rewrite(code):
+                changed = True
+        if changed:
+            func.code = code
+            invalidate(func)
+
+    def operands(self, code):
+        # (primer operando, segundo operando) de la operación binaria en code[-1]
+        end = len(code) - 1
+        b = operand_start(self.module, code, end)
+        a = None if b is None else operand_start(self.module, code, b)
+        if a is None:
+            return None
+        return code[a:b], code[b:end]
+
+    def rewrite(self, code):
+        op = code[-1][0]
+        if op not in BINARY:
+            return False
+        operands = self.operands(code)
+        if operands is None:
+            return False
+        left, right = operands
+        method = getattr(self, 'reduce_' + op, None)
+        replacement = method(left, right) if method else None
+        if replacement is None:
+            return False
+        code[len(code) - 1 - len(left) - len(right):] = replacement
+        return True
+
+    def reduce_MULI(self, left, right):
+        for x, k in ((left, constant(right)), (right, constant(left))):
+            if k == -1:
+                self.stats['negate'] += 1
+                return x + [('NEGI',)]
+            if log2(k):
+                self.stats['shift'] += 1
+                return x + [('CONSTI', log2(k)), ('SHLI',)]
+        return None
+
+    def reduce_MULF(self, left, right):
+        for x, k in ((left, constant(right)), (right, constant(left))):
+            if k == -1.0:
+                self.stats['negate'] += 1
+                return x + [('NEGF',)]
+        return None
+
+    def reduce_DIVI(self, left, right):
+        k = constant(right)
+        if k == -1:
+            self.stats['negate'] += 1
+            return left + [('NEGI',)]
+        if log2(k):
+            self.stats['shift'] += 1
+            return left + [('CONSTI', log2(k)), ('SHRI',)]
+        return None
+
+    def reduce_DIVF(self, left, right):
+        k = constant(right)
+        if k and math.isfinite(k):
+            mantissa, exponent = math.frexp(k)
+            if abs(mantissa) == 0.5 and abs(exponent) < 1000:
+                self.stats['reciprocal'] += 1
+                return left + [('CONSTF', 1.0 / k), ('MULF',)]
+        return None
+
+    def reduce_SUBI(self, left, right):
+        if constant(left) == 0:
+            self.stats['negate'] += 1
+            return right + [('NEGI',)]
+        if not pure(left):
+            return None
+        # x - (x >> k << k): lo que queda de x - 2^k * (x / 2^k)
+        if len(right) > 4 and right[-1] == ('SHLI',) and right[-3] == ('SHRI',):
+            k = right[-2][1]
+            if right == left + [('CONSTI', k), ('SHRI',), ('CONSTI', k), ('SHLI',)]:
+                self.stats['mask'] += 1
+                return left + [('CONSTI', (1 << k) - 1), ('ANDI',)]
+        # a - b * (a / b), o a - (a / b) * b
+        if right[-1] != ('MULI',):
+            return None
+        product = self.operands(right)
+        if product is None:
+            return None
+        for quotient, divisor in (product[::-1], product):
+            if quotient[-1] == ('DIVI',) and pure(divisor):
+                if self.operands(quotient) == (left, divisor):
+                    self.stats['modulo'] += 1
+                    return left + divisor + [('MODI',)]
+        return None
@@ -0,0 +1,113 @@
+# astbin.py
+'''
+Formato binario compacto para guardar y volver a cargar un AST de GoxLang.
+
+El árbol se recorre en postorden y se guarda como dos secuencias planas:
+`ops`, un arreglo de códigos de 16 bits, y `values`, la lista de constantes
+(nombres, números, operadores...). Cada clase de nodo se registra una sola
+vez en `shapes`, con sus campos y su posición (ver model.SPAN_FIELDS). Todo se
+serializa con `marshal`, así que la carga no analiza texto, y ni la
+escritura ni la carga dependen de la profundidad del árbol.
+
+    ops[i] == CONST     apila el siguiente valor de `values`
+    ops[i] == LIST      desapila n elementos (n es el siguiente valor) y apila la lista
+    ops[i] >= FIRST     desapila los campos de shapes[ops[i] - FIRST] y apila el nodo
+
+El formato depende de la versión de `marshal` del intérprete: sirve para
+herramientas que reutilizan un AST ya analizado, no como formato de
+intercambio (para eso está `write_ast_json`).
+'''
+from array import array
+from typing import List
+import marshal
+
+from parse import model
+
+MAGIC = b'GOXAST\x01'
+
+CONST = 0
+LIST = 1
+FIRST = 2
+
+SCALARS = frozenset({type(None), bool, int, float, str})
+
+def dumps(ast: List) -> bytes:
+    shapes = []
+    tags = {}
+    ops = array('H')
+    values = []
+
+    # Recorrido en postorden con una pila explícita, así las cadenas largas
+    # de BinOp no dependen del límite de recursión. Las tuplas en la pila
+    # marcan el cierre de un nodo o de una lista (el AST no usa tuplas).
+    pending = [ast]
+    pop, push, extend = pending.pop, pending.append, pending.extend
+    emit, emit_value = ops.append, values.append
+    while pending:
+        value = pop()
+        kind = type(value)
+        if kind is tuple:
+            emit(value[0])
+            if len(value) == 2:
+                emit_value(value[1])
+        elif kind in SCALARS:
+            emit(CONST)
+            emit_value(value)
+        elif kind is list:
+            push((LIST, len(value)))
+            extend(reversed(value))
+        elif isinstance(value, model.Node):
+            shape = tags.get(kind)
+            if shape is None:
+                fields = kind.__slots__ + model.SPAN_FIELDS
+                shape = tags[kind] = ((FIRST + len(shapes),), fields[::-1])
+                shapes.append((kind.__name__, fields))
+            closing, fields = shape
+            push(closing)
+            extend([getattr(value, name) for name in fields])
+        else:
+            raise TypeError(f"No se puede serializar {kind.__name__} en el AST")
+
+    return MAGIC + marshal.dumps((shapes, ops.tobytes(), values))
+
+def loads(data: bytes) -> List:
+    if not data.startswith(MAGIC):
+        raise ValueError("No es un AST binario de GoxLang")
+    shapes, ops, values = marshal.loads(data[len(MAGIC):])
+    builders = []
+    for name, fields in shapes:
+        cls = getattr(model, name, None)
+        if not (isinstance(cls, type) and issubclass(cls, model.Node)):
+            raise ValueError(f"Nodo desconocido en el AST binario: {name}")
+        builders.append((cls, fields, len(fields)))
+    codes = array('H')
+    codes.frombytes(ops)
+
+    values = iter(values)
+    stack = []
+    push = stack.append
+    for op in codes:
+        if op == CONST:
+            push(next(values))
+        elif op == LIST:
+            n = next(values)
+            items = stack[len(stack) - n:]
+            del stack[len(stack) - n:]
+            push(items)
+        else:
+            cls, fields, n = builders[op - FIRST]
+            node = cls.__new__(cls)
+            if n:
+                for name, value in zip(fields, stack[-n:]):
+                    setattr(node, name, value)
+                del stack[-n:]
+            push(node)
+    return stack.pop()
+
+def write_ast_binary(ast: List, output_path: str = "ast_output.astb"):
+    with open(output_path, "wb") as f:
+        f.write(dumps(ast))
+
+def read_ast_binary(path: str) -> List:
+    with open(path, "rb") as f:
+        return loads(f.read())
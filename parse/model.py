@@ -4,15 +4,43 @@
 # Nodo base con método accept()
 # -------------------------------
 
+# Posición de un nodo en el fuente: línea y columna (desde 1) del primer
+# token, y línea y columna justo después del último.
+SPAN_FIELDS = ('lineno', 'column', 'end_lineno', 'end_column')
+
+# Anotaciones que agregan las etapas posteriores al parser (no se serializan):
+# binding es la resolución del nombre hecha por el Checker (ver semantic.symtab.Binding)
+# y expr_type el tipo que el Checker infirió para una expresión ('int', 'float', ...)
+ANNOTATION_FIELDS = ('binding', 'expr_type')
+
 class Node:
+    # Cada subclase declara sus campos en __slots__ (en el orden de __init__),
+    # así los nodos no llevan un __dict__ por instancia.
+    __slots__ = SPAN_FIELDS + ANNOTATION_FIELDS
+
     def accept(self, visitor, env):
         return visitor.visit(self, env)
 
+    def __getattr__(self, name):
+        # Solo se llama si el atributo no está asignado: los nodos creados
+        # fuera del parser no tienen posición ni anotaciones.
+        if name in SPAN_FIELDS or name in ANNOTATION_FIELDS:
+            return None
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    @property
+    def span(self):
+        if self.lineno is None:
+            return None
+        return (self.lineno, self.column, self.end_lineno, self.end_column)
+
 # -------------------------------
 # Statements
 # -------------------------------
 
 class Assignment(Node):
+    __slots__ = ('location', 'expression')
+
     def __init__(self, location, expression):
         self.location = location
         self.expression = expression
@@ -21,6 +49,8 @@ class Assignment(Node):
         return f"Assignment({self.location}, {self.expression})"
 
 class Print(Node):
+    __slots__ = ('expression',)
+
     def __init__(self, expression):
         self.expression = expression
 
@@ -28,6 +58,8 @@ class Print(Node):
         return f"Print({self.expression})"
 
 class If(Node):
+    __slots__ = ('condition', 'then_branch', 'else_branch')
+
     def __init__(self, condition, then_branch, else_branch):
         self.condition = condition
         self.then_branch = then_branch
@@ -37,6 +69,8 @@ class If(Node):
         return f"If({self.condition}, {self.then_branch}, {self.else_branch})"
 
 class While(Node):
+    __slots__ = ('condition', 'body')
+
     def __init__(self, condition, body):
         self.condition = condition
         self.body = body
@@ -45,14 +79,20 @@ class While(Node):
         return f"While({self.condition}, {self.body})"
 
 class Break(Node):
+    __slots__ = ()
+
     def __repr__(self):
         return "Break()"
 
 class Continue(Node):
+    __slots__ = ()
+
     def __repr__(self):
         return "Continue()"
 
 class Return(Node):
+    __slots__ = ('expression',)
+
     def __init__(self, expression):
         self.expression = expression
 
@@ -64,6 +104,8 @@ class Return(Node):
 # -------------------------------
 
 class Variable(Node):
+    __slots__ = ('name', 'type', 'expression', 'is_const')
+
     def __init__(self, name, type_, expression, is_const):
         self.name = name
         self.type = type_
@@ -74,6 +116,8 @@ class Variable(Node):
         return f"Variable({self.name}, {self.type}, {self.expression}, const={self.is_const})"
 
 class Parameter(Node):
+    __slots__ = ('name', 'type')
+
     def __init__(self, name, type_):
         self.name = name
         self.type = type_
@@ -82,6 +126,8 @@ class Parameter(Node):
         return f"Parameter({self.name}: {self.type})"
 
 class Function(Node):
+    __slots__ = ('name', 'params', 'return_type', 'body')
+
     def __init__(self, name, params, return_type, body):
         self.name = name
         self.params = params
@@ -96,6 +142,8 @@ class Function(Node):
 # -------------------------------
 
 class Integer(Node):
+    __slots__ = ('value',)
+
     def __init__(self, value):
         self.value = int(value)
 
@@ -103,6 +151,8 @@ class Integer(Node):
         return f"Integer({self.value})"
 
 class Float(Node):
+    __slots__ = ('value',)
+
     def __init__(self, value):
         self.value = float(value)
 
@@ -110,6 +160,8 @@ class Float(Node):
         return f"Float({self.value})"
 
 class Char(Node):
+    __slots__ = ('value',)
+
     def __init__(self, value):
         self.value = value
 
@@ -117,6 +169,8 @@ class Char(Node):
         return f"Char({self.value})"
 
 class Bool(Node):
+    __slots__ = ('value',)
+
     def __init__(self, value):
         self.value = value
 
@@ -124,6 +178,8 @@ class Bool(Node):
         return f"Bool({self.value})"
 
 class BinOp(Node):
+    __slots__ = ('left', 'op', 'right')
+
     def __init__(self, left, op, right):
         self.left = left
         self.op = op
@@ -133,6 +189,8 @@ class BinOp(Node):
         return f"BinOp({self.left} {self.op} {self.right})"
 
 class UnaryOp(Node):
+    __slots__ = ('op', 'expr')
+
     def __init__(self, op, expr):
         self.op = op
         self.expr = expr
@@ -141,6 +199,8 @@ class UnaryOp(Node):
         return f"UnaryOp({self.op} {self.expr})"
 
 class TypeCast(Node):
+    __slots__ = ('type', 'expr')
+
     def __init__(self, type_, expr):
         self.type = type_
         self.expr = expr
@@ -149,6 +209,8 @@ class TypeCast(Node):
         return f"TypeCast({self.type}, {self.expr})"
 
 class FunctionCall(Node):
+    __slots__ = ('name', 'args')
+
     def __init__(self, name, args):
         self.name = name
         self.args = args
@@ -161,6 +223,8 @@ class FunctionCall(Node):
 # -------------------------------
 
 class NamedLocation(Node):
+    __slots__ = ('name_or_expr',)
+
     def __init__(self, name_or_expr):
         self.name_or_expr = name_or_expr
 
@@ -168,17 +232,43 @@ class NamedLocation(Node):
         return f"NamedLocation({self.name_or_expr})"
 
 class MemoryLocation(Node):
+    __slots__ = ('address',)
+
     def __init__(self, address):
         self.address = address
 
     def __repr__(self):
         return f"MemoryLocation({self.address})"
     
+# -------------------------------
+# Visitante base (Checker, IRCode)
+# -------------------------------
+
 class Visitor:
+    '''
+    visit() busca el método visit_<Clase> una sola vez por clase de nodo y
+    lo guarda en `_dispatch`, una tabla propia de cada subclase de Visitor.
+    Las visitas siguientes son un acceso a diccionario, sin armar cadenas
+    ni llamar a getattr por cada nodo.
+    '''
+    _dispatch = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._dispatch = {}
+
     def visit(self, node, env):
-        method_name = 'visit_' + node.__class__.__name__
-        visitor = getattr(self, method_name, self.generic_visit)
-        return visitor(node, env)
+        try:
+            method = self._dispatch[node.__class__]
+        except KeyError:
+            method = self.dispatch(node.__class__)
+        return method(self, node, env)
+
+    @classmethod
+    def dispatch(cls, node_class):
+        method = getattr(cls, 'visit_' + node_class.__name__, cls.generic_visit)
+        cls._dispatch[node_class] = method
+        return method
 
     def generic_visit(self, node, env):
         raise Exception(f'No visit method defined for {node.__class__.__name__}')
@@ -1,188 +1,241 @@
 
 from typing import List
 from dataclasses import dataclass
+from collections import deque
 from parse.model import (
     Integer, Float, Char, Bool, TypeCast, BinOp, 
     UnaryOp, Assignment, Variable, NamedLocation, 
     Break, Continue, Return, Print, If, While, 
-    Function, Parameter, FunctionCall, MemoryLocation
+    Function, Parameter, FunctionCall, MemoryLocation,
+    Node, SPAN_FIELDS
 )
 import sys
 import json
 from lexer.scanner import Scanner
+from parse.astbin import write_ast_binary
+from lexer.tokenType import TokenCode, TOKEN_NAMES
+
+# Grupos de tokens por código entero (ver TokenCode)
+LITERAL_TOKENS = frozenset({TokenCode.INTEGER, TokenCode.FLOAT, TokenCode.CHAR, TokenCode.TRUE, TokenCode.FALSE})
+UNARY_TOKENS = frozenset({TokenCode.PLUS, TokenCode.MINUS, TokenCode.GROW})
+TYPE_TOKENS = frozenset({TokenCode.INT, TokenCode.FLOAT_TYPE, TokenCode.CHAR_TYPE, TokenCode.BOOL_TYPE})
+
+# Precedencia de los operadores binarios (todos asociativos a izquierda):
+# un número mayor liga más fuerte.
+BINARY_PRECEDENCE = {
+    TokenCode.LOR: 1,
+    TokenCode.LAND: 2,
+    TokenCode.LT: 3, TokenCode.GT: 3, TokenCode.LE: 3,
+    TokenCode.GE: 3, TokenCode.EQ: 3, TokenCode.NE: 3,
+    TokenCode.PLUS: 4, TokenCode.MINUS: 4,
+    TokenCode.TIMES: 5, TokenCode.DIVIDE: 5,
+}
+
+TOKEN_TO_TYPE = {
+    TokenCode.INT: "int",
+    TokenCode.FLOAT_TYPE: "float",
+    TokenCode.CHAR_TYPE: "char",
+    TokenCode.BOOL_TYPE: "bool"
+}
+
 class Parser:
     EXPECTED_RPAREN_MSG = "Se esperaba ')'"
     EXPECTED_LBRACE_MSG = "Se esperaba '{'"
     EXPECTED_RBRACE_MSG = "Se esperaba '}'"
 
-    def __init__(self, tokens: List):
-        self.tokens = tokens
-        self.current = 0
+    def __init__(self, tokens):
+        # `tokens` puede ser una lista o un generador de lexer.tokenLexer.Token:
+        # se lee de a poco a través de un búfer de lookahead de uno o dos tokens.
+        self.tokens = iter(tokens)
+        self.lookahead = deque()
+        self.previous = None
 
     def parse(self) -> List:
         statements = []
-        while self.peek() and self.peek().type != "EOF":
+        while self.peek():
             statements.append(self.statement())
         return statements
 
     def statement(self):
-        if self.match("IDENTIFIER") and self.peek().type == "ASSIGN":
-            self.current -= 1
+        start = self.peek()
+        if self.check(TokenCode.IDENTIFIER) and self.check(TokenCode.ASSIGN, 1):
             return self.assignment()
-        elif self.check("DEREF"):
+        elif self.check(TokenCode.DEREF):
             return self.assignment()
-        elif self.match("VAR") or self.match("CONST"):
-            self.current -= 1
+        elif self.check(TokenCode.VAR) or self.check(TokenCode.CONST):
             return self.vardecl()
-        elif self.check("IMPORT") or self.check("FUNC"):
+        elif self.check(TokenCode.IMPORT) or self.check(TokenCode.FUNC):
             return self.funcdecl()
-        elif self.match("IF"):
-            self.current -= 1
+        elif self.check(TokenCode.IF):
             return self.if_stmt()
-        elif self.match("WHILE"):
-            self.current -= 1
+        elif self.check(TokenCode.WHILE):
             return self.while_stmt()
-        elif self.match("BREAK"):
-            self.consume("SEMI", "Se esperaba ';' después de break")
-            return Break()
-        elif self.match("CONTINUE"):
-            self.consume("SEMI", "Se esperaba ';' después de continue")
-            return Continue()
-        elif self.match("RETURN"):
+        elif self.match(TokenCode.BREAK):
+            self.consume(TokenCode.SEMI, "Se esperaba ';' después de break")
+            return self.finish(Break(), start)
+        elif self.match(TokenCode.CONTINUE):
+            self.consume(TokenCode.SEMI, "Se esperaba ';' después de continue")
+            return self.finish(Continue(), start)
+        elif self.match(TokenCode.RETURN):
             expr = self.expression()
-            self.consume("SEMI", "Se esperaba ';' después de return")
-            return Return(expr)
-        elif self.match("PRINT"):
+            self.consume(TokenCode.SEMI, "Se esperaba ';' después de return")
+            return self.finish(Return(expr), start)
+        elif self.match(TokenCode.PRINT):
             expr = self.expression()
-            self.consume("SEMI", "Se esperaba ';' después de print")
-            return Print(expr)
+            self.consume(TokenCode.SEMI, "Se esperaba ';' después de print")
+            return self.finish(Print(expr), start)
         else:
             expr = self.expression()
-            self.consume("SEMI", "Se esperaba ';' después de la expresión")
+            self.consume(TokenCode.SEMI, "Se esperaba ';' después de la expresión")
             return expr
 
 
-    def check(self, token_type):
-        token = self.peek()
-        return token and token.type == token_type
+    def check(self, token_type, offset=0):
+        token = self.peek(offset)
+        return token is not None and token.type == token_type
 
     def assignment(self):
+        start = self.peek()
         location = self.location()
-        self.consume("ASSIGN", "Se esperaba '=' en asignación")
+        self.consume(TokenCode.ASSIGN, "Se esperaba '=' en asignación")
         expr = self.expression()
-        self.consume("SEMI", "Se esperaba ';' al final de la asignación")
-        return Assignment(location, expr)
+        self.consume(TokenCode.SEMI, "Se esperaba ';' al final de la asignación")
+        return self.finish(Assignment(location, expr), start)
 
     def vardecl(self):
-        is_const = self.match("CONST")
+        start = self.peek()
+        is_const = self.match(TokenCode.CONST)
         if not is_const:
-            self.consume("VAR", "Se esperaba 'var' o 'const'")
-        id_token = self.consume("IDENTIFIER", "Se esperaba nombre de variable")
+            self.consume(TokenCode.VAR, "Se esperaba 'var' o 'const'")
+        id_token = self.consume(TokenCode.IDENTIFIER, "Se esperaba nombre de variable")
         type_ = None
-        if self.match("INT") or self.match("FLOAT_TYPE") or self.match("CHAR_TYPE") or self.match("BOOL_TYPE"):
-            type_ = self.tokens[self.current - 1].type
+        if self.peek() and self.peek().type in TYPE_TOKENS:
+            type_ = TOKEN_NAMES[self.advance().type]
         expr = None
-        if self.match("ASSIGN"):
+        if self.match(TokenCode.ASSIGN):
             expr = self.expression()
-        self.consume("SEMI", "Se esperaba ';' al final de la declaración")
-        return Variable(id_token.value, type_, expr, is_const)
+        self.consume(TokenCode.SEMI, "Se esperaba ';' al final de la declaración")
+        return self.finish(Variable(id_token.value, type_, expr, is_const), start)
 
     def expression(self):
-        return self.binary_op(["LOR"], self.orterm)
-
-    def orterm(self):
-        return self.binary_op(["LAND"], self.andterm)
-
-    def andterm(self):
-        return self.binary_op(["LT", "GT", "LE", "GE", "EQ", "NE"], self.relterm)
-
-    def relterm(self):
-        return self.binary_op(["PLUS", "MINUS"], self.addterm)
-
-    def addterm(self):
-        return self.binary_op(["TIMES", "DIVIDE"], self.factor)
+        # Precedencia por tabla: se lee un operando por vuelta (una llamada a
+        # factor()) y los operadores pendientes se reducen con una pila, así
+        # que solo se recursa en paréntesis, casts, llamadas y unarios.
+        start = self.peek()
+        expr = self.factor()
+        token = self.peek()
+        if token is None or token.type not in BINARY_PRECEDENCE:
+            return expr
 
-    def binary_op(self, operators, next_rule):
-        expr = next_rule()
-        while self.peek() and self.peek().type in operators:
-            op_token = self.advance()
-            right = next_rule()
-            expr = BinOp(expr, op_token.type, right)
-        return expr
+        precedence_of = BINARY_PRECEDENCE.get
+        operands = [expr]
+        starts = [start]
+        operators = []          # (precedencia, código)
+        while True:
+            precedence = precedence_of(token.type) if token else None
+            # Antes de leer el siguiente operador (o al terminar) se reducen
+            # los que ligan igual o más fuerte. Cada BinOp termina en el
+            # último token leído, el final de su operando derecho.
+            while operators and (precedence is None or operators[-1][0] >= precedence):
+                code = operators.pop()[1]
+                right = operands.pop()
+                starts.pop()
+                operands[-1] = self.finish(BinOp(operands[-1], TOKEN_NAMES[code], right), starts[-1])
+            if precedence is None:
+                return operands[0]
+            self.advance()
+            operators.append((precedence, token.type))
+            starts.append(self.peek())
+            operands.append(self.factor())
+            token = self.peek()
 
     def factor(self):
         token = self.peek()
+        if token is None:
+            raise SyntaxError("Línea EOF: Factor no reconocido")
+        type_ = token.type
 
-        if token.type in ["INTEGER", "FLOAT", "CHAR", "TRUE", "FALSE"]:
+        if type_ in LITERAL_TOKENS:
             self.advance()
-            if token.type == "INTEGER":
-                return Integer(token.value)
-            elif token.type == "FLOAT":
-                return Float(token.value)
-            elif token.type == "CHAR":
-                return Char(token.value)
+            if type_ == TokenCode.INTEGER:
+                node = Integer(token.value)
+            elif type_ == TokenCode.FLOAT:
+                node = Float(token.value)
+            elif type_ == TokenCode.CHAR:
+                node = Char(token.value)
             else:
-                return Bool(token.type == "TRUE")
-            
-        elif token.type in ["PLUS", "MINUS", "GROW"]:
+                node = Bool(type_ == TokenCode.TRUE)
+            return self.finish(node, token)
+
+        elif type_ in UNARY_TOKENS:
+            # El unario se aplica solo al factor siguiente: -a + b es (-a) + b
             self.advance()
-            return UnaryOp(token.type, self.expression())
-        
-        elif token.type == "LPAREN":
+            return self.finish(UnaryOp(TOKEN_NAMES[type_], self.factor()), token)
+
+        elif type_ == TokenCode.LPAREN:
             self.advance()
             expr = self.expression()
-            self.consume("RPAREN", self.EXPECTED_RPAREN_MSG)
+            self.consume(TokenCode.RPAREN, self.EXPECTED_RPAREN_MSG)
             return expr
-        
-        elif token.type in ["INT", "FLOAT_TYPE", "CHAR_TYPE", "BOOL_TYPE", "INT", "FLOAT", "CHAR", "BOOL"]:
-            type_token = self.advance()
-            self.consume("LPAREN", "Se esperaba '(' para cast")
+
+        elif type_ in TYPE_TOKENS:
+            self.advance()
+            self.consume(TokenCode.LPAREN, "Se esperaba '(' para cast")
             expr = self.expression()
-            self.consume("RPAREN", "Se esperaba ')' en cast")
-            return TypeCast(type_token.type, expr)
+            self.consume(TokenCode.RPAREN, "Se esperaba ')' en cast")
+            return self.finish(TypeCast(TOKEN_NAMES[type_], expr), token)
 
-        elif token.type == "IDENTIFIER":
-            if self.current + 1 < len(self.tokens) and self.tokens[self.current + 1].type == "LPAREN":
+        elif type_ == TokenCode.IDENTIFIER:
+            if self.check(TokenCode.LPAREN, 1):
                 return self.func_call()
             else:
                 return self.location()
-            
-        elif token.type == "DEREF":
+
+        elif type_ == TokenCode.DEREF:
             self.advance()
-            return NamedLocation(self.expression())
-        
-        raise SyntaxError(f"Línea {token.lineno}: Factor no reconocido")
+            return self.finish(MemoryLocation(self.factor()), token)
+
+        raise SyntaxError(f"Línea {token.line}: Factor no reconocido")
 
     def func_call(self):
-        id_token = self.consume("IDENTIFIER", "Se esperaba nombre de función")
-        self.consume("LPAREN", "Se esperaba '('")
+        id_token = self.consume(TokenCode.IDENTIFIER, "Se esperaba nombre de función")
+        self.consume(TokenCode.LPAREN, "Se esperaba '('")
         args = self.arguments()
-        self.consume("RPAREN", self.EXPECTED_RPAREN_MSG)
-        return FunctionCall(id_token.value, args)
+        self.consume(TokenCode.RPAREN, self.EXPECTED_RPAREN_MSG)
+        return self.finish(FunctionCall(id_token.value, args), id_token)
 
     def location(self):
-        if self.match("DEREF"):
+        start = self.peek()
+        if self.match(TokenCode.DEREF):
             expr = self.expression()
-            return MemoryLocation(expr)
+            return self.finish(MemoryLocation(expr), start)
         else:
-            id_token = self.consume("IDENTIFIER", "Se esperaba identificador")
-            return NamedLocation(id_token.value)
+            id_token = self.consume(TokenCode.IDENTIFIER, "Se esperaba identificador")
+            return self.finish(NamedLocation(id_token.value), id_token)
 
     def arguments(self):
         args = []
-        if not self.peek() or self.peek().type == "RPAREN":
+        if not self.peek() or self.peek().type == TokenCode.RPAREN:
             return args
         args.append(self.expression())
-        while self.match("COMMA"):
+        while self.match(TokenCode.COMMA):
             args.append(self.expression())
         return args
 
-    def peek(self):
-        return self.tokens[self.current] if self.current < len(self.tokens) else None
+    def peek(self, offset=0):
+        lookahead = self.lookahead
+        while len(lookahead) <= offset:
+            token = next(self.tokens, None)
+            if token is None:
+                return None
+            lookahead.append(token)
+        return lookahead[offset]
 
     def advance(self):
         token = self.peek()
-        self.current += 1
+        if token is not None:
+            self.lookahead.popleft()
+            self.previous = token
         return token
 
     def match(self, token_type):
@@ -193,91 +246,92 @@ class Parser:
 
     def consume(self, token_type, message):
         if self.match(token_type):
-            return self.tokens[self.current - 1]
+            return self.previous
+        self.error(message)
+
+    def finish(self, node, start):
+        # Registra en el nodo su posición: desde `start` hasta el último token leído
+        end = self.previous
+        node.lineno, node.column = start.lines.position(start.pos)
+        node.end_lineno, end_column = end.lines.position(end.pos)
+        node.end_column = end_column + len(end.lexeme)
+        return node
+
+    def error(self, message):
         token = self.peek()
-        lineno = token.lineno if token else "EOF"
+        lineno = token.line if token else "EOF"
         raise SyntaxError(f"Línea {lineno}: {message}")
 
     def funcdecl(self):
-        TOKEN_TO_TYPE = {
-            "INT": "int",
-            "FLOAT_TYPE": "float",
-            "CHAR_TYPE": "char",
-            "BOOL_TYPE": "bool"
-        }
-
+        start = self.peek()
         import_stmt = None
-        if self.match("IMPORT"):
+        if self.match(TokenCode.IMPORT):
             import_stmt = True
-        self.consume("FUNC", "Se esperaba 'func'")
-        id_token = self.consume("IDENTIFIER", "Se esperaba nombre de la función")
-        self.consume("LPAREN", "Se esperaba '('")
+        self.consume(TokenCode.FUNC, "Se esperaba 'func'")
+        id_token = self.consume(TokenCode.IDENTIFIER, "Se esperaba nombre de la función")
+        self.consume(TokenCode.LPAREN, "Se esperaba '('")
         params = self.parameters()
-        self.consume("RPAREN", self.EXPECTED_RPAREN_MSG)
+        self.consume(TokenCode.RPAREN, self.EXPECTED_RPAREN_MSG)
         type_ = None
         type_token = self.peek()
         if type_token and type_token.type in TOKEN_TO_TYPE:
             type_ = TOKEN_TO_TYPE[type_token.type]
-            self.consume(type_token.type, "Se esperaba tipo de retorno")
+            self.advance()
         else:
-            raise SyntaxError(f"Línea {type_token.lineno if type_token else 'EOF'}: Se esperaba tipo de retorno explícito después de los parámetros de la función")
+            self.error("Se esperaba tipo de retorno explícito después de los parámetros de la función")
 
-        self.consume("LBRACE", self.EXPECTED_LBRACE_MSG)
+        self.consume(TokenCode.LBRACE, self.EXPECTED_LBRACE_MSG)
         body = []
-        while self.peek() and self.peek().type != "RBRACE":
+        while self.peek() and self.peek().type != TokenCode.RBRACE:
             body.append(self.statement())
-        self.consume("RBRACE", self.EXPECTED_RBRACE_MSG)
-        return Function(id_token.value, params, type_, body)
+        self.consume(TokenCode.RBRACE, self.EXPECTED_RBRACE_MSG)
+        return self.finish(Function(id_token.value, params, type_, body), start)
 
 
     def parameters(self):
         params = []
-        if self.peek() and self.peek().type == "IDENTIFIER":
+        if self.peek() and self.peek().type == TokenCode.IDENTIFIER:
             while True:
-                id_token = self.consume("IDENTIFIER", "Se esperaba nombre del parámetro")
-                if self.peek() and self.peek().type in ["INT", "FLOAT_TYPE", "CHAR_TYPE", "BOOL_TYPE"]:
-                    type_token = self.consume(self.peek().type, "Se esperaba tipo")
+                id_token = self.consume(TokenCode.IDENTIFIER, "Se esperaba nombre del parámetro")
+                if self.peek() and self.peek().type in TYPE_TOKENS:
+                    type_token = self.advance()
                 else:
-                    raise SyntaxError(f"Línea {self.peek().lineno if self.peek() else 'EOF'}: Se esperaba tipo para el parámetro")
-                params.append(Parameter(id_token.value, type_token.type))
-                if not self.match("COMMA"):
+                    self.error("Se esperaba tipo para el parámetro")
+                params.append(self.finish(Parameter(id_token.value, TOKEN_NAMES[type_token.type]), id_token))
+                if not self.match(TokenCode.COMMA):
                     break
         return params
 
 
     def if_stmt(self):
-        self.consume("IF", "Se esperaba 'if'")
+        start = self.peek()
+        self.consume(TokenCode.IF, "Se esperaba 'if'")
         condition = self.expression()
-        self.consume("LBRACE", self.EXPECTED_LBRACE_MSG)
+        self.consume(TokenCode.LBRACE, self.EXPECTED_LBRACE_MSG)
         then_branch = []
-        while self.peek() and self.peek().type != "RBRACE":
+        while self.peek() and self.peek().type != TokenCode.RBRACE:
             then_branch.append(self.statement())
-        self.consume("RBRACE", self.EXPECTED_RBRACE_MSG)
+        self.consume(TokenCode.RBRACE, self.EXPECTED_RBRACE_MSG)
 
         else_branch = []
-        if self.match("ELSE"):
-            self.consume("LBRACE", "Se esperaba '{' después de 'else'")
-            while self.peek() and self.peek().type != "RBRACE":
+        if self.match(TokenCode.ELSE):
+            self.consume(TokenCode.LBRACE, "Se esperaba '{' después de 'else'")
+            while self.peek() and self.peek().type != TokenCode.RBRACE:
                 else_branch.append(self.statement())
-            self.consume("RBRACE", "Se esperaba '}' en bloque else")
+            self.consume(TokenCode.RBRACE, "Se esperaba '}' en bloque else")
 
-        return If(condition, then_branch, else_branch)
+        return self.finish(If(condition, then_branch, else_branch), start)
 
     def while_stmt(self):
-        self.consume("WHILE", "Se esperaba 'while'")
+        start = self.peek()
+        self.consume(TokenCode.WHILE, "Se esperaba 'while'")
         condition = self.expression()
-        self.consume("LBRACE", self.EXPECTED_LBRACE_MSG)
+        self.consume(TokenCode.LBRACE, self.EXPECTED_LBRACE_MSG)
         body = []
-        while self.peek() and self.peek().type != "RBRACE":
+        while self.peek() and self.peek().type != TokenCode.RBRACE:
             body.append(self.statement())
-        self.consume("RBRACE", self.EXPECTED_RBRACE_MSG)
-        return While(condition, body)
-
-class ParserToken:
-    def __init__(self, token):
-        self.type = token.token_type.name
-        self.value = token.literal if token.literal is not None else token.lexeme
-        self.lineno = token.line
+        self.consume(TokenCode.RBRACE, self.EXPECTED_RBRACE_MSG)
+        return self.finish(While(condition, body), start)
 
 def error_handler(line, message):
     print(f"[line {line}] Error: {message}")
@@ -285,42 +339,63 @@ def error_handler(line, message):
 def ast_to_dict(node):
     if isinstance(node, list):
         return [ast_to_dict(item) for item in node]
-    elif hasattr(node, "__dict__"):
-        return {key: ast_to_dict(value) for key, value in node.__dict__.items()}
+    elif isinstance(node, Node):
+        data = {name: ast_to_dict(getattr(node, name)) for name in type(node).__slots__}
+        if node.lineno is not None:
+            data.update(zip(SPAN_FIELDS, node.span))
+        return data
     else:
         return node
 
+def parse_tokens(scanner: Scanner) -> List:
+    # El parser consume los tokens a medida que el scanner los produce
+    parser = Parser(scanner.iter_tokens())
+    ast = parser.parse()
+    if scanner.had_error:
+        raise SyntaxError("Errores léxicos encontrados")
+    return ast
+
+def parse_source(source) -> List:
+    '''
+    Analiza un programa dado como cadena o como iterable de trozos de texto.
+    '''
+    return parse_tokens(Scanner(source, error_handler))
+
+def parse_file(path: str, use_mmap: bool = False) -> List:
+    '''
+    Analiza un archivo leyéndolo por trozos (o con mmap), sin cargarlo
+    completo en memoria.
+    '''
+    return parse_tokens(Scanner.from_file(path, error_handler, use_mmap=use_mmap))
+
+def write_ast_json(ast: List, output_path: str = "ast_output.json"):
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(ast_to_dict(ast), f, indent=4)
+
 def generate_ast_json(self: str, output_path: str = "ast_output.json") -> List:
-        scanner = Scanner(self, error_handler)
-        tokens = scanner.scan_tokens()
-        if scanner.had_error:
-            raise SyntaxError("Errores léxicos encontrados")
-        wrapped_tokens = [ParserToken(tok) for tok in tokens]
-        parser = Parser(wrapped_tokens)
-        ast = parser.parse()
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(ast_to_dict(ast), f, indent=4)
+        ast = parse_source(self)
+        write_ast_json(ast, output_path)
         return ast
 
 
 def main():
-    if len(sys.argv) != 2:
-        print("Uso: python parse.py archivo.gox")
+    if len(sys.argv) not in (2, 3):
+        print("Uso: python parse.py archivo.gox [salida.json|salida.astb]")
         sys.exit(1)
 
     filename = sys.argv[1]
+    output_path = sys.argv[2] if len(sys.argv) == 3 else "ast_output.json"
 
     try:
-        with open(filename, "r", encoding="utf-8") as f:
-            source_code = f.read()
+        ast = parse_file(filename)
+        if output_path.endswith(".astb"):
+            write_ast_binary(ast, output_path)
+        else:
+            write_ast_json(ast, output_path)
+        print(f"AST generado en '{output_path}'")
     except FileNotFoundError:
         print(f"No se encontró el archivo: {filename}")
         sys.exit(1)
-        
-
-    try:
-        generate_ast_json(source_code)
-        print("AST generado en 'ast_output.json'")
     except SyntaxError as e:
         print(f"Error de sintaxis: {e}")
         sys.exit(66)
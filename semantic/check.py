@@ -2,16 +2,23 @@ from rich import print
 from typing import Union
 
 from parse.model import *
-from semantic.symtab import Symtab
-from semantic.typesys import check_binop, check_unaryop
+from semantic.symtab import Symtab, Binding
+from semantic.typesys import check_binop, check_unaryop, typename, OP_MAP
 import sys
-from parse.parse import generate_ast_json
+from parse.parse import parse_source
 
-class Checker:
+# Tipos que se pueden guardar en una celda de memoria (POKEI, POKEF, POKEB)
+MEMORY_TYPES = ('int', 'float', 'char')
+
+class Checker(Visitor):
     def __init__(self):
         self.errors = []
         self.current_function = None
         self.inside_loop = 0
+        # Próximo slot libre de cada alcance (ver declare)
+        self.global_slots = 0
+        self.local_slots = 0
+        self.function_slots = 0
 
     @classmethod
     def check(cls, program: list):
@@ -42,13 +49,22 @@ class Checker:
 
         return checker
 
-    def visit(self, node, env):
-        method_name = 'visit_' + node.__class__.__name__
-        visitor = getattr(self, method_name, self.generic_visit)
-        return visitor(node, env)
-
-    def generic_visit(self, node, env):
-        raise Exception(f'No visit method defined for {node.__class__.__name__}')
+    def declare(self, n, env: Symtab):
+        '''
+        Agrega la declaración a la tabla y le asigna su Binding. Las
+        referencias al nombre reciben el mismo Binding al resolverse, así
+        el generador de código no vuelve a buscar nombres.
+        '''
+        env.add(n.name, n)
+        if isinstance(n, Function):
+            n.binding = Binding(Binding.FUNCTION, self.function_slots)
+            self.function_slots += 1
+        elif env.parent is None:
+            n.binding = Binding(Binding.GLOBAL, self.global_slots)
+            self.global_slots += 1
+        else:
+            n.binding = Binding(Binding.LOCAL, self.local_slots)
+            self.local_slots += 1
 
     # Statements
 
@@ -58,18 +74,22 @@ class Checker:
             var = env.get(var_name)
             if var is None:
                 raise NameError(f"Variable '{var_name}' no declarada")
+            n.location.binding = var.binding
             # Prohibir solo si es constante, permitir asignar a parámetros
             if hasattr(var, 'is_const') and var.is_const:
                 raise TypeError(f"No se puede asignar a constante '{var.name}'")
-            var_type = var.type.lower()
+            var_type = typename(var.type)
             
         elif isinstance(n.location, MemoryLocation):
             # Validar la expresión de dirección
             addr_type = n.location.address.accept(self, env).lower()
             if addr_type != 'int':
                 raise TypeError("La dirección para acceso indirecto debe ser un entero")
-            # Asumimos tipo int para acceso indirecto
-            var_type = 'int'
+            # La celda guarda enteros, bytes (char) o flotantes
+            expr_type = n.expression.accept(self, env).lower()
+            if expr_type not in MEMORY_TYPES:
+                raise TypeError(f"No se puede asignar tipo '{expr_type}' a una celda de memoria")
+            return
         else:
             raise TypeError(f"Tipo de ubicación no soportado: {type(n.location)}")
 
@@ -112,7 +132,7 @@ class Checker:
         if self.current_function is None:
             raise SyntaxError("'return' fuera de una función")
         expr_type = n.expression.accept(self, env).lower()
-        func_return_type = self.current_function.return_type.lower()
+        func_return_type = typename(self.current_function.return_type)
         if expr_type != func_return_type:
             raise TypeError(f"La función debe retornar '{self.current_function.return_type}', pero retorna '{expr_type}'")
 
@@ -121,96 +141,102 @@ class Checker:
     def visit_Variable(self, n: Variable, env: Symtab):
         if n.expression:
             expr_type = n.expression.accept(self, env).lower()
-            if n.type and n.type.lower() != expr_type:
+            if n.type and typename(n.type) != expr_type:
                 raise TypeError(f"Tipo incompatible en inicialización de variable '{n.name}'")
             elif n.type is None:
                 n.type = expr_type
-        env.add(n.name, n)
+        self.declare(n, env)
 
     def visit_Function(self, n: Function, env: Symtab):
-        env.add(n.name, n)
+        self.declare(n, env)
         func_env = Symtab(n.name, env)
+        old_function, old_slots = self.current_function, self.local_slots
+        self.current_function, self.local_slots = n, 0
         for param in n.params:
-            func_env.add(param.name, param)
-        old_function = self.current_function
-        self.current_function = n
+            self.declare(param, func_env)
         for stmt in n.body:
             stmt.accept(self, func_env)
-        self.current_function = old_function
+        self.current_function, self.local_slots = old_function, old_slots
 
     def visit_Parameter(self, n: Parameter, env: Symtab):
-        env.add(n.name, n)
+        self.declare(n, env)
 
     # Expressions
 
+    @staticmethod
+    def typed(n, type_: str) -> str:
+        # Anota en la expresión el tipo inferido (IRCode elige con él las
+        # instrucciones enteras o flotantes) y lo retorna
+        n.expr_type = type_
+        return type_
+
     def visit_Integer(self, n: Integer, env: Symtab):
-        return 'int'
+        return self.typed(n, 'int')
 
     def visit_Float(self, n: Float, env: Symtab):
-        return 'float'
+        return self.typed(n, 'float')
 
     def visit_Char(self, n: Char, env: Symtab):
-        return 'char'
+        return self.typed(n, 'char')
 
     def visit_Bool(self, n: Bool, env: Symtab):
-        return 'bool'
+        return self.typed(n, 'bool')
 
     def visit_BinOp(self, n: BinOp, env: Symtab):
-        OP_MAP = {
-            'PLUS': '+',
-            'MINUS': '-',
-            'TIMES': '*',
-            'DIVIDE': '/',
-            'LT': '<',
-            'LE': '<=',
-            'GT': '>',
-            'GE': '>=',
-            'EQ': '==',
-            'NE': '!=',
-            'LAND': '&&',
-            'LOR': '||',
-        }
         left = n.left.accept(self, env).lower()
         right = n.right.accept(self, env).lower()
         opr = OP_MAP.get(n.op, n.op)
         result = check_binop(opr, left, right)
         if not result:
             raise TypeError(f"Operación binaria inválida: {left} {opr} {right}")
-        return result
+        return self.typed(n, result)
 
     def visit_UnaryOp(self, n: UnaryOp, env: Symtab):
         expr = n.expr.accept(self, env).lower()
-        result = check_unaryop(n.op, expr)
+        result = check_unaryop(OP_MAP.get(n.op, n.op), expr)
         if not result:
             raise TypeError(f"Operador unario inválido: {n.op} {expr}")
-        return result
+        return self.typed(n, result)
 
     def visit_TypeCast(self, n: TypeCast, env: Symtab):
-        n.expr.accept(self, env)
-        return n.type.lower()
+        target = typename(n.type)
+        if isinstance(n.expr, MemoryLocation) and target in MEMORY_TYPES:
+            # float(`addr) y char(`addr) leen la celda con ese tipo
+            self.visit_MemoryLocation(n.expr, env, target)
+        else:
+            n.expr.accept(self, env)
+        return self.typed(n, target)
 
     def visit_NamedLocation(self, n: NamedLocation, env: Symtab):
         if isinstance(n.name_or_expr, str):
             symbol = env.get(n.name_or_expr)
             if symbol is None:
                 raise NameError(f"Nombre no declarado: {n.name_or_expr}")
-            return symbol.type.lower()
+            n.binding = symbol.binding
+            return self.typed(n, typename(symbol.type))
         else:
             # Si es una expresión, evalúala para validar su tipo
-            return n.name_or_expr.accept(self, env)
+            return self.typed(n, n.name_or_expr.accept(self, env))
+
 
+    def visit_MemoryLocation(self, n: MemoryLocation, env: Symtab, type_='int'):
+        addr_type = n.address.accept(self, env).lower()
+        if addr_type != 'int':
+            raise TypeError("La dirección para acceso indirecto debe ser un entero")
+        return self.typed(n, type_)
 
     def visit_FunctionCall(self, n: FunctionCall, env: Symtab):
         func = env.get(n.name)
         if func is None:
             raise NameError(f"Función no definida: {n.name}")
+        n.binding = func.binding
         if len(n.args) != len(func.params):
             raise TypeError(f"Argumentos incorrectos para '{n.name}': esperados {len(func.params)}, recibidos {len(n.args)}")
         for arg, param in zip(n.args, func.params):
             arg_type = arg.accept(self, env).lower()
-            if arg_type != param.type.lower():
+            if arg_type != typename(param.type):
                 raise TypeError(f"Argumento incompatible en llamada a '{n.name}': se esperaba '{param.type}', se recibió '{arg_type}'")
-        return func.return_type.lower()
+        return self.typed(n, typename(func.return_type))
 
 
 def main():
@@ -228,9 +254,7 @@ def main():
         sys.exit(1)
 
     try:
-        # Generar AST y archivo JSON
-        ast = generate_ast_json(source_code)
-        print("[bold green]AST generado en 'ast_output.json'")
+        ast = parse_source(source_code)
     except SyntaxError as e:
         print(f"Error de sintaxis: {e}")
         sys.exit(66)
@@ -3,6 +3,27 @@ from rich.table   import Table
 from rich.console import Console
 from rich         import print
 
+class Binding:
+	'''
+	Resultado de resolver un nombre en el Checker: el alcance (GLOBAL,
+	LOCAL o FUNCTION) y el índice del slot. Para las variables es la
+	posición en la lista de globales o en el frame de la función
+	(parámetros primero); para las funciones, el orden de declaración.
+	Todas las referencias a un mismo símbolo comparten su Binding.
+	'''
+	__slots__ = ('scope', 'slot')
+
+	GLOBAL   = 'global'
+	LOCAL    = 'local'
+	FUNCTION = 'function'
+
+	def __init__(self, scope, slot):
+		self.scope = scope
+		self.slot = slot
+
+	def __repr__(self):
+		return f"Binding({self.scope}, {self.slot})"
+
 class Symtab:
 	'''
 	Una tabla de símbolos.  Este es un objeto simple que sólo
@@ -19,6 +19,41 @@ más adelante.
 
 typenames = { 'int', 'float', 'char', 'bool' }
 
+# Las declaraciones guardan el nombre del token del tipo ("INT",
+# "FLOAT_TYPE", ...); los tipos de retorno ya vienen como 'int', 'float'...
+TYPE_ALIASES = {
+	'float_type': 'float',
+	'char_type': 'char',
+	'bool_type': 'bool',
+}
+
+def typename(name):
+	'''
+	Nombre del tipo ('int', 'float', 'char', 'bool') para un tipo tal
+	como aparece en el AST. None se conserva (tipo aún sin inferir).
+	'''
+	if name is None:
+		return None
+	name = name.lower()
+	return TYPE_ALIASES.get(name, name)
+
+# Nombre del token del operador (como queda en el AST) -> símbolo
+OP_MAP = {
+	'PLUS': '+',
+	'MINUS': '-',
+	'TIMES': '*',
+	'DIVIDE': '/',
+	'LT': '<',
+	'LE': '<=',
+	'GT': '>',
+	'GE': '>=',
+	'EQ': '==',
+	'NE': '!=',
+	'LAND': '&&',
+	'LOR': '||',
+	'GROW': '^',
+}
+
 # Capabilities
 bin_ops = {
 	# Integer operations
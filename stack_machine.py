@@ -1,193 +1,663 @@
-class StackMachine:
-    def __init__(self, module):
-        self.module = module
-        self.stack = []
-        self.globals = {name: 0 for name in module.globals}
-        self.locals = {}
-        self.pc = 0
-        self.current_func = None
-        self.running = False
-        self.call_stack = []
-        self.memory = {}  # Simulación de memoria para POKEI y PEEKI
-
-    def prepare_labels(self):
-        self.labels = {
-            'IF': [],
-            'ELSE': [],
-            'ENDIF': [],
-            'LOOP': [],
-            'ENDLOOP': [],
-            'CBREAK': [],
-            'CONTINUE': []
-        }
-        for i, instr in enumerate(self.current_func.code):
+import io
+import operator
+import sys
+from array import array
+from collections import Counter
+
+def link(code):
+    '''
+    Resuelve, una sola vez, el destino absoluto de cada instrucción de
+    control estructurado. Devuelve una lista paralela a `code` donde:
+
+        IF       -> índice de su ELSE (o ENDIF si no tiene ELSE)
+        ELSE     -> índice de su ENDIF
+        CBREAK   -> índice del ENDLOOP de su ciclo
+        BREAK    -> índice del ENDLOOP de su ciclo
+        CONTINUE -> índice del LOOP de su ciclo
+        ENDLOOP  -> índice de su LOOP
+
+    Los IF se emparejan por anidamiento. Las instrucciones de ciclo ya
+    traen la etiqueta de su ciclo (ver ircode.py), así que basta con
+    ubicar el LOOP y el ENDLOOP de cada etiqueta. Las instrucciones que
+    no saltan quedan en None.
+    '''
+    targets = [None] * len(code)
+    starts = {}
+    ends = {}
+    ifs = []      # IF/ELSE abiertos
+    try:
+        for i, instr in enumerate(code):
             op = instr[0]
-            if op in self.labels:
-                self.labels[op].append(i)
-
-    def run_function(self, func_name, args=None):
-        if args is None:
-            args = []
-
-        # Guardar contexto actual sólo si hay función activa
-        if self.current_func is not None:
-            self.call_stack.append((self.current_func, self.locals, self.pc))
-
-        # Iniciar nuevo contexto
-        self.current_func = self.module.functions[func_name]
-        self.locals = {}
-        for name, val in zip(self.current_func.parmnames, args):
-            self.locals[name] = val
+            if op == 'IF':
+                ifs.append(i)
+            elif op == 'ELSE':
+                targets[ifs.pop()] = i
+                ifs.append(i)
+            elif op == 'ENDIF':
+                targets[ifs.pop()] = i
+            elif op == 'LOOP':
+                starts[instr[1]] = i
+            elif op == 'ENDLOOP':
+                ends[instr[1]] = i
+    except IndexError:
+        raise Exception(f"Instrucción {code[i][0]} sin bloque de apertura (posición {i})")
+    if ifs:
+        raise Exception("Bloque de control sin cerrar (IF sin ENDIF)")
+
+    for i, instr in enumerate(code):
+        op = instr[0]
+        if op in ('CBREAK', 'BREAK'):
+            table = ends
+        elif op in ('CONTINUE', 'ENDLOOP'):
+            table = starts
+        else:
+            continue
+        label = instr[1]
+        if label not in starts or label not in ends:
+            raise Exception(f"Ciclo {label} sin LOOP/ENDLOOP (posición {i})")
+        targets[i] = table[label]
+    return targets
+
+# Comparaciones que pueden fusionarse con el salto que las consume
+_compare = {
+    'LTI': operator.lt,
+    'LEI': operator.le,
+    'GTI': operator.gt,
+    'GEI': operator.ge,
+    'EQI': operator.eq,
+    'NEI': operator.ne,
+    'LTF': operator.lt,
+    'LEF': operator.le,
+    'GTF': operator.gt,
+    'GEF': operator.ge,
+    'EQF': operator.eq,
+    'NEF': operator.ne,
+}
+
+# Variantes enteras y flotantes de las secuencias que reconoce `fuse`
+_const = ('CONSTI', 'CONSTF')
+_negate = {'CONSTI': 'MULI', 'CONSTF': 'MULF'}
+_step = {'ADDI': 1, 'SUBI': -1, 'ADDF': 1, 'SUBF': -1}
+
+class Frame:
+    '''
+    Registro de activación de una llamada. Los frames se reciclan a
+    través del pool de la máquina en vez de crearse en cada CALL.
+    '''
+    __slots__ = ('func', 'code', 'pc', 'locals')
+
+    def __init__(self):
+        self.func = None
+        self.code = None
         self.pc = 0
-        self.running = True
-        self.prepare_labels()
-
-        while self.running and self.pc < len(self.current_func.code):
-            instr = self.current_func.code[self.pc]
-            self.execute(instr)
-            self.pc += 1
-
-        # Restaurar contexto anterior si existe
-        if self.call_stack:
-            self.current_func, self.locals, self.pc = self.call_stack.pop()
-            self.running = True
+        self.locals = []      # Un valor por slot (ver IRFunction.slots)
+
+class Output:
+    '''
+    Canal de salida con búfer para PRINTI/PRINTB. Acumula el texto y lo
+    escribe en `sink` cuando supera `size` caracteres, en `flush()` o al
+    terminar el programa (aunque termine con error).
+
+    `sink` puede ser cualquier archivo de texto o binario (`io.BytesIO`,
+    el extremo de escritura de un pipe, ...); a los binarios se les
+    escribe UTF-8. Con `sink=None` se usa el `sys.stdout` vigente al
+    momento de vaciar el búfer. Con `size=0` cada escritura se vacía de
+    inmediato.
+    '''
+    def __init__(self, sink=None, size=8192):
+        self.sink = sink
+        self.size = size
+        self.parts = []
+        self.pending = 0
+
+    def write(self, text):
+        self.parts.append(text)
+        self.pending += len(text)
+        if self.pending >= self.size:
+            self.flush()
+
+    def flush(self):
+        if not self.parts:
+            return
+        data = ''.join(self.parts)
+        self.parts.clear()
+        self.pending = 0
+        sink = self.sink if self.sink is not None else sys.stdout
+        if isinstance(sink, io.TextIOBase):
+            sink.write(data)
         else:
-            self.running = False  # Fin del programa
-
+            sink.write(data.encode('utf-8'))
+        sink.flush()
 
-    def execute(self, instr):
+class StackMachine:
+    '''
+    Máquina de pila que ejecuta un IRModule.
+
+    Cada IRFunction se carga una sola vez: sus instrucciones se enlazan
+    (ver `link`) y se decodifican a pares (manejador, operando). El ciclo
+    de ejecución sólo indexa esa lista y llama al manejador, que recibe
+    el pc de la siguiente instrucción y devuelve el pc con el que se debe
+    continuar. CALL y RET cambian de frame y devuelven None para que el
+    ciclo recargue el frame activo; así una llamada en GoxLang nunca
+    consume un frame de Python.
+
+    Con `fuse=True` (por omisión) el cargador además reemplaza secuencias
+    frecuentes por superinstrucciones (ver `fuse`). `self.fused` cuenta
+    cuántas secuencias de cada tipo se fusionaron.
+
+    PRINTI, PRINTF y PRINTB escriben en `self.output` (ver `Output`); `out` y
+    `buffer_size` eligen su destino y tamaño.
+    '''
+    def __init__(self, module, fuse=True, out=None, buffer_size=8192):
+        self.module = module
+        self.output = Output(out, buffer_size)
+        self.stack = []
+        self.globals = [0] * module.global_slots   # Indexadas por IRGlobal.slot
+        self.locals = []
+        self.frame = None   # Frame activo
+        self.frames = []    # Frames de los llamadores
+        self.pool = []      # Frames libres para reutilizar
+        self.memory = array('q')      # Memoria lineal: una celda entera de 64 bits por dirección
+        self.fmemory = self.memory_view()
+        self.loaded = {}  # Código decodificado por función
+        self.opcodes = self.opcode_table()
+        self.fuse_enabled = fuse
+        self.fused = Counter()
+
+    @classmethod
+    def opcode_table(cls):
+        '''
+        Tabla opcode -> manejador, construida una vez por clase a partir
+        de los métodos `op_<OPCODE>`.
+        '''
+        table = cls.__dict__.get('_opcode_table')
+        if table is None:
+            table = {name[3:]: getattr(cls, name) for name in dir(cls) if name.startswith('op_')}
+            cls._opcode_table = table
+        return table
+
+    def load(self, func):
+        code = self.loaded.get(func.name)
+        if code is None:
+            if func.targets is None:
+                func.targets = link(func.code)
+            code = [self.decode(func, instr, target) for instr, target in zip(func.code, func.targets)]
+            if not code or func.code[-1][0] != 'RET':
+                code.append(self.decode(func, ('RET',), None))
+            if self.fuse_enabled:
+                self.fuse(func, code)
+            self.loaded[func.name] = code
+        return code
+
+    def fuse(self, func, code):
+        '''
+        Reemplaza en `code` las secuencias reconocidas por una
+        superinstrucción. La superinstrucción ocupa el lugar de la primera
+        instrucción y devuelve el pc que sigue a la secuencia; el resto de
+        las entradas se conserva, así que los índices (y los saltos que
+        caigan en medio de la secuencia) no cambian.
+
+            LOAD x; CONST k; ADD|SUB; STORE x    -> INC   (contadores)
+            LOAD a; LOAD b; <cmp>; CBREAK|IF      -> BRANCH (pruebas)
+            CONST -1; MUL                         -> NEG
+
+        LOAD/STORE son LOCAL_* o GLOBAL_*, y en BRANCH `b` puede ser
+        también una constante. Cada secuencia se reconoce en su variante
+        entera (CONSTI, ADDI...) y flotante (CONSTF, ADDF...).
+        '''
+        ir = func.code
+        cls = type(self)
+        i = 0
+        while i < len(ir):
+            op = ir[i][0]
+            fused = None
+            if op in _negate and ir[i][1] == -1 and i + 1 < len(ir) and ir[i + 1][0] == _negate[op]:
+                fused = 'NEG', 2, (cls.fused_NEG, None)
+            elif op in ('LOCAL_GET', 'GLOBAL_GET') and i + 3 < len(ir):
+                a, b, c, d = ir[i:i + 4]
+                if (b[0] in _const and c[0] in _step and c[0][-1] == b[0][-1]
+                        and d[0] == op[:-3] + 'SET' and d[1] == a[1]):
+                    step = b[1] * _step[c[0]]
+                    if op == 'LOCAL_GET':
+                        fused = 'INC', 4, (cls.fused_INC_L, (code[i][1], step))
+                    else:
+                        fused = 'INC', 4, (cls.fused_INC_X, (self.globals, code[i][1], step))
+                elif (b[0] in ('LOCAL_GET', 'GLOBAL_GET') + _const
+                        and c[0] in _compare and d[0] in ('CBREAK', 'IF')):
+                    fused = 'BRANCH', 4, self.fuse_branch(code, i, a, b, _compare[c[0]], code[i + 3][1])
+            if fused:
+                name, size, code[i] = fused
+                self.fused[name] += 1
+                i += size
+            else:
+                i += 1
+
+    def fuse_branch(self, code, i, a, b, cmp, target):
+        # Los operandos globales y constantes se ligan a una lista fija
+        # (self.globals o [k]); sólo las locales dependen del frame activo.
+        def bound(instr, arg):
+            if instr[0] == 'GLOBAL_GET':
+                return self.globals, arg
+            if instr[0] in _const:
+                return [arg], 0
+            return None
+        cls = type(self)
+        xa = bound(a, code[i][1])
+        xb = bound(b, code[i + 1][1])
+        if xa is None and xb is None:
+            return cls.fused_BRANCH_LL, (code[i][1], code[i + 1][1], cmp, target)
+        if xa is None:
+            return cls.fused_BRANCH_LX, (code[i][1], *xb, cmp, target)
+        if xb is None:
+            return cls.fused_BRANCH_XL, (*xa, code[i + 1][1], cmp, target)
+        return cls.fused_BRANCH_XX, (*xa, *xb, cmp, target)
+
+    def decode(self, func, instr, target):
         op = instr[0]
-        args = instr[1:] if len(instr) > 1 else []
-
-        if op == 'CONSTI':
-            self.stack.append(args[0])
-
-        elif op == 'LOCAL_GET':
-            self.stack.append(self.locals[args[0]])
-
-        elif op == 'GLOBAL_GET':
-            self.stack.append(self.globals[args[0]])
-
-        elif op == 'LOCAL_SET':
-            val = self.stack.pop()
-            self.locals[args[0]] = val
-
-        elif op == 'GLOBAL_SET':
-            val = self.stack.pop()
-            self.globals[args[0]] = val
-
-        elif op == 'ADDI':
-            b = self.stack.pop()
-            a = self.stack.pop()
-            self.stack.append(a + b)
-
-        elif op == 'SUBI':
-            b = self.stack.pop()
-            a = self.stack.pop()
-            self.stack.append(a - b)
-
-        elif op == 'MULI':
-            b = self.stack.pop()
-            a = self.stack.pop()
-            self.stack.append(a * b)
-
-        elif op == 'DIVI':
-            b = self.stack.pop()
-            a = self.stack.pop()
-            self.stack.append(a // b if b != 0 else 0)
-
-        elif op == 'LTI':
-            b = self.stack.pop()
-            a = self.stack.pop()
-            self.stack.append(1 if a < b else 0)
-
-        elif op == 'LEI':
-            b = self.stack.pop()
-            a = self.stack.pop()
-            self.stack.append(1 if a <= b else 0)
-
-        elif op == 'GTI':
-            b = self.stack.pop()
-            a = self.stack.pop()
-            self.stack.append(1 if a > b else 0)
-
-        elif op == 'GEI':
-            b = self.stack.pop()
-            a = self.stack.pop()
-            self.stack.append(1 if a >= b else 0)
-
-        elif op == 'EQI':
-            b = self.stack.pop()
-            a = self.stack.pop()
-            self.stack.append(1 if a == b else 0)
-
-        elif op == 'NEI':
-            b = self.stack.pop()
-            a = self.stack.pop()
-            self.stack.append(1 if a != b else 0)
-
+        handler = self.opcodes.get(op)
+        if handler is None:
+            raise Exception(f"Instrucción no soportada: {op}")
+        if target is not None:
+            arg = target + 1          # Se salta la propia etiqueta de destino
         elif op == 'CALL':
-            func_name = args[0]
-            func = self.module.functions[func_name]
-            nargs = len(func.parmnames)
-            call_args = [self.stack.pop() for _ in range(nargs)][::-1]
-            self.run_function(func_name, call_args)
-
-        elif op == 'RET':
-            self.running = False
-
-        elif op == 'PRINTI':
-            val = self.stack.pop()
-            print(val, end='\n')
-
-        elif op == 'PRINTB':
-            val = self.stack.pop()
-            print(chr(val), end='')
-
-        elif op == 'GROW':
-            addr = self.stack.pop()
-            self.stack.append(addr + 1)
-
-        elif op == 'POKEI':
-            val = self.stack.pop()
-            addr = self.stack.pop()
-            self.memory[addr] = val
-
-        elif op == 'PEEKI':
-            addr = self.stack.pop()
-            val = self.memory.get(addr, 0)
-            self.stack.append(val)
-
-        elif op == 'IF':
-            cond = self.stack.pop()
-            if cond == 0:
-                self.pc = self.find_next('ELSE', self.pc)
+            arg = self.module.functions[instr[1]]
+        elif op in ('LOCAL_GET', 'LOCAL_SET'):
+            arg = func.slot(instr[1])
+        elif op in ('GLOBAL_GET', 'GLOBAL_SET'):
+            arg = self.module.globals[instr[1]].slot
+        elif len(instr) > 1:
+            arg = instr[1]
+        else:
+            arg = None
+        return handler, arg
+
+    def memory_view(self):
+        # Vista de la misma memoria como celdas float (para PEEKF/POKEF)
+        return memoryview(self.memory).cast('B').cast('d')
+
+    def grow(self, ncells):
+        '''
+        Agrega `ncells` celdas en cero al final de la memoria y devuelve
+        la dirección base del bloque nuevo.
+        '''
+        if ncells < 0:
+            raise Exception(f"GROW con tamaño negativo: {ncells}")
+        base = len(self.memory)
+        self.fmemory.release()       # Un array exportado no se puede redimensionar
+        self.memory.frombytes(bytes(ncells * self.memory.itemsize))
+        self.fmemory = self.memory_view()
+        return base
+
+    def check_address(self, addr):
+        if not 0 <= addr < len(self.memory):
+            raise Exception(f"Acceso a memoria fuera de rango: {addr} (tamaño {len(self.memory)})")
+        return addr
+
+    def check_value(self, val):
+        # Una celda guarda un entero de 64 bits con signo
+        if type(val) is not int or not -2**63 <= val < 2**63:
+            raise Exception(f"Valor fuera de rango para una celda de memoria: {val!r}")
+        return val
 
-        elif op == 'ELSE':
-            self.pc = self.find_next('ENDIF', self.pc)
+    def run_function(self, func_name, args=None):
+        func = self.module.functions[func_name]
+        self.stack.extend(args or [])
+        self.op_CALL(func, None)
+        try:
+            self.execute()
+        finally:
+            self.output.flush()
+
+    def execute(self):
+        '''
+        Ciclo único de despacho. Corre hasta que retorna el último frame.
+        '''
+        frame = self.frame
+        while frame is not None:
+            code = frame.code
+            pc = frame.pc
+            while pc is not None:
+                handler, arg = code[pc]
+                pc = handler(self, arg, pc + 1)
+            frame = self.frame
+
+    # Variables y constantes
+
+    def op_CONSTI(self, value, pc):
+        self.stack.append(value)
+        return pc
+
+    def op_CONSTF(self, value, pc):
+        self.stack.append(value)
+        return pc
+
+    def op_LOCAL_GET(self, slot, pc):
+        self.stack.append(self.locals[slot])
+        return pc
+
+    def op_GLOBAL_GET(self, slot, pc):
+        self.stack.append(self.globals[slot])
+        return pc
+
+    def op_LOCAL_SET(self, slot, pc):
+        self.locals[slot] = self.stack.pop()
+        return pc
+
+    def op_GLOBAL_SET(self, slot, pc):
+        self.globals[slot] = self.stack.pop()
+        return pc
+
+    # Aritmética entera
+
+    def op_ADDI(self, _, pc):
+        b = self.stack.pop()
+        self.stack[-1] += b
+        return pc
+
+    def op_SUBI(self, _, pc):
+        b = self.stack.pop()
+        self.stack[-1] -= b
+        return pc
+
+    def op_MULI(self, _, pc):
+        b = self.stack.pop()
+        self.stack[-1] *= b
+        return pc
+
+    def op_DIVI(self, _, pc):
+        stack = self.stack
+        b = stack.pop()
+        stack[-1] = stack[-1] // b if b != 0 else 0
+        return pc
+
+    # Operaciones que deja la reducción de fuerza (optimize/strength.py)
+
+    def op_NEGI(self, _, pc):
+        self.stack[-1] = -self.stack[-1]
+        return pc
+
+    def op_MODI(self, _, pc):
+        # a - b * (a / b): con b == 0 la división da 0 y queda a
+        stack = self.stack
+        b = stack.pop()
+        if b != 0:
+            stack[-1] %= b
+        return pc
+
+    def op_SHLI(self, _, pc):
+        b = self.stack.pop()
+        self.stack[-1] <<= b
+        return pc
+
+    def op_SHRI(self, _, pc):
+        b = self.stack.pop()
+        self.stack[-1] >>= b
+        return pc
+
+    # Comparaciones enteras
+
+    def op_LTI(self, _, pc):
+        stack = self.stack
+        b = stack.pop()
+        stack[-1] = 1 if stack[-1] < b else 0
+        return pc
+
+    def op_LEI(self, _, pc):
+        stack = self.stack
+        b = stack.pop()
+        stack[-1] = 1 if stack[-1] <= b else 0
+        return pc
+
+    def op_GTI(self, _, pc):
+        stack = self.stack
+        b = stack.pop()
+        stack[-1] = 1 if stack[-1] > b else 0
+        return pc
+
+    def op_GEI(self, _, pc):
+        stack = self.stack
+        b = stack.pop()
+        stack[-1] = 1 if stack[-1] >= b else 0
+        return pc
+
+    def op_EQI(self, _, pc):
+        stack = self.stack
+        b = stack.pop()
+        stack[-1] = 1 if stack[-1] == b else 0
+        return pc
+
+    def op_NEI(self, _, pc):
+        stack = self.stack
+        b = stack.pop()
+        stack[-1] = 1 if stack[-1] != b else 0
+        return pc
+
+    # Operaciones lógicas (los bool son enteros 0/1)
+
+    def op_ANDI(self, _, pc):
+        b = self.stack.pop()
+        self.stack[-1] &= b
+        return pc
+
+    def op_ORI(self, _, pc):
+        b = self.stack.pop()
+        self.stack[-1] |= b
+        return pc
+
+    # Aritmética y comparaciones flotantes. Salvo la división, los
+    # operadores de Python ya hacen lo correcto con float, así que se
+    # reutilizan los manejadores enteros.
+
+    op_ADDF = op_ADDI
+    op_SUBF = op_SUBI
+    op_MULF = op_MULI
+    op_NEGF = op_NEGI
+
+    def op_DIVF(self, _, pc):
+        stack = self.stack
+        b = stack.pop()
+        stack[-1] = stack[-1] / b if b != 0 else 0.0
+        return pc
+
+    op_LTF = op_LTI
+    op_LEF = op_LEI
+    op_GTF = op_GTI
+    op_GEF = op_GEI
+    op_EQF = op_EQI
+    op_NEF = op_NEI
+
+    # Conversiones
+
+    def op_ITOF(self, _, pc):
+        self.stack[-1] = float(self.stack[-1])
+        return pc
+
+    def op_FTOI(self, _, pc):
+        self.stack[-1] = int(self.stack[-1])      # Trunca hacia cero
+        return pc
+
+    # Funciones
+
+    def op_CALL(self, func, pc):
+        caller = self.frame
+        if caller is not None:
+            caller.pc = pc              # Dirección de retorno
+            self.frames.append(caller)
+        frame = self.pool.pop() if self.pool else Frame()
+        frame.func = func
+        frame.code = self.loaded.get(func.name) or self.load(func)
+        frame.pc = 0
+        frame.locals = locals_ = [0] * func.frame_size
+        nargs = len(func.parmnames)
+        if nargs:
+            stack = self.stack
+            locals_[:nargs] = stack[-nargs:]
+            del stack[-nargs:]
+        self.frame = frame
+        self.locals = locals_
+        return None
+
+    def op_POP(self, _, pc):
+        self.stack.pop()
+        return pc
+
+    def op_RET(self, _, pc):
+        self.pool.append(self.frame)
+        if self.frames:
+            frame = self.frame = self.frames.pop()
+            self.locals = frame.locals
+        else:
+            self.frame = None
+        return None
 
-        elif op == 'ENDIF':
-            pass
+    # Entrada/salida
 
-        elif op == 'LOOP':
-            self.loop_start = self.pc
+    def op_PRINTI(self, _, pc):
+        self.output.write(f'{self.stack.pop()}\n')
+        return pc
 
-        elif op == 'ENDLOOP':
-            self.pc = self.loop_start - 1
+    op_PRINTF = op_PRINTI
 
-        elif op == 'CBREAK':
-            cond = self.stack.pop()
-            if cond == 0:
-                self.pc = self.find_next('ENDLOOP', self.pc)
+    def op_PRINTB(self, _, pc):
+        self.output.write(chr(self.stack.pop()))
+        return pc
 
-        elif op == 'CONTINUE':
-            self.pc = self.loop_start - 1
+    # Memoria. Cada dirección es una celda; las variantes B y F leen y
+    # escriben la misma celda como byte o como float. Un byte ocupa una
+    # celda entera de 8 bytes: POKEB sólo recorta el valor a 0..255.
 
-        else:
-            raise Exception(f"Instrucción no soportada: {op}")
+    def op_GROW(self, _, pc):
+        self.stack[-1] = self.grow(self.stack[-1])
+        return pc
 
-    def find_next(self, label, from_idx):
-        for i in range(from_idx + 1, len(self.current_func.code)):
-            if self.current_func.code[i][0] == label:
-                return i
-        raise Exception(f"No se encontró la etiqueta {label}")
+    def op_POKEI(self, _, pc):
+        stack = self.stack
+        val = stack.pop()
+        addr = stack.pop()
+        if addr < 0:
+            self.check_address(addr)
+        try:
+            self.memory[addr] = val
+        except IndexError:
+            self.check_address(addr)
+        except (OverflowError, TypeError):
+            self.check_value(val)
+        return pc
+
+    def op_PEEKI(self, _, pc):
+        stack = self.stack
+        addr = stack[-1]
+        if addr < 0:
+            self.check_address(addr)
+        try:
+            stack[-1] = self.memory[addr]
+        except IndexError:
+            self.check_address(addr)
+        return pc
+
+    def op_POKEB(self, _, pc):
+        stack = self.stack
+        val = stack.pop()
+        addr = stack.pop()
+        if addr < 0:
+            self.check_address(addr)
+        try:
+            self.memory[addr] = val & 0xFF
+        except IndexError:
+            self.check_address(addr)
+        return pc
+
+    def op_PEEKB(self, _, pc):
+        stack = self.stack
+        addr = stack[-1]
+        if addr < 0:
+            self.check_address(addr)
+        try:
+            stack[-1] = self.memory[addr] & 0xFF
+        except IndexError:
+            self.check_address(addr)
+        return pc
+
+    def op_POKEF(self, _, pc):
+        stack = self.stack
+        val = stack.pop()
+        addr = stack.pop()
+        if addr < 0:
+            self.check_address(addr)
+        try:
+            self.fmemory[addr] = val
+        except IndexError:
+            self.check_address(addr)
+        return pc
+
+    def op_PEEKF(self, _, pc):
+        stack = self.stack
+        addr = stack[-1]
+        if addr < 0:
+            self.check_address(addr)
+        try:
+            stack[-1] = self.fmemory[addr]
+        except IndexError:
+            self.check_address(addr)
+        return pc
+
+    # Superinstrucciones (las genera `fuse`; no son opcodes del IR).
+    # El pc recibido es el de la instrucción que sigue a la primera de
+    # la secuencia.
+
+    def fused_NEG(self, _, pc):
+        self.stack.append(-self.stack.pop())
+        return pc + 1
+
+    def fused_INC_L(self, arg, pc):
+        slot, step = arg
+        self.locals[slot] += step
+        return pc + 3
+
+    def fused_INC_X(self, arg, pc):
+        values, slot, step = arg
+        values[slot] += step
+        return pc + 3
+
+    def fused_BRANCH_LL(self, arg, pc):
+        a, b, cmp, target = arg
+        locals_ = self.locals
+        return pc + 3 if cmp(locals_[a], locals_[b]) else target
+
+    def fused_BRANCH_LX(self, arg, pc):
+        a, bvalues, b, cmp, target = arg
+        return pc + 3 if cmp(self.locals[a], bvalues[b]) else target
+
+    def fused_BRANCH_XL(self, arg, pc):
+        avalues, a, b, cmp, target = arg
+        return pc + 3 if cmp(avalues[a], self.locals[b]) else target
+
+    def fused_BRANCH_XX(self, arg, pc):
+        avalues, a, bvalues, b, cmp, target = arg
+        return pc + 3 if cmp(avalues[a], bvalues[b]) else target
+
+    # Control estructurado. El operando es el pc de destino ya resuelto.
+
+    def op_IF(self, target, pc):
+        return pc if self.stack.pop() else target
+
+    def op_ELSE(self, target, pc):
+        return target
+
+    def op_ENDIF(self, _, pc):
+        return pc
+
+    def op_LOOP(self, _, pc):
+        return pc
+
+    def op_ENDLOOP(self, target, pc):
+        return target
+
+    def op_CBREAK(self, target, pc):
+        return pc if self.stack.pop() else target
+
+    def op_BREAK(self, target, pc):
+        return target
+
+    def op_CONTINUE(self, target, pc):
+        return target
@@ -1,7 +1,7 @@
 import unittest
-from parse.model import Variable, Assignment, NamedLocation, Integer, Float, Bool, Function, Parameter, Print, FunctionCall, Return, Break, Continue, If, While, BinOp, UnaryOp, TypeCast
+from parse.model import Variable, Assignment, NamedLocation, Integer, Float, Bool, Function, Parameter, Print, FunctionCall, Return, Break, Continue, If, While, BinOp, UnaryOp, TypeCast, MemoryLocation, Char
 from semantic.check import Checker
-from semantic.symtab import Symtab
+from semantic.symtab import Symtab, Binding
 
 class TestSemanticChecker(unittest.TestCase):
 
@@ -114,5 +114,62 @@ class TestSemanticChecker(unittest.TestCase):
         checker = self.check_program(stmts)
         self.assertEqual(len(checker.errors), 0)
 
+    def test_unary_operator_names(self):
+        stmts = [Print(UnaryOp('MINUS', Integer(1))), Print(UnaryOp('MINUS', Float(2.5)))]
+        checker = self.check_program(stmts)
+        self.assertEqual(len(checker.errors), 0)
+
+    def test_dispatch_cache_per_visitor(self):
+        from ircode import IRCode
+        self.check_program([Print(BinOp(Integer(1), 'PLUS', Integer(2)))])
+        self.assertIs(Checker._dispatch[BinOp], Checker.visit_BinOp)
+        self.assertIsNot(Checker._dispatch, IRCode._dispatch)
+
+    def test_bindings(self):
+        param = Parameter("n", "int")
+        body_var = Variable("k", "int", NamedLocation("n"), False)
+        use_global = NamedLocation("g")
+        func = Function("f", [param], "int", [body_var, Return(BinOp(NamedLocation("k"), 'PLUS', use_global))])
+        call = FunctionCall("f", [Integer(1)])
+        glob = Variable("g", "int", Integer(2), False)
+        checker = self.check_program([glob, func, Print(call)])
+        self.assertEqual(len(checker.errors), 0)
+        self.assertEqual((glob.binding.scope, glob.binding.slot), (Binding.GLOBAL, 0))
+        self.assertEqual((param.binding.scope, param.binding.slot), (Binding.LOCAL, 0))
+        self.assertEqual((body_var.binding.scope, body_var.binding.slot), (Binding.LOCAL, 1))
+        self.assertIs(body_var.expression.binding, param.binding)
+        self.assertIs(use_global.binding, glob.binding)
+        self.assertEqual((call.binding.scope, call.binding.slot), (Binding.FUNCTION, 0))
+
+    def test_expression_types(self):
+        # Las declaraciones usan el nombre del token ("FLOAT_TYPE", ...)
+        param = Parameter("x", "FLOAT_TYPE")
+        scaled = BinOp(NamedLocation("x"), 'TIMES', Float(2.0))
+        func = Function("f", [param], "float", [Return(scaled)])
+        cast = TypeCast("INT", FunctionCall("f", [Float(1.5)]))
+        flag = Variable("b", "BOOL_TYPE", BinOp(cast, 'LT', Integer(3)), False)
+        checker = self.check_program([func, flag])
+        self.assertEqual(len(checker.errors), 0)
+        self.assertEqual((scaled.left.expr_type, scaled.expr_type), ('float', 'float'))
+        self.assertEqual((cast.expr.expr_type, cast.expr_type), ('float', 'int'))
+        self.assertEqual(flag.expression.expr_type, 'bool')
+
+    def test_memory_load_type_from_cast(self):
+        loads = [TypeCast("float", MemoryLocation(Integer(0))),
+                 TypeCast("char", MemoryLocation(Integer(1))),
+                 MemoryLocation(Integer(2))]
+        checker = self.check_program([Print(load) for load in loads])
+        self.assertEqual(len(checker.errors), 0)
+        self.assertEqual([load.expr_type for load in loads], ['float', 'char', 'int'])
+        self.assertEqual(loads[0].expr.expr_type, 'float')
+        self.assertEqual(loads[1].expr.expr_type, 'char')
+
+    def test_memory_store_types(self):
+        stores = [Assignment(MemoryLocation(Integer(0)), value)
+                  for value in (Integer(1), Float(1.5), Char('a'))]
+        self.assertEqual(len(self.check_program(stores).errors), 0)
+        checker = self.check_program([Assignment(MemoryLocation(Integer(0)), Bool(True))])
+        self.assertIn("No se puede asignar tipo 'bool' a una celda de memoria", checker.errors[0])
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,53 @@
+import glob
+import os
+import tempfile
+import unittest
+
+from parse.parse import parse_source, ast_to_dict
+from parse.astbin import dumps, loads, write_ast_binary, read_ast_binary
+from parse.model import Function, BinOp, Integer
+
+SAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'samples')
+
+class TestAstBinary(unittest.TestCase):
+
+    def test_round_trip_samples(self):
+        for path in sorted(glob.glob(os.path.join(SAMPLES, '*.gox'))):
+            with open(path, encoding='utf-8') as f:
+                try:
+                    ast = parse_source(f.read())
+                except SyntaxError:
+                    continue
+            with self.subTest(sample=os.path.basename(path)):
+                self.assertEqual(ast_to_dict(loads(dumps(ast))), ast_to_dict(ast))
+
+    def test_loads_model_nodes(self):
+        ast = loads(dumps(parse_source("func f(a int) int { return a * 2 + 1; } print f(3);")))
+        function = ast[0]
+        self.assertIsInstance(function, Function)
+        self.assertEqual(function.params[0].type, 'INT')
+        expr = function.body[0].expression
+        self.assertIsInstance(expr, BinOp)
+        self.assertIsInstance(expr.right, Integer)
+        self.assertEqual(expr.op, 'PLUS')
+
+    def test_deep_expression(self):
+        source = "print " + " + ".join(["1"] * 5000) + ";"
+        ast = loads(dumps(parse_source(source)))
+        depth = 0
+        expr = ast[0].expression
+        while isinstance(expr, BinOp):
+            expr, depth = expr.left, depth + 1
+        self.assertEqual(depth, 4999)
+
+    def test_file_and_bad_data(self):
+        ast = parse_source("var x int = 1; print x;")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'ast.astb')
+            write_ast_binary(ast, path)
+            self.assertEqual(ast_to_dict(read_ast_binary(path)), ast_to_dict(ast))
+        with self.assertRaises(ValueError):
+            loads(b'{"json": true}')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,184 @@
+import io
+import os
+import unittest
+from contextlib import redirect_stdout
+
+from compiled_machine import CompiledMachine, FunctionCompiler
+from ircode import IRCode
+from optimize.constfold import ConstantFolder
+from test.test_constfold import checked_ast, run_module
+from test.test_stack_machine import compile_source, run_source
+
+SAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'samples')
+
+def run_compiled(source_code):
+    module = compile_source(source_code)
+    out = io.StringIO()
+    with redirect_stdout(out):
+        CompiledMachine(module).run_function('main')
+    return out.getvalue().split()
+
+class TestCompiledMachine(unittest.TestCase):
+
+    def assertSameOutput(self, source_code):
+        expected = run_source(source_code)
+        self.assertEqual(run_compiled(source_code), expected)
+        return expected
+
+    def test_samples_match_interpreter(self):
+        for name in ('criba.gox', 'factorize.gox'):
+            with self.subTest(sample=name):
+                with open(os.path.join(SAMPLES, name), encoding='utf-8') as f:
+                    self.assertSameOutput(f.read())
+
+    def test_float_operations(self):
+        self.assertSameOutput("""
+        var x float = 1.0;
+        var i int = 0;
+        while x < 100.0 {
+            x = x * 1.5 + float(i) / 3.0;
+            i = i + 1;
+        }
+        print x;
+        print int(x) / 7;
+        print x / 0.0;
+        """)
+
+    def test_deep_recursion(self):
+        source = """
+        func total(n int) int {
+            if n == 0 { return 0; }
+            return n + total(n - 1);
+        }
+        print total(20000);
+        """
+        self.assertEqual(self.assertSameOutput(source), ['200010000'])
+
+    def test_break_and_continue_in_nested_loops(self):
+        source = """
+        var i int = 0;
+        var hits int = 0;
+        while i < 5 {
+            i = i + 1;
+            var j int = 0;
+            while true {
+                j = j + 1;
+                if j == 3 { break; }
+                hits = hits + 1;
+            }
+            if i == 2 { continue; }
+            hits = hits + 100;
+        }
+        print hits;
+        """
+        self.assertEqual(self.assertSameOutput(source), ['410'])
+
+    def test_evaluation_order_around_calls(self):
+        # La lectura de g debe hacerse antes de la llamada que la modifica
+        source = """
+        var g int = 1;
+        func bump() int { g = g + 10; return g; }
+        print g + bump();
+        print bump() + g;
+        print g / 0;
+        """
+        self.assertEqual(self.assertSameOutput(source), ['12', '42', '0'])
+
+    def test_comparison_values(self):
+        source = """
+        var a int = 3;
+        print a < 5;
+        print a == 4;
+        """
+        self.assertEqual(self.assertSameOutput(source), ['1', '0'])
+
+    def test_buffered_output_sink(self):
+        module = compile_source("""
+        var i int = 0;
+        while i < 3 { print i; print 'x'; i = i + 1; }
+        """)
+        sink = io.BytesIO()
+        CompiledMachine(module, out=sink, buffer_size=4).run_function('main')
+        self.assertEqual(sink.getvalue(), b'0\nx1\nx2\nx')
+
+    def test_typed_memory_round_trip(self):
+        output = self.assertSameOutput("""
+        var base int = ^3;
+        `base = 1.5;
+        `(base + 1) = 'A';
+        `(base + 2) = -7;
+        print float(`base) * 2.0;
+        print char(`(base + 1));
+        print `(base + 2);
+        print int(`(base + 2));
+        """)
+        self.assertEqual(output, ['3.0', 'A-7', '-7'])
+
+    def test_memory_out_of_range(self):
+        module = compile_source("""
+        const base = ^2;
+        `(base + 2) = 1;
+        """)
+        with self.assertRaises(Exception) as cm:
+            CompiledMachine(module).run_function('main')
+        self.assertIn("fuera de rango", str(cm.exception))
+
+    def test_memory_value_out_of_range(self):
+        module = compile_source("""
+        const base = ^1;
+        `base = 9223372036854775807 + 1;
+        """)
+        with self.assertRaises(Exception) as cm:
+            CompiledMachine(module).run_function('main')
+        self.assertIn("Valor fuera de rango", str(cm.exception))
+
+    def test_code_cached_on_function(self):
+        module = compile_source("""
+        func sq(x int) int { return x * x; }
+        print sq(9);
+        """)
+        with redirect_stdout(io.StringIO()):
+            CompiledMachine(module).run_function('main')
+        code = module.functions['sq'].compiled
+        self.assertIsNotNone(code)
+        machine = CompiledMachine(module)
+        self.assertIs(module.functions['sq'].compiled, code)
+        machine.run_function('sq', [7])
+        self.assertEqual(machine.stack, [49])
+
+    def test_simple_loop_test_becomes_while_condition(self):
+        module = compile_source("""
+        var i int = 0;
+        while i < 10 { i = i + 1; }
+        """)
+        source = FunctionCompiler(module.functions['main']).source()
+        self.assertIn('while (G[0] < 10):', source)
+
+    def test_non_finite_float_constants(self):
+        # El plegado deja CONSTF inf y nan en el IR
+        big = '1' + '0' * 300 + '.0'
+        ast = checked_ast(f"""
+        const big = {big};
+        var x float = big * big;
+        print x;
+        print -(big * big);
+        print x - x;
+        print 1.0 / (big * big);
+        """)
+        ConstantFolder.fold(ast)
+        module = IRCode.gencode(ast)
+        self.assertIn(('CONSTF', float('inf')), module.functions['main'].code)
+        out = io.StringIO()
+        CompiledMachine(module, out=out).run_function('main')
+        self.assertEqual(out.getvalue().split(), run_module(module))
+        self.assertEqual(out.getvalue().split()[:3], ['inf', '-inf', 'nan'])
+
+    def test_unsupported_instruction(self):
+        module = compile_source("print 1;")
+        module.functions['main'].code.insert(0, ('NOPE',))
+        with self.assertRaises(Exception) as cm:
+            CompiledMachine(module)
+        self.assertIn("Instrucción no soportada: NOPE", str(cm.exception))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,177 @@
+import io
+import os
+import unittest
+from contextlib import redirect_stdout
+
+from lexer.scanner import Scanner
+from parse.parse import Parser
+from parse.model import Float
+from semantic.check import Checker
+from ircode import IRCode
+from optimize.constfold import ConstantFolder
+from stack_machine import StackMachine
+from compiled_machine import CompiledMachine
+from tracing_machine import TracingMachine
+from test.test_stack_machine import error_handler
+
+SAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'samples')
+
+def checked_ast(source_code):
+    ast = Parser(Scanner(source_code, error_handler).scan_tokens()).parse()
+    with redirect_stdout(io.StringIO()):
+        checker = Checker.check(ast)
+    assert not checker.errors, checker.errors
+    return ast
+
+def run_module(module):
+    out = io.StringIO()
+    StackMachine(module, out=out).run_function('main')
+    return out.getvalue().split()
+
+def optimized(test, source_code, *passes, fold=False):
+    '''
+    Genera el IR de `source_code` (plegado si `fold`) y le aplica `passes`,
+    funciones que reciben el módulo. Verifica con las tres máquinas que la
+    salida no cambie. Retorna (módulo, [resultado de cada pasada]).
+    '''
+    ast = checked_ast(source_code)
+    expected = run_module(IRCode.gencode(ast))
+    if fold:
+        ConstantFolder.fold(ast)
+    module = IRCode.gencode(ast)
+    results = [pass_(module) for pass_ in passes]
+    for machine in (StackMachine, CompiledMachine, TracingMachine):
+        with test.subTest(machine=machine.__name__):
+            out = io.StringIO()
+            machine(module, out=out).run_function('main')
+            test.assertEqual(out.getvalue().split(), expected)
+    return module, results
+
+class TestConstantFolder(unittest.TestCase):
+
+    def fold(self, source_code):
+        '''Retorna (IR sin optimizar, IR optimizado, plegador)'''
+        ast = checked_ast(source_code)
+        before = IRCode.gencode(ast)
+        folder = ConstantFolder.fold(ast)
+        after = IRCode.gencode(ast)
+        self.assertEqual(run_module(after), run_module(before))
+        return before, after, folder
+
+    def test_fold_literals(self):
+        _, after, folder = self.fold("""
+        print 2 * 3 + 4;
+        print 7 / 2;
+        print 7 / 0;
+        print 7.0 / 2.0;
+        print float(3) * 0.5;
+        print int(2.9);
+        """)
+        code = after.functions['main'].code
+        self.assertEqual([instr for instr in code if instr[0].startswith('CONST')],
+                         [('CONSTI', 10), ('CONSTI', 3), ('CONSTI', 0), ('CONSTF', 3.5),
+                          ('CONSTF', 1.5), ('CONSTI', 2), ('CONSTI', 0)])
+        self.assertEqual(run_module(after), ['10', '3', '0', '3.5', '1.5', '2'])
+        self.assertEqual(folder.stats['folded'], 8)
+
+    def test_cast_out_of_float_range_is_kept(self):
+        # float() de este literal falla; sólo debe fallar si se ejecuta
+        big = '1' + '0' * 400
+        _, after, folder = self.fold(f"""
+        func never() float {{ return float({big}); }}
+        print 1;
+        """)
+        self.assertIn(('ITOF',), after.functions['never'].code)
+        self.assertEqual(folder.stats['folded'], 0)
+
+    def test_fold_comparisons(self):
+        _, after, _ = self.fold("""
+        var x int = 0;
+        if 1 < 2 && 'a' != 'b' { x = 1; }
+        print x;
+        """)
+        self.assertIn(('CONSTI', 1), after.functions['main'].code)
+        self.assertNotIn(('LTI',), after.functions['main'].code)
+
+    def test_propagate_constants(self):
+        before, after, folder = self.fold("""
+        const n = 100;
+        const half = n / 2;
+        const scale = 1.5;
+        func f(x int) int {
+            const k = 3;
+            return x * k + n;
+        }
+        print f(half);
+        print float(n) * scale;
+        """)
+        main, f = after.functions['main'], after.functions['f']
+        self.assertFalse([instr for instr in main.code + f.code if instr[0].startswith('GLOBAL_')])
+        self.assertNotIn('k', f.locals)
+        self.assertIn(('CONSTI', 50), main.code)
+        self.assertIn(('CONSTF', 150.0), main.code)
+        self.assertEqual(folder.stats['propagated'], 6)
+        self.assertLess(len(main.code), len(before.functions['main'].code))
+
+    def test_non_literal_constant_is_kept(self):
+        _, after, _ = self.fold("""
+        const base = ^(4 + 1);
+        `base = 7;
+        print `base;
+        """)
+        code = after.functions['main'].code
+        self.assertIn(('GLOBAL_GET', 'base'), code)
+        self.assertEqual(code[:3], [('CONSTI', 5), ('GROW',), ('GLOBAL_SET', 'base')])
+
+    def test_shadowed_constant(self):
+        _, after, _ = self.fold("""
+        const n = 10;
+        func f(n int) int { return n + 1; }
+        print f(3);
+        print n;
+        """)
+        self.assertEqual(run_module(after), ['4', '10'])
+
+    def test_identities(self):
+        _, after, folder = self.fold("""
+        func f(x int) int { print x; return x; }
+        var a int = 5;
+        var b float = 2.5;
+        print a + 0;
+        print 0 + a * 1;
+        print a - 0;
+        print a / 1;
+        print b * 1.0;
+        print -(-a);
+        print f(1) * 0;
+        print a * 0;
+        """)
+        code = after.functions['main'].code
+        self.assertFalse({'ADDI', 'SUBI', 'DIVI', 'MULF'} & {instr[0] for instr in code})
+        self.assertIn(('CALL', 'f'), code)          # f(1) * 0 conserva la llamada
+        self.assertEqual(code.count(('MULI',)), 1)
+        self.assertEqual(folder.stats['simplified'], 8)
+
+    def test_float_zero_is_not_neutral(self):
+        ast = checked_ast("var b float = 2.5; print b + 0.0; print b * 0.0;")
+        ConstantFolder.fold(ast)
+        ops = [instr[0] for instr in IRCode.gencode(ast).functions['main'].code]
+        self.assertIn('ADDF', ops)
+        self.assertIn('MULF', ops)
+
+    def test_folded_nodes_keep_span_and_type(self):
+        ast = checked_ast("var x float = 1.5 * 2.0;\n")
+        ConstantFolder.fold(ast)
+        value = ast[0].expression
+        self.assertIsInstance(value, Float)
+        self.assertEqual(value.expr_type, 'float')
+        self.assertEqual((value.lineno, value.column), (1, 15))
+
+    def test_samples_match_unoptimized(self):
+        for name in ('criba.gox', 'factorize.gox', 'is_prime.gox', 'program2.gox'):
+            with self.subTest(sample=name):
+                with open(os.path.join(SAMPLES, name), encoding='utf-8') as f:
+                    self.fold(f.read())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import unittest
+
+from ircode import IRCode
+from optimize.constfold import ConstantFolder
+from optimize.cse import CommonSubexpressions
+from optimize.deadcode import DeadCode
+from optimize.inline import Inliner
+from optimize.flow import stack_effect
+from test.test_constfold import checked_ast, optimized
+
+class TestCommonSubexpressions(unittest.TestCase):
+
+    def eliminate(self, source_code):
+        module, (pass_, _) = optimized(self, source_code, CommonSubexpressions.eliminate,
+                                       DeadCode.eliminate)
+        return module, pass_
+
+    def count(self, func, op):
+        return [instr[0] for instr in func.code].count(op)
+
+    def test_repeated_expression(self):
+        module, pass_ = self.eliminate("""
+        func f(x float, y float) float {
+            var a float = x * x + y * y;
+            var b float = (x * x + y * y) * 2.0 - x * x;
+            return a + b;
+        }
+        print f(1.5, 2.5);
+        """)
+        func = module.functions['f']
+        self.assertEqual(self.count(func, 'MULF'), 3)       # x*x, y*y y el * 2.0
+        self.assertEqual(self.count(func, 'ADDF'), 2)
+        self.assertEqual(pass_.eliminated['f'], 4)
+        self.assertEqual(pass_.stats['expressions'], 2)
+
+    def test_assignment_invalidates(self):
+        module, pass_ = self.eliminate("""
+        func f(x int) int {
+            var a int = x * 3;
+            x = x + 1;
+            var b int = x * 3;
+            return a + b;
+        }
+        print f(4);
+        """)
+        self.assertEqual(pass_.stats['expressions'], 0)
+
+    def test_call_invalidates_written_globals(self):
+        module, pass_ = self.eliminate("""
+        var g int = 2;
+        var h int = 5;
+        func bump() int { g = g + 1; return 0; }
+        func f() int {
+            var a int = g * h + 1;
+            var b int = h * h;
+            var r int = bump();
+            var c int = g * h + 1;
+            var d int = h * h;
+            return a + b + c + d;
+        }
+        print f();
+        """)
+        func = module.functions['f']
+        self.assertEqual(pass_.stats['expressions'], 1)     # Sólo h * h
+        self.assertEqual(self.count(func, 'MULI'), 3)
+
+    def test_branches(self):
+        module, pass_ = self.eliminate("""
+        func f(x int, y int) int {
+            var s int = x * y + 1;
+            if s > 10 {
+                print x * y + 1;
+                print y - x * 2;
+            } else {
+                print x * y + 1;
+            }
+            print y - x * 2;
+            return x * y + 1;
+        }
+        print f(3, 4);
+        print f(1, 2);
+        """)
+        func = module.functions['f']
+        # x * y + 1 se reutiliza en las dos ramas y al final; y - x * 2 de
+        # la rama IF no sale de ella
+        self.assertEqual(pass_.stats['expressions'], 3)
+        self.assertEqual(self.count(func, 'SUBI'), 2)
+
+    def test_loop_starts_over(self):
+        module, pass_ = self.eliminate("""
+        func f(n int) int {
+            var i int = 0;
+            var s int = n * n + 1;
+            while i < n {
+                s = s + (n * n + 1);
+                i = i + 1;
+            }
+            return s;
+        }
+        print f(5);
+        """)
+        self.assertEqual(pass_.stats['expressions'], 0)
+
+    def test_effects_between_operands_are_kept(self):
+        # Con f expandida en línea, el print queda entre `a` y la suma
+        module, (_, pass_) = optimized(self, """
+        func f(x int) int { print x; return 5; }
+        func g(a int) int {
+            var b int = a + f(2);
+            var c int = a + f(3);
+            return b + c;
+        }
+        print g(1);
+        """, Inliner.inline, CommonSubexpressions.eliminate)
+        self.assertEqual(pass_.stats['expressions'], 0)
+
+    def test_small_repeat_does_not_grow_code(self):
+        ast = checked_ast("func f(x int) int { return x * x + x * x; } print f(3);")
+        before = len(IRCode.gencode(ast).functions['f'].code)
+        module = IRCode.gencode(ast)
+        CommonSubexpressions.eliminate(module)
+        self.assertEqual(len(module.functions['f'].code), before)
+        self.assertEqual(self.count(module.functions['f'], 'MULI'), 1)
+
+    def test_float_zero_sign(self):
+        ast = checked_ast("var x float = 2.0; print x * 0.0 + x * -0.0;")
+        ConstantFolder.fold(ast)
+        module = IRCode.gencode(ast)
+        self.assertIn(('CONSTF', -0.0), module.functions['main'].code)
+        pass_ = CommonSubexpressions.eliminate(module)
+        self.assertEqual(pass_.stats['expressions'], 0)
+
+    def test_stack_effect(self):
+        module = IRCode.gencode(checked_ast("func f(a int, b int) int { return a; } print f(1, 2);"))
+        self.assertEqual(stack_effect(module, ('CALL', 'f')), (2, 1))
+        self.assertEqual(stack_effect(module, ('POKEI',)), (2, 0))
+        self.assertEqual(stack_effect(module, ('ADDF',)), (2, 1))
+        self.assertEqual(stack_effect(module, ('LOOP', 1)), (0, 0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import unittest
+
+from optimize.deadcode import DeadCode
+from optimize.flow import live_locals, pure_start
+from test.test_constfold import optimized
+
+class TestDeadCode(unittest.TestCase):
+
+    def eliminate(self, source_code, fold=False):
+        module, (pass_,) = optimized(self, source_code, DeadCode.eliminate, fold=fold)
+        return module, pass_
+
+    def ops(self, func):
+        return [instr[0] for instr in func.code]
+
+    def test_code_after_return(self):
+        module, pass_ = self.eliminate("""
+        func sign(x int) int {
+            if x < 0 {
+                return -1;
+                print 99;
+            } else {
+                return 1;
+            }
+            print 100;
+        }
+        print sign(-4);
+        print sign(4);
+        """)
+        ops = self.ops(module.functions['sign'])
+        self.assertNotIn('PRINTI', ops)
+        self.assertEqual(ops[-1], 'ENDIF')          # Sin el CONSTI 0; RET final
+        self.assertEqual(pass_.stats['unreachable'], 6)
+
+    def test_code_after_break_and_continue(self):
+        module, _ = self.eliminate("""
+        var i int = 0;
+        while i < 10 {
+            i = i + 1;
+            if i == 3 { continue; print 77; }
+            if i == 5 { break; i = 100; }
+            print i;
+        }
+        """)
+        code = module.functions['main'].code
+        self.assertNotIn(('CONSTI', 100), code)
+        self.assertNotIn(('CONSTI', 77), code)
+
+    def test_if_without_else(self):
+        module, pass_ = self.eliminate("""
+        var i int = 0;
+        while i < 60 {
+            if i > 50 { print i; }
+            i = i + 1;
+        }
+        """)
+        self.assertNotIn('ELSE', self.ops(module.functions['main']))
+        self.assertEqual(pass_.stats['empty_arms'], 1)
+
+    def test_constant_conditions(self):
+        module, pass_ = self.eliminate("""
+        const debug = false;
+        var x int = 1;
+        if debug { print 0; } else { x = 2; }
+        if debug || true { print x; }
+        while debug { print 1; }
+        while 1 > 0 {
+            x = x + 1;
+            if x > 5 { break; }
+        }
+        print x;
+        """, fold=True)
+        ops = self.ops(module.functions['main'])
+        self.assertEqual(ops.count('IF'), 1)        # Sólo queda el de `x > 5`
+        self.assertEqual(ops.count('LOOP'), 1)
+        self.assertNotIn('CBREAK', ops)
+        self.assertEqual(pass_.stats['constant_branches'], 4)
+
+    def test_dead_stores_and_unused_locals(self):
+        module, pass_ = self.eliminate("""
+        func show(x int) int { print x; return x; }
+        func f(x int) int {
+            var unused int = x * 2;
+            var t int = 5;
+            var kept int = show(x);
+            t = x + 1;
+            return t;
+        }
+        print f(3);
+        """)
+        func = module.functions['f']
+        self.assertNotIn(('CONSTI', 5), func.code)
+        self.assertNotIn('MULI', self.ops(func))
+        self.assertIn(('CALL', 'show'), func.code)     # La llamada se conserva
+        self.assertEqual(set(func.locals), {'x', 't'})
+        self.assertEqual(func.frame_size, func.slots['t'] + 1)
+        self.assertEqual(pass_.stats['dead_stores'], 3)
+        self.assertEqual(pass_.stats['unused_locals'], 2)
+
+    def test_store_read_in_next_iteration_is_kept(self):
+        module, _ = self.eliminate("""
+        func f(n int) int {
+            var i int = 0;
+            var last int = 0;
+            var total int = 0;
+            while i < n {
+                total = total + last;
+                last = i;
+                i = i + 1;
+            }
+            return total;
+        }
+        print f(5);
+        """)
+        self.assertIn(('LOCAL_SET', 'last'), module.functions['f'].code)
+
+    def test_live_locals(self):
+        code = [('CONSTI', 1), ('LOCAL_SET', 'a'), ('CONSTI', 2), ('LOCAL_SET', 'b'),
+                ('LOCAL_GET', 'a'), ('RET',)]
+        live = live_locals(code)
+        self.assertEqual(live[1], {'a'})
+        self.assertEqual(live[3], {'a'})
+        self.assertEqual(live[4], frozenset())
+
+    def test_pure_start(self):
+        code = [('CALL', 'f'), ('LOCAL_GET', 'a'), ('CONSTI', 2), ('MULI',), ('ADDI',)]
+        self.assertEqual(pure_start(code, 4), 1)    # Valor de MULI
+        self.assertIsNone(pure_start(code, 5))      # ADDI usa el resultado de CALL
+
+if __name__ == '__main__':
+    unittest.main()
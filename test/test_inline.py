@@ -0,0 +1,115 @@
+import os
+import unittest
+
+from optimize.deadcode import DeadCode
+from optimize.flow import live_on_entry
+from optimize.inline import Inliner
+from test.test_constfold import SAMPLES, optimized
+
+class TestInliner(unittest.TestCase):
+
+    def inline(self, source_code, budget=12):
+        inline = lambda module: Inliner.inline(module, budget=budget)
+        module, (inliner, _) = optimized(self, source_code, inline, DeadCode.eliminate)
+        return module, inliner
+
+    def calls(self, func):
+        return [instr[1] for instr in func.code if instr[0] == 'CALL']
+
+    def test_inline_in_loop(self):
+        module, inliner = self.inline("""
+        func mod(a int, b int) int {
+            return a - b * (a / b);
+        }
+        var i int = 1;
+        var total int = 0;
+        while i < 50 {
+            total = total + mod(1000, i);
+            i = i + 1;
+        }
+        print total;
+        """)
+        main = module.functions['main']
+        self.assertEqual(self.calls(main), [])
+        self.assertIn('mod.a.1', main.locals)
+        self.assertEqual(inliner.sites, [('main', 'mod')])
+
+    def test_argument_order_and_renaming(self):
+        module, _ = self.inline("""
+        func sub(a int, b int) int { var t int = a - b; return t; }
+        func f(a int, t int) int { return sub(t, a) * 10 + sub(a, t); }
+        print f(3, 8);
+        """)
+        self.assertEqual(self.calls(module.functions['f']), [])
+
+    def test_budget(self):
+        source = """
+        func poly(x int) int { return x * x * x + 2 * x * x + 3 * x + 4; }
+        print poly(2);
+        var i int = 0;
+        while i < 3 { print poly(i); i = i + 1; }
+        """
+        module, inliner = self.inline(source, budget=10)
+        self.assertEqual(self.calls(module.functions['main']), ['poly'])     # Sólo la del ciclo
+        module, inliner = self.inline(source, budget=0)
+        self.assertEqual(self.calls(module.functions['main']), ['poly', 'poly'])
+        self.assertEqual(inliner.sites, [])
+
+    def test_recursive_and_multiple_returns_are_kept(self):
+        module, inliner = self.inline("""
+        func fact(n int) int {
+            if n < 2 { return 1; }
+            return n * fact(n - 1);
+        }
+        func sign(x int) int {
+            if x < 0 { return -1; }
+            return 1;
+        }
+        print fact(5);
+        print sign(-3);
+        """)
+        self.assertEqual(self.calls(module.functions['main']), ['fact', 'sign'])
+        self.assertEqual(inliner.sites, [])
+
+    def test_callee_locals_start_at_zero(self):
+        module, _ = self.inline("""
+        func count(n int) int {
+            var k int;
+            var i int = 0;
+            while i < n {
+                k = k + 1;
+                i = i + 1;
+            }
+            return k;
+        }
+        var j int = 0;
+        while j < 3 {
+            print count(j + 2);
+            j = j + 1;
+        }
+        """)
+        self.assertEqual(self.calls(module.functions['main']), [])
+
+    def test_leaves_become_inlinable(self):
+        module, inliner = self.inline("""
+        func square(x int) int { return x * x; }
+        func norm(x int, y int) int { return square(x) + square(y); }
+        print norm(3, 4);
+        """, budget=20)
+        self.assertEqual(self.calls(module.functions['main']), [])
+        self.assertEqual(inliner.sites, [('norm', 'square'), ('norm', 'square'), ('main', 'norm')])
+
+    def test_live_on_entry(self):
+        code = [('LOCAL_GET', 'a'), ('CONSTI', 1), ('LOCAL_SET', 'b'), ('LOCAL_GET', 'c'),
+                ('LOCAL_GET', 'b'), ('ADDI',), ('RET',)]
+        self.assertEqual(live_on_entry(code), {'a', 'c'})
+
+    def test_shor(self):
+        with open(os.path.join(SAMPLES, 'shor.gox'), encoding='utf-8') as f:
+            module, inliner = self.inline(f.read())
+        self.assertNotIn('mod', self.calls(module.functions['gcd']))
+        self.assertNotIn('mod', self.calls(module.functions['powmod']))
+        self.assertEqual(inliner.stats['inlined'], 5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import os
+import unittest
+
+from ircode import IRCode
+from optimize.flow import global_writes
+from optimize.licm import LoopInvariants
+from test.test_constfold import SAMPLES, checked_ast, optimized
+
+class TestLoopInvariants(unittest.TestCase):
+
+    def hoist(self, source_code):
+        module, (pass_,) = optimized(self, source_code, LoopInvariants.hoist, fold=True)
+        return module, pass_
+
+    def loop_body(self, func, label=1):
+        code = func.code
+        return code[code.index(('LOOP', label)):code.index(('ENDLOOP', label))]
+
+    def test_hoist_expression(self):
+        module, pass_ = self.hoist("""
+        func f(n int, k int) int {
+            var i int = 0;
+            var total int = 0;
+            while i < n {
+                total = total + i * (k * k + 1);
+                i = i + 1;
+            }
+            return total;
+        }
+        print f(10, 3);
+        """)
+        func = module.functions['f']
+        body = self.loop_body(func)
+        self.assertNotIn(('LOCAL_GET', 'k'), body)
+        self.assertIn(('LOCAL_GET', 'inv.1'), body)
+        self.assertEqual(pass_.stats['hoisted'], 1)
+        self.assertEqual(pass_.stats['instructions'], 5)
+
+    def test_assigned_local_is_not_invariant(self):
+        module, pass_ = self.hoist("""
+        var i int = 0;
+        var k int = 2;
+        while i < 5 {
+            print k * 3;
+            if i == 2 { k = 10; }
+            i = i + 1;
+        }
+        """)
+        self.assertIn(('MULI',), self.loop_body(module.functions['main']))
+
+    def test_global_written_by_call(self):
+        module, _ = self.hoist("""
+        var scale int = 1;
+        func bump() int { scale = scale + 1; return 0; }
+        func noop() int { return 0; }
+        var i int = 0;
+        while i < 4 {
+            print scale * 10;
+            var r int = bump();
+            i = i + 1;
+        }
+        var j int = 0;
+        while j < 3 {
+            print scale * 100;
+            var s int = noop();
+            j = j + 1;
+        }
+        """)
+        main = module.functions['main']
+        self.assertIn(('GLOBAL_GET', 'scale'), self.loop_body(main, 1))
+        self.assertNotIn(('GLOBAL_GET', 'scale'), self.loop_body(main, 2))
+
+    def test_nested_loops(self):
+        module, _ = self.hoist("""
+        func f(n int, k float) float {
+            var total float = 0.0;
+            var i int = 0;
+            while i < n {
+                var j int = 0;
+                while j < n {
+                    total = total + float(i) * k + k / 2.0;
+                    j = j + 1;
+                }
+                i = i + 1;
+            }
+            return total;
+        }
+        print f(4, 1.5);
+        """)
+        func = module.functions['f']
+        self.assertNotIn(('DIVF',), self.loop_body(func, 1))     # Sale de los dos ciclos
+        self.assertNotIn(('ITOF',), self.loop_body(func, 2))     # Sólo del interno
+        self.assertIn(('ITOF',), self.loop_body(func, 1))
+        self.assertEqual(func.locals['inv.1'], 'F')
+
+    def test_repeated_expression_shares_temporary(self):
+        module, pass_ = self.hoist("""
+        func f(a int, b int) int {
+            var i int = 0;
+            while i < a + b {
+                print i * (a + b);
+                i = i + 1;
+            }
+            return i;
+        }
+        print f(2, 3);
+        """)
+        self.assertEqual(pass_.stats['hoisted'], 1)
+        self.assertEqual(self.loop_body(module.functions['f']).count(('LOCAL_GET', 'inv.1')), 2)
+
+    def test_global_writes(self):
+        module = IRCode.gencode(checked_ast("""
+        var g int = 0;
+        var h int = 0;
+        func a() int { g = 1; return 0; }
+        func b() int { return a(); }
+        func c() int { return h; }
+        print b() + c();
+        """))
+        writes = global_writes(module)
+        self.assertEqual(writes['b'], {'g'})
+        self.assertEqual(writes['c'], frozenset())
+        self.assertEqual(writes['main'], {'g', 'h'})
+
+    def test_criba(self):
+        with open(os.path.join(SAMPLES, 'criba.gox'), encoding='utf-8') as f:
+            module, _ = self.hoist(f.read())
+        main = module.functions['main']
+        self.assertNotIn(('GLOBAL_GET', 'base'), self.loop_body(main, 1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,23 +1,18 @@
 
+import os
+import tempfile
 import unittest
 from lexer.scanner import Scanner
-from parse.parse import Parser
-from parse.model import Variable, Print, Assignment, If, While, Function, TypeCast, UnaryOp, FunctionCall
-
-class ParserToken:
-    def __init__(self, token):
-        self.type = token.token_type.name
-        self.value = token.literal if token.literal is not None else token.lexeme
-        self.lineno = token.line
+from parse.parse import Parser, ast_to_dict
+from parse import parse as parse_module
+from parse.model import Variable, Print, Assignment, If, While, Function, TypeCast, UnaryOp, FunctionCall, BinOp, NamedLocation
 
 def error_handler(line, message):
     raise SyntaxError(f"[line {line}] Error: {message}")
 
 def parse_source(source_code):
     scanner = Scanner(source_code, error_handler)
-    tokens = scanner.scan_tokens()
-    wrapped_tokens = [ParserToken(t) for t in tokens]
-    parser = Parser(wrapped_tokens)
+    parser = Parser(scanner.scan_tokens())
     return parser.parse()
 
 class TestParser(unittest.TestCase):
@@ -69,6 +64,13 @@ class TestParser(unittest.TestCase):
         self.assertIsInstance(node, While)
         self.assertEqual(len(node.body), 1)
 
+    def test_call_statement(self):
+        source = "foo(x);"
+        ast = parse_source(source)
+        self.assertEqual(len(ast), 1)
+        self.assertIsInstance(ast[0], FunctionCall)
+        self.assertEqual(ast[0].name, "foo")
+
     def test_function_declaration(self):
         source = "func sum(a int, b int) int { return a; }"
         ast = parse_source(source)
@@ -152,6 +154,31 @@ class TestParser(unittest.TestCase):
         self.assertIsInstance(pr.expression, UnaryOp)
         self.assertEqual(pr.expression.op, "MINUS")
 
+    def test_operator_precedence(self):
+        def shape(node):
+            if isinstance(node, BinOp):
+                return (node.op, shape(node.left), shape(node.right))
+            if isinstance(node, UnaryOp):
+                return (node.op, shape(node.expr))
+            if isinstance(node, NamedLocation):
+                return node.name_or_expr
+            return node.value
+        expr = parse_source("print a || b && c < d + e * f;")[0].expression
+        self.assertEqual(shape(expr), ('LOR', 'a', ('LAND', 'b', ('LT', 'c', ('PLUS', 'd', ('TIMES', 'e', 'f'))))))
+        expr = parse_source("print a - b - c * d / e;")[0].expression
+        self.assertEqual(shape(expr), ('MINUS', ('MINUS', 'a', 'b'), ('DIVIDE', ('TIMES', 'c', 'd'), 'e')))
+        expr = parse_source("print -a + -(b * 2) == 1;")[0].expression
+        self.assertEqual(shape(expr), ('EQ', ('PLUS', ('MINUS', 'a'), ('MINUS', ('TIMES', 'b', 2))), 1))
+
+    def test_long_expression_with_unary_operands(self):
+        source = "print " + " - ".join(["-x"] * 3000) + ";"
+        expr = parse_source(source)[0].expression
+        depth = 0
+        while isinstance(expr, BinOp):
+            self.assertIsInstance(expr.right, UnaryOp)
+            expr, depth = expr.left, depth + 1
+        self.assertEqual(depth, 2999)
+
     def test_function_call_expression(self):
         source = "print sum(1, 2);"
         ast = parse_source(source)
@@ -161,5 +188,54 @@ class TestParser(unittest.TestCase):
         self.assertIsInstance(pr.expression, FunctionCall)  
         self.assertEqual(len(pr.expression.args), 2)      
 
+    def test_node_spans(self):
+        ast = parse_source("var x int = 1;\nif x < 2 {\n    print x + 10;\n}\n")
+        var, if_stmt = ast
+        self.assertEqual(var.span, (1, 1, 1, 15))
+        self.assertEqual(if_stmt.span, (2, 1, 4, 2))
+        self.assertEqual(if_stmt.condition.span, (2, 4, 2, 9))
+        pr = if_stmt.then_branch[0]
+        self.assertEqual(pr.span, (3, 5, 3, 18))
+        self.assertEqual(pr.expression.span, (3, 11, 3, 17))
+        self.assertEqual(pr.expression.right.span, (3, 15, 3, 17))
+        self.assertFalse(hasattr(pr, '__dict__'))
+        self.assertIsNone(Print(None).span)
+
+    # ----------------------------
+    # streaming
+    # ----------------------------
+
+    def test_parser_reads_tokens_lazily(self):
+        scanner = Scanner("var x int = 1; print x; print x + 1;", error_handler)
+        parser = Parser(scanner.iter_tokens())
+        first = parser.statement()
+        self.assertIsInstance(first, Variable)
+        self.assertLessEqual(len(parser.lookahead), 2)
+        self.assertEqual(len(parser.parse()), 2)
+
+    def test_parse_file_in_chunks(self):
+        path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'samples', 'shor.gox')
+        with open(path, encoding='utf-8') as f:
+            expected = ast_to_dict(parse_source(f.read()))
+        chunked = Scanner.from_file(path, error_handler, chunk_size=5)
+        self.assertEqual(ast_to_dict(parse_module.parse_tokens(chunked)), expected)
+        self.assertEqual(ast_to_dict(parse_module.parse_file(path, use_mmap=True)), expected)
+
+    def test_chunk_boundaries_keep_line_numbers(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.gox', delete=False, encoding='utf-8') as f:
+            f.write("var x float = 3.25;\n/* comentario\nlargo */\nprint 'ñ';\nprint y y;\n")
+        try:
+            for chunk_size in (1, 3, 4096):
+                scanner = Scanner.from_file(f.name, error_handler, chunk_size=chunk_size)
+                tokens = list(scanner.iter_tokens())
+                self.assertEqual([t.lexeme for t in tokens][4], '3.25')
+                self.assertEqual(tokens[-1].line, 5)
+                self.assertEqual(tokens[-6].literal, 'ñ')
+                with self.assertRaises(SyntaxError) as cm:
+                    parse_module.parse_file(f.name)
+                self.assertIn("Línea 5", str(cm.exception))
+        finally:
+            os.unlink(f.name)
+
 if __name__ == '__main__':
     unittest.main()
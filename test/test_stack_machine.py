@@ -0,0 +1,426 @@
+import io
+import os
+import unittest
+from contextlib import redirect_stdout
+
+from lexer.scanner import Scanner
+from parse.parse import Parser
+from semantic.check import Checker
+from ircode import IRCode
+from stack_machine import StackMachine, Output, link
+
+def error_handler(line, message):
+    raise SyntaxError(f"[line {line}] Error: {message}")
+
+def compile_source(source_code):
+    scanner = Scanner(source_code, error_handler)
+    ast = Parser(scanner.scan_tokens()).parse()
+    with redirect_stdout(io.StringIO()):
+        checker = Checker.check(ast)
+    assert not checker.errors, checker.errors
+    return IRCode.gencode(ast)
+
+def run_source(source_code, **kwargs):
+    module = compile_source(source_code)
+    out = io.StringIO()
+    with redirect_stdout(out):
+        StackMachine(module, **kwargs).run_function('main')
+    return out.getvalue().split()
+
+class TestStackMachine(unittest.TestCase):
+
+    def test_link_if_else(self):
+        code = [('CONSTI', 1), ('IF',), ('CONSTI', 2), ('PRINTI',),
+                ('ELSE',), ('CONSTI', 3), ('PRINTI',), ('ENDIF',)]
+        targets = link(code)
+        self.assertEqual(targets[1], 4)
+        self.assertEqual(targets[4], 7)
+
+    def test_link_nested_loops(self):
+        code = [('LOOP', 1), ('CONSTI', 1), ('CBREAK', 1),
+                ('LOOP', 2), ('CONSTI', 0), ('CBREAK', 2), ('ENDLOOP', 2),
+                ('CONTINUE', 1), ('ENDLOOP', 1)]
+        targets = link(code)
+        self.assertEqual(targets[2], 8)
+        self.assertEqual(targets[5], 6)
+        self.assertEqual(targets[6], 3)
+        self.assertEqual(targets[7], 0)
+        self.assertEqual(targets[8], 0)
+
+    def test_link_unbalanced(self):
+        with self.assertRaises(Exception):
+            link([('IF',), ('ELSE',)])
+        with self.assertRaises(Exception):
+            link([('LOOP', 1), ('BREAK', 2), ('ENDLOOP', 1)])
+
+    def test_unsupported_instruction(self):
+        module = compile_source("print 1;")
+        module.functions['main'].code.insert(0, ('NOPE',))
+        with self.assertRaises(Exception) as cm:
+            StackMachine(module).run_function('main')
+        self.assertIn("Instrucción no soportada: NOPE", str(cm.exception))
+
+    def test_call_statement(self):
+        source = """
+        func show(x int) int {
+            print x;
+            return 0;
+        }
+        show(7);
+        """
+        self.assertEqual(run_source(source), ['7'])
+
+    def test_deep_recursion(self):
+        source = """
+        func total(n int) int {
+            if n == 0 { return 0; }
+            return n + total(n - 1);
+        }
+        print total(20000);
+        """
+        self.assertEqual(run_source(source), ['200010000'])
+
+    def test_frames_are_reused(self):
+        module = compile_source("""
+        func one() int { return 1; }
+        var i int = 0;
+        while i < 50 { i = i + one(); }
+        print i;
+        """)
+        machine = StackMachine(module)
+        with redirect_stdout(io.StringIO()):
+            machine.run_function('main')
+        self.assertEqual(machine.frames, [])
+        self.assertEqual(len(machine.pool), 2)
+
+    def test_nested_if_false(self):
+        source = """
+        var x int = 1;
+        if x == 2 {
+            if x == 1 { print 10; } else { print 20; }
+        } else {
+            print 30;
+        }
+        """
+        self.assertEqual(run_source(source), ['30'])
+
+    def test_nested_while(self):
+        source = """
+        var i int = 0;
+        var total int = 0;
+        while i < 3 {
+            var j int = 0;
+            while j < 4 {
+                total = total + 1;
+                j = j + 1;
+            }
+            i = i + 1;
+        }
+        print total;
+        """
+        self.assertEqual(run_source(source), ['12'])
+
+    def test_break_and_continue_in_nested_loops(self):
+        source = """
+        var i int = 0;
+        var hits int = 0;
+        while i < 5 {
+            i = i + 1;
+            var j int = 0;
+            while true {
+                j = j + 1;
+                if j == 3 { break; }
+                hits = hits + 1;
+            }
+            if i == 2 { continue; }
+            hits = hits + 100;
+        }
+        print hits;
+        """
+        self.assertEqual(run_source(source), ['410'])
+
+    def test_call_inside_loop(self):
+        source = """
+        func spin(n int) int {
+            var k int = 0;
+            while k < n { k = k + 1; }
+            return k;
+        }
+        var i int = 0;
+        var total int = 0;
+        while i < 4 {
+            total = total + spin(i);
+            i = i + 1;
+        }
+        print total;
+        """
+        self.assertEqual(run_source(source), ['6'])
+
+    def test_loop_labels(self):
+        module = compile_source("""
+        var i int = 0;
+        while i < 2 {
+            while false { break; }
+            i = i + 1;
+        }
+        """)
+        ops = [instr for instr in module.functions['main'].code if instr[0] in ('LOOP', 'BREAK', 'ENDLOOP')]
+        self.assertEqual(ops, [('LOOP', 1), ('LOOP', 2), ('BREAK', 2), ('ENDLOOP', 2), ('ENDLOOP', 1)])
+
+    def test_slots(self):
+        module = compile_source("""
+        var g int = 1;
+        var h int = 2;
+        func f(a int, b int) int {
+            var c int = a + b;
+            return c;
+        }
+        """)
+        func = module.functions['f']
+        self.assertEqual(func.slots, {'a': 0, 'b': 1, 'c': 2})
+        self.assertEqual([module.globals[n].slot for n in ('g', 'h')], [0, 1])
+
+    def test_slots_follow_checker_bindings(self):
+        source = """
+        var g int = 1;
+        func f(a int) int {
+            if a > 0 {
+                var inner int = a * 2;
+                a = inner;
+            }
+            var outer int = a + g;
+            return outer;
+        }
+        if g > 0 {
+            var late int = 5;
+            g = g + late;
+        }
+        print f(3);
+        print g;
+        """
+        module = compile_source(source)
+        self.assertEqual(module.functions['f'].slots, {'a': 0, 'inner': 1, 'outer': 2})
+        self.assertEqual({n: glob.slot for n, glob in module.globals.items()}, {'g': 0, 'late': 1})
+        self.assertIn(('GLOBAL_SET', 'late'), module.functions['main'].code)
+        self.assertEqual(run_source(source), ['12', '6'])
+
+    def test_parameter_shadows_global(self):
+        source = """
+        var n int = 100;
+        func twice(n int) int { return n * 2; }
+        print twice(4);
+        print n;
+        """
+        self.assertEqual(run_source(source), ['8', '100'])
+
+    def test_sieve(self):
+        source = """
+        const n = 30;
+        const base = ^(n + 1);
+        var i int = 2;
+        while i <= n { `(base + i) = 1; i = i + 1; }
+        i = 2;
+        while i * i <= n {
+            if `(base + i) == 1 {
+                var j int = i * i;
+                while j <= n { `(base + j) = 0; j = j + i; }
+            }
+            i = i + 1;
+        }
+        i = 2;
+        while i <= n {
+            if `(base + i) == 1 { print i; }
+            i = i + 1;
+        }
+        """
+        self.assertEqual(run_source(source), ['2', '3', '5', '7', '11', '13', '17', '19', '23', '29'])
+
+    def test_grow_returns_base_of_new_block(self):
+        module = compile_source("""
+        const a = ^3;
+        const b = ^2;
+        print a;
+        print b;
+        `(b + 1) = 'x';
+        print `(b + 1);
+        """)
+        machine = StackMachine(module)
+        out = io.StringIO()
+        with redirect_stdout(out):
+            machine.run_function('main')
+        self.assertEqual(out.getvalue().split(), ['0', '3', str(ord('x'))])
+        self.assertEqual(len(machine.memory), 5)
+        self.assertEqual(machine.memory.typecode, 'q')
+
+    def test_typed_memory_ops(self):
+        module = compile_source("print 0;")
+        machine = StackMachine(module)
+        machine.grow(4)
+        machine.stack.extend([1, 0x1FF])
+        machine.op_POKEB(None, 0)
+        machine.stack.extend([2, 2.5])
+        machine.op_POKEF(None, 0)
+        machine.stack.append(1)
+        machine.op_PEEKB(None, 0)
+        machine.stack.append(2)
+        machine.op_PEEKF(None, 0)
+        self.assertEqual(machine.stack, [0xFF, 2.5])
+
+    def test_typed_memory_round_trip(self):
+        # float(`addr) y char(`addr) leen la celda con el tipo guardado
+        module = compile_source("""
+        var base int = ^3;
+        `base = 1.5;
+        `(base + 1) = 'A';
+        `(base + 2) = -7;
+        print float(`base) * 2.0;
+        print char(`(base + 1));
+        print `(base + 2);
+        print int(`(base + 2));
+        """)
+        ops = [instr[0] for instr in module.functions['main'].code]
+        self.assertEqual([op for op in ops if op.startswith(('PEEK', 'POKE'))],
+                         ['POKEF', 'POKEB', 'POKEI', 'PEEKF', 'PEEKB', 'PEEKI', 'PEEKI'])
+        out = io.StringIO()
+        StackMachine(module, out=out).run_function('main')
+        self.assertEqual(out.getvalue().split(), ['3.0', 'A-7', '-7'])
+
+    def test_memory_out_of_range(self):
+        module = compile_source("""
+        const base = ^2;
+        `(base + 2) = 1;
+        """)
+        with self.assertRaises(Exception) as cm:
+            with redirect_stdout(io.StringIO()):
+                StackMachine(module).run_function('main')
+        self.assertIn("fuera de rango", str(cm.exception))
+
+    def test_memory_value_out_of_range(self):
+        module = compile_source("""
+        const base = ^1;
+        `base = 9223372036854775807 + 1;
+        """)
+        with self.assertRaises(Exception) as cm:
+            with redirect_stdout(io.StringIO()):
+                StackMachine(module).run_function('main')
+        self.assertIn("Valor fuera de rango", str(cm.exception))
+
+    def test_superinstructions(self):
+        source = """
+        func count(n int) int {
+            var i int = 0;
+            var s int = 0;
+            while i < n {
+                if i >= 3 { s = s + i; }
+                i = i + 1;
+            }
+            return s;
+        }
+        var k int = 5;
+        while k > 0 {
+            print count(k);
+            k = k - 1;
+        }
+        """
+        module = compile_source(source)
+        machine = StackMachine(module)
+        out = io.StringIO()
+        with redirect_stdout(out):
+            machine.run_function('main')
+        self.assertEqual(out.getvalue().split(), ['7', '3', '0', '0', '0'])
+        self.assertEqual(out.getvalue().split(), run_source(source, fuse=False))
+        self.assertEqual(machine.fused['INC'], 2)
+        self.assertEqual(machine.fused['BRANCH'], 3)
+
+    def test_fused_negation(self):
+        module = compile_source("print 0;")
+        func = module.functions['main']
+        func.code[:0] = [('CONSTI', 5), ('CONSTI', -1), ('MULI',), ('PRINTI',)]
+        machine = StackMachine(module)
+        out = io.StringIO()
+        with redirect_stdout(out):
+            machine.run_function('main')
+        self.assertEqual(out.getvalue().split(), ['-5', '0'])
+        self.assertEqual(machine.fused['NEG'], 1)
+
+    def test_unary_minus(self):
+        self.assertEqual(run_source("var a int = 2; print -a + 5; print -(a + 5); print 10 - 4 - 3;"), ['3', '-7', '3'])
+
+    def test_float_operations(self):
+        source = """
+        func half(x float) float { return x / 2.0; }
+        var a float = half(7.0);
+        var n int = int(a * 3.0);
+        print a;
+        print n;
+        print float(n) / 4.0;
+        print -a + 1.0;
+        if a > 3.0 && n != 10 { print 1; } else { print 0; }
+        """
+        module = compile_source(source)
+        ops = {instr[0] for func in module.functions.values() for instr in func.code}
+        self.assertTrue({'DIVF', 'MULF', 'ADDF', 'GTF', 'ITOF', 'FTOI', 'PRINTF', 'ANDI'} <= ops)
+        self.assertFalse({'DIVI', 'MULI'} & ops)
+        self.assertEqual(run_source(source), ['3.5', '10', '2.5', '-2.5', '0'])
+        self.assertEqual(run_source(source, fuse=False), ['3.5', '10', '2.5', '-2.5', '0'])
+
+    def test_targets_cached_per_function(self):
+        module = compile_source("""
+        func fact(n int) int {
+            if n <= 1 { return 1; } else { return n * fact(n - 1); }
+        }
+        print fact(6);
+        """)
+        out = io.StringIO()
+        with redirect_stdout(out):
+            StackMachine(module).run_function('main')
+        targets = module.functions['fact'].targets
+        self.assertIsNotNone(targets)
+        with redirect_stdout(out):
+            StackMachine(module).run_function('main')
+        self.assertIs(module.functions['fact'].targets, targets)
+        self.assertEqual(out.getvalue().split(), ['720', '720'])
+
+    def test_output_to_binary_sink(self):
+        module = compile_source("""
+        print 42;
+        print 'h';
+        print 'i';
+        """)
+        sink = io.BytesIO()
+        StackMachine(module, out=sink).run_function('main')
+        self.assertEqual(sink.getvalue(), b'42\nhi')
+
+    def test_output_to_pipe(self):
+        module = compile_source("print 7; print 8;")
+        read_fd, write_fd = os.pipe()
+        with os.fdopen(read_fd, 'rb') as reader, os.fdopen(write_fd, 'wb') as writer:
+            StackMachine(module, out=writer).run_function('main')
+            writer.close()
+            self.assertEqual(reader.read(), b'7\n8\n')
+
+    def test_output_is_buffered(self):
+        sink = io.StringIO()
+        out = Output(sink, size=6)
+        out.write('ab')
+        out.write('cd')
+        self.assertEqual(sink.getvalue(), '')
+        out.write('ef')
+        self.assertEqual(sink.getvalue(), 'abcdef')
+        out.write('g')
+        out.flush()
+        self.assertEqual(sink.getvalue(), 'abcdefg')
+
+    def test_output_flushed_on_error(self):
+        module = compile_source("""
+        const base = ^1;
+        print 5;
+        `(base + 3) = 1;
+        """)
+        sink = io.StringIO()
+        with self.assertRaises(Exception):
+            StackMachine(module, out=sink).run_function('main')
+        self.assertEqual(sink.getvalue(), '5\n')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import os
+import unittest
+
+from ircode import IRCode
+from optimize.flow import operand_start
+from optimize.inline import Inliner
+from optimize.strength import StrengthReduction
+from test.test_constfold import SAMPLES, checked_ast, optimized
+
+class TestStrengthReduction(unittest.TestCase):
+
+    def reduce(self, source_code, inline=False):
+        passes = (Inliner.inline,) if inline else ()
+        module, results = optimized(self, source_code, *passes, StrengthReduction.reduce)
+        return module, results[-1]
+
+    def ops(self, func):
+        return [instr[0] for instr in func.code]
+
+    def test_shifts(self):
+        module, pass_ = self.reduce("""
+        var values int = ^4;
+        `values = 7; `(values + 1) = -7; `(values + 2) = 0; `(values + 3) = -1;
+        var i int = 0;
+        while i < 4 {
+            var x int = `(values + i);
+            print x / 2;
+            print x / 8;
+            print x * 4;
+            print 16 * x;
+            i = i + 1;
+        }
+        """)
+        ops = self.ops(module.functions['main'])
+        self.assertNotIn('DIVI', ops)
+        self.assertEqual(ops.count('SHRI'), 2)
+        self.assertEqual(ops.count('SHLI'), 2)
+        self.assertEqual(ops.count('MULI'), 0)
+        self.assertEqual(pass_.stats['shift'], 4)
+
+    def test_negation(self):
+        module, pass_ = self.reduce("""
+        var a int = 5;
+        var b float = 2.5;
+        print -a;
+        print a * -1;
+        print a / -1;
+        print 0 - a;
+        print -b;
+        print -(b * 2.0);
+        """)
+        ops = self.ops(module.functions['main'])
+        self.assertEqual(ops.count('NEGI'), 4)
+        self.assertEqual(ops.count('NEGF'), 2)
+        self.assertNotIn('SUBI', ops)
+        self.assertEqual(pass_.stats['negate'], 6)
+
+    def test_modulo_idiom(self):
+        module, pass_ = self.reduce("""
+        func mod(a int, b int) int { return a - b * (a / b); }
+        func mod2(a int, b int) int { return a - (a / b) * b; }
+        func other(a int, b int) int { return a - b * (b / a); }
+        print mod(17, 5);
+        print mod(-17, 5);
+        print mod(17, -5);
+        print mod(17, 0);
+        print mod2(23, 7);
+        print other(3, 10);
+        """)
+        self.assertEqual(self.ops(module.functions['mod']), ['LOCAL_GET', 'LOCAL_GET', 'MODI', 'RET'])
+        self.assertIn('MODI', self.ops(module.functions['mod2']))
+        self.assertNotIn('MODI', self.ops(module.functions['other']))
+        self.assertEqual(pass_.stats['modulo'], 2)
+
+    def test_modulo_idiom_needs_pure_operands(self):
+        module, pass_ = self.reduce("""
+        func next() int { print 1; return 10; }
+        print next() - 3 * (next() / 3);
+        """)
+        self.assertEqual(pass_.stats['modulo'], 0)
+
+    def test_modulo_power_of_two_becomes_mask(self):
+        module, pass_ = self.reduce("""
+        var x int = -13;
+        print x - 8 * (x / 8);
+        print (x + 20) - ((x + 20) / 4) * 4;
+        print x - 8 * (x / 4);
+        """)
+        ops = self.ops(module.functions['main'])
+        self.assertEqual(ops.count('ANDI'), 2)
+        self.assertNotIn('MODI', ops)
+        self.assertEqual(pass_.stats['mask'], 2)
+
+    def test_float_division_by_power_of_two(self):
+        module, pass_ = self.reduce("""
+        var x float = 7.0;
+        print x / 2.0;
+        print x / 0.25;
+        print x / 3.0;
+        print x / 0.0;
+        """)
+        code = module.functions['main'].code
+        self.assertIn(('CONSTF', 0.5), code)
+        self.assertIn(('CONSTF', 4.0), code)
+        self.assertEqual(self.ops(module.functions['main']).count('DIVF'), 2)
+        self.assertEqual(pass_.stats['reciprocal'], 2)
+
+    def test_operand_start(self):
+        module = IRCode.gencode(checked_ast("func f(a int) int { return a; } print f(1);"))
+        code = [('LOCAL_GET', 'a'), ('CONSTI', 1), ('CALL', 'f'), ('LOCAL_SET', 't'),
+                ('LOCAL_GET', 't'), ('ADDI',)]
+        self.assertEqual(operand_start(module, code, 5), 4)
+        self.assertEqual(operand_start(module, code, 4), 0)     # Cruza CALL y LOCAL_SET
+        self.assertEqual(operand_start(module, code, 3), 1)
+        self.assertIsNone(operand_start(module, [('CONSTI', 1), ('IF',), ('CONSTI', 2)], 2))
+
+    def test_shor(self):
+        with open(os.path.join(SAMPLES, 'shor.gox'), encoding='utf-8') as f:
+            module, pass_ = self.reduce(f.read(), inline=True)
+        for name in ('gcd', 'powmod'):
+            ops = self.ops(module.functions[name])
+            self.assertNotIn('DIVI', ops)
+            self.assertIn('MODI', ops)
+        self.assertIn('SHRI', self.ops(module.functions['powmod']))
+
+if __name__ == '__main__':
+    unittest.main()
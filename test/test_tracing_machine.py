@@ -0,0 +1,150 @@
+import io
+import os
+import unittest
+from contextlib import redirect_stdout
+
+from tracing_machine import TracingMachine
+from test.test_stack_machine import compile_source, run_source
+
+SAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'samples')
+
+def run_traced(source_code, **kwargs):
+    module = compile_source(source_code)
+    machine = TracingMachine(module, **kwargs)
+    out = io.StringIO()
+    with redirect_stdout(out):
+        machine.run_function('main')
+    return out.getvalue().split(), machine
+
+class TestTracingMachine(unittest.TestCase):
+
+    def test_hot_loop_is_traced(self):
+        source = """
+        var i int = 0;
+        var total int = 0;
+        while i < 100 {
+            total = total + i;
+            i = i + 1;
+        }
+        print total;
+        """
+        output, machine = run_traced(source, hot_loop=10)
+        self.assertEqual(output, ['4950'])
+        trace = machine.traces['main', 1]
+        self.assertEqual(trace.entries, 1)
+        self.assertEqual(sum(trace.exits.values()), 1)
+
+    def test_cold_loop_stays_interpreted(self):
+        output, machine = run_traced("""
+        var i int = 0;
+        while i < 5 { i = i + 1; }
+        print i;
+        """, hot_loop=10)
+        self.assertEqual(output, ['5'])
+        self.assertEqual(machine.traces, {})
+
+    def test_guard_failure_falls_back(self):
+        source = """
+        func count(n int) int {
+            var i int = 0;
+            var big int = 0;
+            while i < n {
+                if i >= 30 { big = big + 1; }
+                i = i + 1;
+            }
+            return big;
+        }
+        print count(40);
+        """
+        output, machine = run_traced(source, hot_loop=10)
+        self.assertEqual(output, run_source(source))
+        self.assertEqual(output, ['10'])
+        trace = machine.traces['count', 1]
+        self.assertGreater(trace.entries, 1)
+
+    def test_alternating_branch_is_widened(self):
+        source = """
+        var i int = 0;
+        var odd int = 0;
+        while i < 200 {
+            if i - (i / 2) * 2 == 1 { odd = odd + 1; } else { odd = odd + 0; }
+            i = i + 1;
+        }
+        print odd;
+        """
+        output, machine = run_traced(source, hot_loop=10)
+        self.assertEqual(output, ['100'])
+        trace = machine.traces['main', 1]
+        self.assertEqual(len(trace.widened), 1)
+        self.assertLess(trace.entries, 30)
+
+    def test_calls_inside_trace(self):
+        source = """
+        func mod(a int, b int) int { return a - b * (a / b); }
+        func powmod(a int, x int, n int) int {
+            var result int = 1;
+            while x > 0 {
+                if mod(x, 2) != 0 { result = mod(result * a, n); }
+                a = mod(a * a, n);
+                x = x / 2;
+            }
+            return result;
+        }
+        var k int = 1;
+        var total int = 0;
+        while k < 60 {
+            total = mod(total + powmod(3, k, 1009), 1009);
+            k = k + 1;
+        }
+        print total;
+        """
+        output, machine = run_traced(source, hot_loop=5)
+        self.assertEqual(output, run_source(source))
+        self.assertIn(('main', 1), machine.traces)
+        self.assertIn(('powmod', 1), machine.traces)
+
+    def test_return_and_break_leave_through_guards(self):
+        source = """
+        func find(n int) int {
+            var i int = 0;
+            while true {
+                if i == n { return i; }
+                i = i + 1;
+            }
+            return 0;
+        }
+        var j int = 0;
+        while true {
+            j = j + 1;
+            if j == 80 { break; }
+        }
+        print find(90);
+        print j;
+        """
+        output, machine = run_traced(source, hot_loop=10)
+        self.assertEqual(output, ['90', '80'])
+        self.assertIn(('find', 1), machine.traces)
+        self.assertIn(('main', 1), machine.traces)
+
+    def test_memory_loop(self):
+        with open(os.path.join(SAMPLES, 'criba.gox'), encoding='utf-8') as f:
+            source = f.read()
+        output, machine = run_traced(source, hot_loop=5)
+        self.assertEqual(output, run_source(source))
+        self.assertTrue(machine.traces)
+        self.assertIn('main ciclo', machine.report())
+
+    def test_memory_value_out_of_range(self):
+        with self.assertRaises(Exception) as cm:
+            run_traced("""
+            const base = ^1;
+            var i int = 0;
+            while i < 10 {
+                `base = 9223372036854775800 + i;
+                i = i + 1;
+            }
+            """, hot_loop=2)
+        self.assertIn("Valor fuera de rango", str(cm.exception))
+
+if __name__ == '__main__':
+    unittest.main()
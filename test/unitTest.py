@@ -1,6 +1,6 @@
 import unittest
 from lexer.scanner import Scanner
-from lexer.tokenType import TokenType
+from lexer.tokenType import TokenType, TokenCode
 
 class TestLexer(unittest.TestCase):
     @staticmethod
@@ -52,6 +52,40 @@ class TestLexer(unittest.TestCase):
         tokens = lexer.scan_tokens()
         self.assertEqual(len(tokens), 0)
 
+    def test_line_numbers(self):
+        lexer = Scanner("var x;\n\n/* a\nb */ x = 1; // c\n  print x;", None)
+        tokens = lexer.scan_tokens()
+        self.assertIsNone(lexer.lines.offsets)
+        self.assertEqual([t.line for t in tokens], [1, 1, 1, 4, 4, 4, 4, 5, 5, 5])
+        self.assertEqual(lexer.lines.offsets, [6, 7, 12, 29])
+
+    def test_char_and_string_literals(self):
+        lexer = Scanner("'a' '\\x41' \"hola\"", None)
+        tokens = lexer.scan_tokens()
+        self.assertEqual([t.token_type for t in tokens], [TokenType.CHAR] * 3)
+        self.assertEqual([t.literal for t in tokens], ['a', 'A', 'hola'])
+
+    def test_unterminated_comment(self):
+        errors = []
+        lexer = Scanner("x /* nunca\ncierra", lambda line, message: errors.append((line, message)))
+        tokens = lexer.scan_tokens()
+        self.assertEqual(len(tokens), 1)
+        self.assertEqual(errors, [(2, "Unterminated multiline comment")])
+
+    def test_compact_tokens(self):
+        tokens = Scanner("var x int = 10; x = x + 1;", None).scan_tokens()
+        self.assertFalse(hasattr(tokens[0], '__dict__'))
+        self.assertEqual([t.type for t in tokens[:3]], [TokenCode.VAR, TokenCode.IDENTIFIER, TokenCode.INT])
+        self.assertIs(tokens[1].lexeme, tokens[6].lexeme)
+        self.assertIs(tokens[3].lexeme, tokens[7].lexeme)
+        self.assertEqual(tokens[4].value, 10)
+
+    def test_large_input(self):
+        source = "var x int = 10; // comentario\n" * 100000
+        tokens = Scanner(source, None).scan_tokens()
+        self.assertEqual(len(tokens), 600000)
+        self.assertEqual(tokens[-1].line, 100000)
+
 if __name__ == '__main__':
     unittest.main()
 
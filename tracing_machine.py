@@ -0,0 +1,310 @@
+'''
+Compilación de ciclos calientes por trazas
+==========================================
+
+`TracingMachine` es una `StackMachine` que cuenta cuántas veces se toma
+el salto hacia atrás (ENDLOOP o CONTINUE) de cada ciclo. Cuando un ciclo
+supera `hot_loop` iteraciones:
+
+  1. Graba una traza: ejecuta una iteración completa paso a paso y anota
+     las instrucciones recorridas, es decir, la rama que tomó cada IF.
+  2. Compila la traza a una función Python especializada para ese
+     camino. Cada IF y CBREAK se vuelve una guarda: si la condición no
+     coincide con la grabada, la traza guarda el estado y devuelve el pc
+     donde debe seguir el intérprete.
+  3. Reemplaza en el código decodificado los saltos hacia atrás del ciclo
+     por la entrada a la traza, así que las iteraciones siguientes corren
+     dentro de ella.
+
+Sólo se trazan ciclos internos (sin ciclos anidados) cuya iteración no
+retorne ni salga con BREAK. Las llamadas dentro de la traza se ejecutan
+con el intérprete (`invoke`). Si la grabación falla `max_aborts` veces el
+ciclo queda interpretado para siempre.
+
+Cuando la salida lateral de una guarda de IF también se vuelve caliente
+(la condición alterna entre iteraciones), la traza se recompila con ese
+IF "ensanchado": ambas ramas se traducen como un if/else de Python, si
+no contienen instrucciones de ciclo ni retornos.
+
+`machine.traces` guarda por ciclo la traza compilada con sus contadores
+de entradas y salidas; `machine.report()` los resume.
+'''
+from collections import Counter
+
+from stack_machine import StackMachine
+from compiled_machine import FunctionCompiler
+
+def endif(func, pc):
+    # ENDIF del IF en `pc`: IF -> ELSE -> ENDIF, o IF -> ENDIF si no tiene ELSE
+    target = func.targets[pc]
+    return func.targets[target] if func.code[target][0] == 'ELSE' else target
+
+class Trace:
+    '''
+    Traza compilada de un ciclo: la función generada y sus contadores.
+    '''
+    def __init__(self, func, head, path, widened, source, side_exits, run):
+        self.func = func
+        self.head = head          # pc de la primera instrucción del ciclo
+        self.label = func.code[head - 1][1]
+        self.path = path          # pcs del IR que recorre una iteración
+        self.widened = widened    # pcs de los IF compilados con ambas ramas
+        self.side_exits = side_exits  # pc de salida -> pc del IF que la produce
+        self.source = source
+        self.run = run
+        self.entries = 0
+        self.exits = Counter()    # pc de salida -> veces
+
+    def __repr__(self):
+        return f'Trace({self.func.name}, ciclo {self.label}, {len(self.path)} instrucciones)'
+
+class TraceCompiler(FunctionCompiler):
+    '''
+    Traduce el camino grabado de una iteración a una función
+    `trace(M, L, G, MEM)` que itera hasta que falla una guarda.
+    '''
+    def __init__(self, func, head, path, widened=frozenset()):
+        super().__init__(func)
+        self.head = head
+        self.path = path
+        self.widened = widened
+        self.side_exits = {}      # pc de salida -> pc del IF que la produce
+        self.indent = 2
+        code = func.code
+        pcs = set(path)
+        for pc in widened:
+            pcs.update(range(pc, self.endif(pc) + 1))
+        instrs = [code[pc] for pc in sorted(pcs)]
+        self.local_slots = sorted({func.slot(i[1]) for i in instrs if i[0] in ('LOCAL_GET', 'LOCAL_SET')})
+        self.local_written = sorted({func.slot(i[1]) for i in instrs if i[0] == 'LOCAL_SET'})
+        # Sin llamadas nadie más puede tocar las globales: se copian a variables
+        self.cache_globals = not any(i[0] == 'CALL' for i in instrs)
+        names = {i[1] for i in instrs if i[0] in ('GLOBAL_GET', 'GLOBAL_SET')}
+        self.global_slots = sorted(func.module.globals[n].slot for n in names)
+        written = {i[1] for i in instrs if i[0] == 'GLOBAL_SET'}
+        self.global_written = sorted(func.module.globals[n].slot for n in written)
+
+    def endif(self, pc):
+        return endif(self.func, pc)
+
+    def source(self):
+        code = self.func.code
+        targets = self.func.targets
+        path = self.path
+        skip = -1
+        for i, pc in enumerate(path):
+            if pc <= skip:
+                continue            # Dentro de un IF ya compilado completo
+            instr = code[pc]
+            op = instr[0]
+            if op == 'IF' and pc in self.widened:
+                skip = self.endif(pc)
+                for inner in range(pc, skip + 1):
+                    getattr(self, 'op_' + code[inner][0])(*code[inner][1:])
+            elif op == 'IF':
+                cond, _ = self.pop()
+                following = path[i + 1] if i + 1 < len(path) else self.head
+                if following == pc + 1:
+                    exit_pc = targets[pc] + 1
+                    self.guard(f'not {cond}', exit_pc)
+                else:
+                    exit_pc = pc + 1
+                    self.guard(cond, exit_pc)
+                self.side_exits[exit_pc] = pc
+            elif op == 'CBREAK':
+                cond, _ = self.pop()
+                self.guard(f'not {cond}', targets[pc] + 1)
+            elif op in ('ELSE', 'ENDIF', 'ENDLOOP', 'CONTINUE'):
+                self.settle()
+            else:
+                method = getattr(self, 'op_' + op, None)
+                if method is None:
+                    raise Exception(f"Instrucción no soportada: {op}")
+                method(*instr[1:])
+        if self.stack:
+            raise Exception(f"La traza de {self.func.name} deja valores en la pila")
+
+        lines = ['def trace(M, L, G, MEM):']
+        lines += [f'    l{s} = L[{s}]' for s in self.local_slots]
+        if self.cache_globals:
+            lines += [f'    g{s} = G[{s}]' for s in self.global_slots]
+        lines.append('    while True:')
+        return '\n'.join(lines + self.lines) + '\n'
+
+    def guard(self, cond, exit_pc):
+        self.settle()
+        self.emit(f'if {cond}:')
+        self.indent += 1
+        for s in self.local_written:
+            self.emit(f'L[{s}] = l{s}')
+        if self.cache_globals:
+            for s in self.global_written:
+                self.emit(f'G[{s}] = g{s}')
+        if self.stack:
+            self.emit(f"M.stack.extend(({', '.join(e for e, _ in self.stack)},))")
+        self.emit(f'return {exit_pc}')
+        self.indent -= 1
+
+    def op_GLOBAL_GET(self, name):
+        if not self.cache_globals:
+            return super().op_GLOBAL_GET(name)
+        self.push(f'g{self.func.module.globals[name].slot}')
+
+    def op_GLOBAL_SET(self, name):
+        if not self.cache_globals:
+            return super().op_GLOBAL_SET(name)
+        entry = self.pop()
+        self.settle()
+        self.emit(f'g{self.func.module.globals[name].slot} = {self.value(entry)}')
+
+    def op_CALL(self, name):
+        callee = self.func.module.functions[name]
+        nargs = len(callee.parmnames)
+        args = [self.value(self.pop()) for _ in range(nargs)][::-1]
+        self.settle()
+        self.result(f"M.invoke(F_{name}, ({''.join(a + ', ' for a in args)}))")
+
+class TracingMachine(StackMachine):
+    '''
+    Intérprete que compila a Python las iteraciones de sus ciclos calientes.
+    '''
+    hot_loop = 50        # Saltos hacia atrás antes de grabar una traza
+    max_trace = 2000     # Instrucciones máximas por traza
+    max_aborts = 3       # Grabaciones fallidas antes de desistir
+
+    def __init__(self, module, fuse=True, hot_loop=None, out=None, buffer_size=8192):
+        super().__init__(module, fuse=fuse, out=out, buffer_size=buffer_size)
+        if hot_loop is not None:
+            self.hot_loop = hot_loop
+        self.backedges = Counter()   # (función, head) -> saltos hacia atrás interpretados
+        self.aborted = Counter()     # (función, head) -> grabaciones fallidas
+        self.traces = {}             # (función, etiqueta) -> Trace
+        self.plain = {}              # Código decodificado sin fusionar (para grabar)
+        self.namespace = {'M': self, 'CHECK': self.check_address, 'WRITE': self.output.write}
+        self.namespace.update({f'F_{name}': func for name, func in module.functions.items()})
+
+    def invoke(self, func, args=()):
+        '''
+        Ejecuta `func` hasta que retorna y devuelve su valor. Permite
+        llamar al intérprete desde una traza o durante la grabación.
+        '''
+        caller, frames = self.frame, self.frames
+        self.frame, self.frames = None, []
+        self.stack.extend(args)
+        self.op_CALL(func, None)
+        self.execute()
+        self.frame, self.frames = caller, frames
+        if caller is not None:
+            self.locals = caller.locals
+        return self.stack.pop()
+
+    def report(self):
+        lines = []
+        for (name, label), trace in sorted(self.traces.items()):
+            guards = sum(trace.exits.values())
+            lines.append(f'{name} ciclo {label}: {len(trace.path)} instrucciones, '
+                         f'{len(trace.widened)} IF ensanchados, '
+                         f'{trace.entries} entradas, {guards} salidas')
+        for (name, head), count in sorted(self.aborted.items()):
+            lines.append(f'{name} ciclo en pc {head}: {count} grabaciones abortadas')
+        return '\n'.join(lines)
+
+    # Saltos hacia atrás
+
+    def op_ENDLOOP(self, head, pc):
+        return self.backedge(head)
+
+    def op_CONTINUE(self, head, pc):
+        return self.backedge(head)
+
+    def widenable(self, func, pc):
+        # Ambas ramas del IF deben poder compilarse sin salir de la traza
+        end = endif(func, pc)
+        return all(instr[0] not in ('LOOP', 'ENDLOOP', 'CBREAK', 'BREAK', 'CONTINUE', 'RET')
+                   for instr in func.code[pc:end + 1])
+
+    def backedge(self, head):
+        func = self.frame.func
+        key = (func.name, head)
+        count = self.backedges[key] = self.backedges[key] + 1
+        if count < self.hot_loop:
+            return head
+        self.backedges[key] = 0
+        path, pc = self.record(func, head)
+        if path is not None:
+            try:
+                self.install(func, head, path)
+                return pc
+            except Exception:
+                pass
+        self.aborted[key] += 1
+        if self.aborted[key] >= self.max_aborts:
+            self.patch(func, head, StackMachine.op_ENDLOOP, StackMachine.op_CONTINUE, head)
+        return pc
+
+    # Grabación y compilación
+
+    def record(self, func, head):
+        '''
+        Ejecuta una iteración del ciclo desde `head` anotando los pcs.
+        Devuelve (camino, pc) si la iteración volvió al inicio del ciclo,
+        o (None, pc) si se abortó; en ambos casos el intérprete continúa
+        desde `pc`.
+        '''
+        code = self.plain.get(func.name)
+        if code is None:
+            code = self.plain[func.name] = [self.decode(func, instr, target)
+                                            for instr, target in zip(func.code, func.targets)]
+        ops = func.code
+        path = []
+        pc = head
+        while len(path) < self.max_trace:
+            op = ops[pc][0]
+            if op in ('ENDLOOP', 'CONTINUE') and func.targets[pc] == head - 1:
+                path.append(pc)
+                return path, head
+            if op in ('LOOP', 'RET', 'BREAK', 'ENDLOOP', 'CONTINUE'):
+                return None, pc
+            path.append(pc)
+            handler, arg = code[pc]
+            if op == 'CALL':
+                self.stack.append(self.invoke(arg))
+                pc += 1
+            else:
+                pc = handler(self, arg, pc + 1)
+            if op == 'CBREAK' and pc != path[-1] + 1:
+                return None, pc
+        return None, pc
+
+    def install(self, func, head, path, widened=frozenset()):
+        compiler = TraceCompiler(func, head, path, widened)
+        source = compiler.source()
+        namespace = dict(self.namespace)
+        exec(compile(source, f'<trace {func.name}:{head}>', 'exec'), namespace)
+        trace = Trace(func, head, path, widened, source, compiler.side_exits, namespace['trace'])
+        old = self.traces.get((func.name, trace.label))
+        if old is not None:
+            trace.entries, trace.exits = old.entries, old.exits
+        self.traces[func.name, trace.label] = trace
+        self.patch(func, head, TracingMachine.enter_trace, TracingMachine.enter_trace, trace)
+        return trace
+
+    def patch(self, func, head, endloop, cont, arg):
+        # Reemplaza los saltos hacia atrás del ciclo en el código cargado
+        code = self.loaded[func.name]
+        for pc, instr in enumerate(func.code):
+            if instr[0] in ('ENDLOOP', 'CONTINUE') and func.targets[pc] == head - 1:
+                code[pc] = (endloop if instr[0] == 'ENDLOOP' else cont, arg)
+
+    def enter_trace(self, trace, pc):
+        trace.entries += 1
+        try:
+            exit_pc = trace.run(self, self.locals, self.globals, self.memory)
+        except IndexError:
+            raise Exception(f"Acceso a memoria fuera de rango (tamaño {len(self.memory)})")
+        count = trace.exits[exit_pc] = trace.exits[exit_pc] + 1
+        if count == self.hot_loop:
+            branch = trace.side_exits.get(exit_pc)
+            if branch is not None and self.widenable(trace.func, branch):
+                self.install(trace.func, trace.head, trace.path, trace.widened | {branch})
+        return exit_pc